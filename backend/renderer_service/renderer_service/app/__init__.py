@@ -1,28 +1,48 @@
 from __future__ import annotations
 
 import asyncio
+import base64
 import logging
+import threading
 import time
-from dataclasses import dataclass
-from typing import Any, Callable, Literal, Optional, TypeVar
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Sequence
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Literal, Optional, TypeVar
 
 import anyio
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from ..config import settings
 from ..models import (
-    DiffResponse,
-    DiffRequest,
-    RenderRequest,
-    RenderResponse,
     BatchRenderRequest,
     BatchRenderResponse,
-    SpritesheetFrame,
+    BatchVariant,
+    DiffBatchRequest,
+    DiffBatchResponse,
+    DiffRequest,
+    DiffResponse,
     FrameSource,
     LayerIdentifier,
+    PalettePreviewRequest,
+    RenderMeta,
+    RenderParams,
+    RenderRequest,
+    RenderResponse,
+    SpritesheetFrame,
 )
-from ..renderer import RenderPipeline
+from ..renderer import PlanCompileError, RenderPipeline, RenderPlan
+from ..renderer.fingerprints import MANIFEST_NAME, stat_assets
+from ..renderer.hot_reload import rebuild_pipeline
+from ..renderer.image_ops import upscale_nearest
+from ..renderer.pattern_atlas import load_and_install
+from ..renderer.pattern_pool import PatternPool, resolve_workers
+from ..renderer.pipeline import BatchPipelineResult
+from ..renderer.tile_store import get_tile_store
+from ..renderer.warmup import WarmupProgress, build_warmup_plan
 
 T = TypeVar("T")
 
@@ -31,6 +51,10 @@ class QueueOverloadedError(RuntimeError):
     """Raised when the render queue is full."""
 
 
+class ReloadRejectedError(RuntimeError):
+    """Raised when a hot reload is requested while one is running or before startup."""
+
+
 class CircuitOpenError(RuntimeError):
     """Raised when the circuit breaker is open."""
 
@@ -43,6 +67,163 @@ class QueueJob:
     enqueued_at: float
 
 
+# Cheap render used to pull the most common atlases through decode/colorkey
+# before the replica reports ready.
+WARMUP_PARAMS = {
+    "spriteNumber": 8,
+    "peltName": "Tabby",
+    "colour": "GINGER",
+    "eyeColour": "YELLOW",
+}
+
+
+@dataclass
+class StartupState:
+    """Cold-start bookkeeping; initialisation and warm-up run after the app starts accepting connections."""
+
+    created_at: float = field(default_factory=time.monotonic)
+    initialised_at: float | None = None
+    ready_at: float | None = None
+    error: str | None = None
+    steps_ms: dict[str, float] = field(default_factory=dict)
+    # Share of warm-up tasks required before reporting ready; ``warmup`` is
+    # None when warm-up is disabled.
+    ready_fraction: float = 1.0
+    warmup: WarmupProgress | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self.ready_at is not None
+
+    def initialise(self, pipeline: RenderPipeline) -> None:
+        """Run the deferred startup work (validation, catalog, first render)."""
+        logger = logging.getLogger("renderer.startup")
+        steps: tuple[tuple[str, Callable[[], Any]], ...] = (
+            ("validate", pipeline.validate),
+            ("catalog", lambda: pipeline.catalog),
+            (
+                "fingerprints",
+                lambda: pipeline.fingerprint_assets(settings.cache_dir / MANIFEST_NAME),
+            ),
+            ("pattern_atlas", lambda: _install_pattern_atlas(pipeline)),
+            ("first_render", lambda: pipeline.render(WARMUP_PARAMS)),
+        )
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                step()
+            except Exception as exc:
+                self.error = f"{name}: {exc}"
+                logger.exception("startup step %s failed", name)
+                return
+            self.steps_ms[name] = round((time.perf_counter() - started) * 1000, 2)
+        self.initialised_at = time.monotonic()
+        logger.info(
+            "renderer initialised %.1fms after create_app (%s)",
+            (self.initialised_at - self.created_at) * 1000,
+            ", ".join(f"{name}={ms}ms" for name, ms in self.steps_ms.items()),
+        )
+        self.check_ready()
+
+    def check_ready(self) -> bool:
+        if (
+            self.ready_at is None
+            and self.initialised_at is not None
+            and self.error is None
+            and (self.warmup is None or self.warmup.fraction >= self.ready_fraction)
+        ):
+            self.ready_at = time.monotonic()
+            logging.getLogger("renderer.startup").info(
+                "renderer ready %.1fms after create_app",
+                (self.ready_at - self.created_at) * 1000,
+            )
+        return self.ready
+
+    def snapshot(self) -> dict[str, Any]:
+        def since_created(moment: float | None) -> float | None:
+            return round((moment - self.created_at) * 1000, 2) if moment else None
+
+        return {
+            "ready": self.ready,
+            "time_to_initialised_ms": since_created(self.initialised_at),
+            "time_to_ready_ms": since_created(self.ready_at),
+            "steps_ms": dict(self.steps_ms),
+            "error": self.error,
+            "ready_fraction": self.ready_fraction,
+            "warmup": self.warmup.snapshot() if self.warmup else None,
+        }
+
+
+def _install_pattern_atlas(pipeline: RenderPipeline) -> None:
+    if settings.pattern_atlas:
+        load_and_install(settings.cache_dir, pipeline.canvas_size)
+
+
+async def run_warmup(
+    startup: StartupState,
+    pipeline: RenderPipeline,
+    supervisor: RendererSupervisor,
+    *,
+    include_tiles: bool = True,
+    tint_colours: Sequence[str] = (),
+    pattern_atlas: bool = False,
+    pattern_workers: int = 1,
+    yield_seconds: float = 0.05,
+) -> None:
+    """Initialise, then work through the warm-up plan one short task at a time.
+
+    Each task runs only while no live request is queued or rendering, so
+    warm-up never competes with traffic for the worker threads. With
+    ``pattern_workers`` above 1 a process pool generates pattern tiles; it is
+    shut down once the pattern phase is over, or when warm-up is cancelled.
+    """
+    logger = logging.getLogger("renderer.warmup")
+    await anyio.to_thread.run_sync(startup.initialise, pipeline, cancellable=True)
+    if startup.error or startup.warmup is None:
+        return
+
+    pool = PatternPool(pattern_workers) if pattern_workers > 1 else None
+    try:
+        plan = await anyio.to_thread.run_sync(
+            lambda: build_warmup_plan(
+                pipeline,
+                include_tiles=include_tiles,
+                tint_colours=tint_colours,
+                pattern_atlas=pattern_atlas,
+                pattern_pool=pool,
+            ),
+            cancellable=True,
+        )
+        startup.warmup.begin(plan)
+        started = time.perf_counter()
+        for task in plan:
+            if pool is not None and task.phase in ("tints", "corpus"):
+                # Pattern work is done; idle workers only hold memory.
+                await anyio.to_thread.run_sync(pool.close)
+                pool = None
+            while supervisor.busy():
+                await asyncio.sleep(yield_seconds)
+            try:
+                await anyio.to_thread.run_sync(task.run, cancellable=True)
+            except Exception:
+                logger.warning(
+                    "warm-up task %s/%s failed", task.phase, task.label, exc_info=True
+                )
+                startup.warmup.complete(task, ok=False)
+            else:
+                startup.warmup.complete(task)
+            startup.check_ready()
+    finally:
+        if pool is not None:
+            pool.close(wait=False)
+    logger.info(
+        "warm-up finished: %d tasks in %.1fs (%d failed)",
+        len(plan),
+        time.perf_counter() - started,
+        startup.warmup.failed,
+    )
+
+
 class RendererSupervisor:
     def __init__(
         self,
@@ -66,6 +247,7 @@ class RendererSupervisor:
         self.circuit_open_until = 0.0
         self.consecutive_failures = 0
         self.max_observed_queue = 0
+        self.active_jobs = 0
         self.logger = logging.getLogger("renderer.queue")
 
     async def start(self) -> None:
@@ -135,6 +317,7 @@ class RendererSupervisor:
     async def _worker(self) -> None:
         while True:
             job = await self.queue.get()
+            self.active_jobs += 1
             try:
                 result = await anyio.to_thread.run_sync(job.execute, cancellable=True)
             except Exception as exc:  # noqa: BLE001
@@ -146,8 +329,13 @@ class RendererSupervisor:
                     job.future.set_result(result)
                 self._record_success()
             finally:
+                self.active_jobs -= 1
                 self.queue.task_done()
 
+    def busy(self) -> bool:
+        """True while live requests are queued or rendering."""
+        return self.active_jobs > 0 or not self.queue.empty()
+
     def metrics(self) -> dict[str, Any]:
         now = time.monotonic()
         return {
@@ -167,6 +355,136 @@ class RendererSupervisor:
         }
 
 
+class ScaledRenderCache:
+    """Encoded responses at scale > 1, keyed by plan and bounded by total bytes.
+
+    Holds ``/render`` previews and whole ``/render/batch`` responses, whose
+    sheets are the largest outputs. Keys carry the global asset digest, so a
+    hot reload never serves an image drawn from the old assets. A hit skips
+    rendering, upscaling and encoding; ``max_bytes=0`` disables the cache.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Hashable, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> str | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: str) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous)
+            self._entries[key] = value
+            self.bytes += len(value)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class AssetReloader:
+    """Hot reload of the asset files behind ``supervisor.pipeline``.
+
+    The new pipeline is built on a worker thread while renders carry on, then
+    swapped in on the event loop. Request handlers bind ``supervisor.pipeline``
+    once, so every job runs against exactly one pipeline.
+    """
+
+    def __init__(self, supervisor: RendererSupervisor, startup: StartupState) -> None:
+        self.supervisor = supervisor
+        self.startup = startup
+        self.reloads = 0
+        self.failures = 0
+        self.last: dict[str, Any] | None = None
+        self._lock = asyncio.Lock()
+        self.logger = logging.getLogger("renderer.reload")
+
+    async def reload(self) -> dict[str, Any]:
+        if not self.startup.ready:
+            raise ReloadRejectedError("Renderer is still starting up.")
+        if self._lock.locked():
+            raise ReloadRejectedError("A reload is already running.")
+        async with self._lock:
+            current = self.supervisor.pipeline
+            try:
+                result = await anyio.to_thread.run_sync(
+                    lambda: rebuild_pipeline(
+                        current, pattern_atlas=settings.pattern_atlas
+                    )
+                )
+            except Exception as exc:
+                self.failures += 1
+                self.last = {"ok": False, "error": f"{type(exc).__name__}: {exc}"}
+                self.logger.exception("asset reload failed; keeping current assets")
+                raise
+            if result.pipeline is not None:
+                result.install()
+                self.supervisor.pipeline = result.pipeline
+                self.reloads += 1
+            self.last = {"ok": True, **result.report}
+            return self.last
+
+    async def watch(self, interval: float) -> None:
+        """Reload whenever an asset file's mtime or size changes."""
+
+        def signature() -> dict[str, tuple[int, int]]:
+            pipeline = self.supervisor.pipeline
+            return stat_assets(
+                pipeline.mapper.data_dir, pipeline.repository.sprite_root
+            )
+
+        seen = await anyio.to_thread.run_sync(signature)
+        while True:
+            await asyncio.sleep(interval)
+            current = await anyio.to_thread.run_sync(signature)
+            if current == seen or not self.startup.ready:
+                continue
+            try:
+                await self.reload()
+            except ReloadRejectedError:
+                continue  # retried on the next poll
+            except Exception:  # noqa: BLE001
+                self.logger.warning("watched assets failed to load; waiting for a fix")
+            seen = current
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "running": self._lock.locked(),
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last": self.last,
+        }
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Cat Generator V3 Renderer",
@@ -189,7 +507,13 @@ def create_app() -> FastAPI:
             {"name": "diagnostics", "description": "Health and operational metrics"},
         ],
     )
-    pipeline = RenderPipeline(canvas_size=settings.default_canvas_size)
+    startup = StartupState(
+        ready_fraction=settings.warmup_ready_fraction,
+        warmup=WarmupProgress() if settings.warmup_enabled else None,
+    )
+    # Accessory validation is deferred to StartupState.initialise so the
+    # factory stays cheap for autoscaled replicas.
+    pipeline = RenderPipeline(canvas_size=settings.default_canvas_size, validate=False)
     supervisor = RendererSupervisor(
         pipeline,
         max_queue_size=settings.max_queue_size
@@ -204,6 +528,9 @@ def create_app() -> FastAPI:
         else 12,
     )
 
+    reloader = AssetReloader(supervisor, startup)
+    scaled_cache = ScaledRenderCache(settings.scaled_cache_bytes)
+
     app.add_middleware(
         CORSMiddleware,
         allow_origins=settings.allowed_origins,
@@ -212,19 +539,133 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    background: list[asyncio.Task] = []
+
     @app.on_event("startup")
     async def _startup() -> None:
         await supervisor.start()
+        background.append(
+            asyncio.create_task(
+                run_warmup(
+                    startup,
+                    pipeline,
+                    supervisor,
+                    include_tiles=settings.warmup_tiles,
+                    tint_colours=settings.tint_cache_warm_colours,
+                    pattern_atlas=settings.pattern_atlas,
+                    pattern_workers=resolve_workers(settings.pattern_workers),
+                ),
+                name="renderer-warmup",
+            )
+        )
+        if settings.asset_watch_seconds > 0:
+            background.append(
+                asyncio.create_task(
+                    reloader.watch(settings.asset_watch_seconds),
+                    name="renderer-asset-watch",
+                )
+            )
 
     @app.on_event("shutdown")
     async def _shutdown() -> None:
+        for task in background:
+            task.cancel()
+        await asyncio.gather(*background, return_exceptions=True)
+        background.clear()
         await supervisor.stop()
 
+    app.state.startup = startup
+
     @app.get("/health", tags=["diagnostics"], summary="Service health check")
     def health() -> dict[str, Any]:
+        pipeline = supervisor.pipeline
         metrics = supervisor.metrics()
-        status_label = "degraded" if metrics["circuit_open"] else "ok"
-        return {"status": status_label, "metrics": metrics}
+        status_label = "degraded" if metrics["circuit_open"] or startup.error else "ok"
+        return {
+            "status": status_label,
+            "metrics": metrics,
+            "startup": startup.snapshot(),
+            "caches": {
+                "tint": pipeline.renderer.tint_cache.stats(),
+                "svg_tiles": get_tile_store().stats(),
+                "custom_colours": pipeline.renderer.custom_colours.stats(),
+                "scaled_renders": scaled_cache.stats(),
+            },
+            "palettes": {
+                "count": len(pipeline.mapper.palette_load_ms),
+                "load_ms": round(sum(pipeline.mapper.palette_load_ms.values()), 2),
+                "errors": pipeline.mapper.palette_errors,
+            },
+            "assets": pipeline.fingerprints.snapshot()
+            if pipeline.fingerprints
+            else None,
+            "reload": reloader.snapshot(),
+        }
+
+    @app.get(
+        "/ready",
+        tags=["diagnostics"],
+        summary="Readiness probe gated on warm-up progress",
+        responses={503: {"description": "Still warming up (or startup failed)"}},
+    )
+    def ready() -> JSONResponse:
+        snapshot = startup.snapshot()
+        return JSONResponse(
+            status_code=status.HTTP_200_OK
+            if startup.ready
+            else status.HTTP_503_SERVICE_UNAVAILABLE,
+            content={
+                "ready": snapshot["ready"],
+                "error": snapshot["error"],
+                "ready_fraction": snapshot["ready_fraction"],
+                "warmup": snapshot["warmup"],
+            },
+        )
+
+    @app.get(
+        "/aliases/unresolved",
+        tags=["diagnostics"],
+        summary="Declared accessory/scar names with no usable sprite",
+    )
+    def unresolved_aliases() -> dict:
+        pipeline = supervisor.pipeline
+        report = pipeline.mapper.unresolved_aliases(pipeline.repository)
+        return {
+            "counts": {
+                "accessory_aliases": len(pipeline.mapper.accessory_aliases),
+                "scar_aliases": len(pipeline.mapper.scar_aliases),
+            },
+            **report,
+        }
+
+    @app.post(
+        "/admin/reload",
+        tags=["diagnostics"],
+        summary="Hot-reload palettes, sprite data and sprite sheets",
+        responses={
+            409: {"description": "Still starting up, or a reload is already running"},
+            500: {
+                "description": "The new assets failed to load; the old ones stay live"
+            },
+        },
+    )
+    async def reload_assets() -> dict[str, Any]:
+        """Rebuild from the files on disk and swap in between jobs.
+
+        Only cache entries whose source assets changed are dropped. ``changed``
+        lists the assets that differ; an empty list means nothing was swapped.
+        """
+        try:
+            return await reloader.reload()
+        except ReloadRejectedError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT, detail=str(exc)
+            ) from None
+        except Exception as exc:  # noqa: BLE001 - logged by the reloader
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Reload failed: {exc}",
+            ) from None
 
     @app.post(
         "/render",
@@ -233,10 +674,12 @@ def create_app() -> FastAPI:
         summary="Render a single cat sprite",
     )
     async def render(request: RenderRequest) -> RenderResponse:
+        pipeline = supervisor.pipeline
+        plan = _compile_or_422(pipeline, request.payload)
         try:
             return await supervisor.submit(
                 "single",
-                lambda: _render_single(pipeline, request),
+                lambda: _render_single(pipeline, request, plan, scaled_cache),
             )
         except QueueOverloadedError:
             raise HTTPException(
@@ -256,10 +699,16 @@ def create_app() -> FastAPI:
         summary="Render a batch spritesheet",
     )
     async def render_batch(request: BatchRenderRequest) -> BatchRenderResponse:
+        pipeline = supervisor.pipeline
+        _validate_variant_expansion(pipeline, request)
+        variants, total_variants = _batch_variants(pipeline, request)
+        plans = _compile_batch_or_422(pipeline, request, variants)
         try:
             return await supervisor.submit(
                 "batch",
-                lambda: _render_batch(pipeline, request),
+                lambda: _render_batch(
+                    pipeline, request, variants, plans, total_variants, scaled_cache
+                ),
             )
         except QueueOverloadedError:
             raise HTTPException(
@@ -276,30 +725,249 @@ def create_app() -> FastAPI:
         "/diff",
         response_model=DiffResponse,
         tags=["rendering"],
-        summary="V2 vs V3 visual diff (not yet implemented)",
+        summary="Per-layer visual diff between two param sets",
     )
-    def diff(_: DiffRequest) -> DiffResponse:  # pragma: no cover - placeholder
-        raise NotImplementedError("V2 vs V3 diffing is not implemented yet")
+    async def diff(request: DiffRequest) -> DiffResponse:
+        pipeline = supervisor.pipeline
+        plans = _compile_pair_or_422(pipeline, request)
+        try:
+            return await supervisor.submit(
+                "single", lambda: pipeline.diff(request, plans)
+            )
+        except QueueOverloadedError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Renderer queue is full. Please retry shortly.",
+            ) from None
+        except CircuitOpenError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Renderer recovering from failures. Please retry.",
+            ) from None
+
+    @app.post(
+        "/diff/batch",
+        response_model=DiffBatchResponse,
+        tags=["rendering"],
+        summary="Diff many param pairs in one job",
+    )
+    async def diff_batch(request: DiffBatchRequest) -> DiffBatchResponse:
+        pipeline = supervisor.pipeline
+        plans = [
+            _compile_pair_or_422(pipeline, pair, where=f"pairs[{index}]")
+            for index, pair in enumerate(request.pairs)
+        ]
+        try:
+            results = await supervisor.submit(
+                "batch", lambda: pipeline.diff_batch(request.pairs, plans=plans)
+            )
+        except QueueOverloadedError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Renderer queue is full. Please retry shortly.",
+            ) from None
+        except CircuitOpenError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Renderer recovering from failures. Please retry.",
+            ) from None
+        return DiffBatchResponse(results=results)
+
+    @app.get(
+        "/palettes",
+        tags=["palettes"],
+        summary="List available color palettes",
+        responses={304: {"description": "Unchanged since the ETag in If-None-Match"}},
+    )
+    def get_palettes(request: Request) -> Response:
+        """Return all available color palettes with their metadata and colors.
 
-    @app.get("/palettes", tags=["palettes"], summary="List available color palettes")
-    def get_palettes() -> list[dict]:
-        """Return all available color palettes with their metadata and colors."""
-        return pipeline.mapper.get_palette_metadata()
+        Each colour carries ``swatch: [x, y, width, height]``, its thumbnail's
+        rectangle in ``/palettes/swatches.png``.
+        """
+        catalog = supervisor.pipeline.palettes
+        return _conditional_response(
+            request, catalog.body, catalog.etag, "application/json"
+        )
+
+    @app.get(
+        "/palettes/swatches.png",
+        tags=["palettes"],
+        summary="Swatch sheet with a thumbnail of every palette colour",
+        response_class=Response,
+        responses={
+            200: {"content": {"image/png": {}}},
+            304: {"description": "Unchanged since the ETag in If-None-Match"},
+        },
+    )
+    async def get_palette_swatches(request: Request) -> Response:
+        catalog = supervisor.pipeline.palettes
+        # Rendered on first use unless warm-up got there first.
+        body, etag = await anyio.to_thread.run_sync(catalog.swatch_sheet)
+        return _conditional_response(request, body, etag, "image/png")
+
+    @app.post(
+        "/palettes/preview",
+        response_model=BatchRenderResponse,
+        tags=["palettes"],
+        summary="Render a reference cat in every colour of a palette",
+    )
+    async def palette_preview(request: PalettePreviewRequest) -> BatchRenderResponse:
+        """One frame per palette colour (frame ids are colour keys), rendered in a single pass."""
+        pipeline = supervisor.pipeline
+        if request.palette not in pipeline.mapper.experimental_categories:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Unknown palette {request.palette!r}",
+            )
+        _compile_or_422(pipeline, request.payload)
+        base_params = {**request.payload.params}
+        base_params.setdefault("spriteNumber", request.payload.spriteNumber)
+        try:
+            return await supervisor.submit(
+                "batch",
+                lambda: _batch_response(
+                    pipeline.render_palette_preview(
+                        base_params,
+                        request.palette,
+                        columns=request.columns,
+                        scale=request.scale,
+                    )
+                ),
+            )
+        except QueueOverloadedError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Renderer queue is full. Please retry shortly.",
+            ) from None
+        except CircuitOpenError:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Renderer recovering from failures. Please retry.",
+            ) from None
 
     return app
 
 
-def _render_single(pipeline: RenderPipeline, request: RenderRequest) -> RenderResponse:
-    payload = request.payload
-    params = {**payload.params}
-    params.setdefault("spriteNumber", payload.spriteNumber)
+def _conditional_response(
+    request: Request, body: bytes, etag: str, media_type: str
+) -> Response:
+    """``body`` with a strong ETag, or 304 when the client already holds it."""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in tags or "*" in tags:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _compile_or_422(
+    pipeline: RenderPipeline, payload: RenderParams, *, where: str | None = None
+) -> RenderPlan:
+    """Compile on the event loop so malformed params never reach a worker."""
+    try:
+        return pipeline.compile_payload(payload)
+    except PlanCompileError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"{where}: {exc}" if where else str(exc),
+        ) from None
+
+
+def _compile_pair_or_422(
+    pipeline: RenderPipeline, request: DiffRequest, *, where: str | None = None
+) -> tuple[RenderPlan, RenderPlan]:
+    prefix = f"{where}." if where else ""
+    return (
+        _compile_or_422(pipeline, request.v2, where=f"{prefix}v2"),
+        _compile_or_422(pipeline, request.v3, where=f"{prefix}v3"),
+    )
+
+
+def _batch_base_params(request: BatchRenderRequest) -> dict:
+    base_params = {**request.payload.params}
+    base_params.setdefault("spriteNumber", request.payload.spriteNumber)
+    return base_params
+
+
+def _batch_variants(
+    pipeline: RenderPipeline, request: BatchRenderRequest
+) -> tuple[list[BatchVariant], int | None]:
+    """The request's variants, or its page of the layer catalog, plus the catalog size."""
+    if not _wants_expansion(request):
+        return list(request.variants), None
+    options = request.options
+    return pipeline.catalog.expand(
+        _coerce_layer_identifier(options.layer_id),
+        _batch_base_params(request),
+        offset=options.variant_offset,
+        limit=options.variant_limit,
+    )
+
+
+def _compile_batch_or_422(
+    pipeline: RenderPipeline,
+    request: BatchRenderRequest,
+    variants: list[BatchVariant],
+) -> list[RenderPlan]:
+    """Compile the base frame and every variant on the event loop (see ``_compile_or_422``)."""
+    try:
+        return pipeline.compile_batch(
+            _batch_base_params(request),
+            variants,
+            request.options.include_base if request.options else True,
+        )
+    except PlanCompileError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        ) from None
+
+
+def _render_single(
+    pipeline: RenderPipeline,
+    request: RenderRequest,
+    plan: RenderPlan,
+    scaled_cache: ScaledRenderCache | None = None,
+) -> RenderResponse:
     collect_layers = request.options.collect_layers if request.options else False
     include_layer_images = (
         request.options.include_layer_images if request.options else False
     )
+    scale = request.options.scale if request.options else 1
 
-    result = pipeline.render(params, collect_layers=collect_layers)
-    image_bytes = _image_to_data_url(result.composed)
+    cache_key = None
+    if scaled_cache is not None and scale > 1 and not collect_layers:
+        started = time.perf_counter()
+        cache_key = (
+            plan,
+            scale,
+            request.options.hi_res_patterns,
+            pipeline.fingerprints.global_digest if pipeline.fingerprints else None,
+        )
+        cached = scaled_cache.get(cache_key)
+        if cached is not None:
+            finished = time.perf_counter()
+            return RenderResponse(
+                image=cached,
+                meta=RenderMeta(
+                    started_at=started,
+                    finished_at=finished,
+                    duration_ms=(finished - started) * 1000,
+                    memory_pressure=False,
+                    assets=cache_key[3],
+                ),
+            )
+
+    if scale > 1 and request.options.hi_res_patterns:
+        # Already composed at the output size; nothing left to upscale.
+        result = pipeline.render_plan(plan, collect_layers=collect_layers, scale=scale)
+        scale = 1
+    else:
+        result = pipeline.render_plan(plan, collect_layers=collect_layers)
+    image_bytes = _image_to_data_url(result.composed, scale)
+    if cache_key is not None:
+        scaled_cache.put(cache_key, image_bytes)
     return RenderResponse(
         image=image_bytes,
         meta=result.meta,
@@ -310,7 +978,7 @@ def _render_single(pipeline: RenderPipeline, request: RenderRequest) -> RenderRe
                 "duration_ms": layer.duration_ms,
                 "diagnostics": layer.diagnostics,
                 "blend_mode": layer.blend_mode,
-                "image": _image_to_data_url(layer.image)
+                "image": _image_to_data_url(layer.image, scale)
                 if include_layer_images
                 else None,
             }
@@ -322,29 +990,64 @@ def _render_single(pipeline: RenderPipeline, request: RenderRequest) -> RenderRe
 
 
 def _render_batch(
-    pipeline: RenderPipeline, request: BatchRenderRequest
+    pipeline: RenderPipeline,
+    request: BatchRenderRequest,
+    variants: list[BatchVariant],
+    plans: list[RenderPlan],
+    total_variants: int | None = None,
+    scaled_cache: ScaledRenderCache | None = None,
 ) -> BatchRenderResponse:
-    base_params = {**request.payload.params}
-    base_params.setdefault("spriteNumber", request.payload.spriteNumber)
-
     options = request.options
     frame_mode = options.frame_mode if options else "composed"
     layer_identifier: Optional[LayerIdentifier] = None
     if options and options.layer_id is not None:
         layer_identifier = _coerce_layer_identifier(options.layer_id)
 
+    cache_key = None
+    _native_tile, scale = pipeline.resolve_scale(
+        options.tile_size if options else None, options.scale if options else None
+    )
+    if scaled_cache is not None and scale > 1:
+        cache_key = (
+            "batch",
+            tuple(plans),
+            tuple((variant.id, variant.label, variant.group) for variant in variants),
+            options.include_base,
+            frame_mode,
+            layer_identifier,
+            options.tile_size,
+            options.columns,
+            options.include_sources,
+            scale,
+            total_variants,
+            pipeline.fingerprints.global_digest if pipeline.fingerprints else None,
+        )
+        cached = scaled_cache.get(cache_key)
+        if cached is not None:
+            return BatchRenderResponse.model_validate_json(cached)
+
     batch_result = pipeline.render_batch(
-        base_params,
-        request.variants,
+        _batch_base_params(request),
+        variants,
         include_base=options.include_base if options else True,
         tile_size=options.tile_size if options else None,
         columns=options.columns if options else None,
         include_sources=options.include_sources if options else False,
         frame_mode=frame_mode,
         layer_identifier=layer_identifier,
+        scale=options.scale if options else None,
+        plans=plans,
     )
+    response = _batch_response(batch_result, total_variants)
+    if cache_key is not None:
+        scaled_cache.put(cache_key, response.model_dump_json())
+    return response
+
 
-    sheet_data = _image_to_data_url(batch_result.sheet)
+def _batch_response(
+    batch_result: BatchPipelineResult, total_variants: int | None = None
+) -> BatchRenderResponse:
+    sheet_data = _image_to_data_url(batch_result.sheet, batch_result.scale)
     frames = [
         SpritesheetFrame(
             id=frame.id,
@@ -364,24 +1067,67 @@ def _render_batch(
     sources = None
     if batch_result.sources:
         sources = [
-            FrameSource(id=frame_id, image=_image_to_data_url(image))
-            for frame_id, image in batch_result.sources
+            FrameSource(
+                id=frame_id, image=_image_to_data_url(image, batch_result.scale)
+            )
+            for frame_id, image in batch_result.iter_source_images()
         ]
 
     return BatchRenderResponse(
         sheet=sheet_data,
-        width=batch_result.sheet.width,
-        height=batch_result.sheet.height,
+        width=batch_result.width,
+        height=batch_result.height,
         tileSize=batch_result.tile_size,
         frames=frames,
         sources=sources,
+        totalVariants=total_variants,
+    )
+
+
+def _wants_expansion(request: BatchRenderRequest) -> bool:
+    return bool(
+        request.options and request.options.expand_variants and not request.variants
     )
 
 
-def _image_to_data_url(image) -> str:
-    import base64
-    from io import BytesIO
+def _validate_variant_expansion(
+    pipeline: RenderPipeline, request: BatchRenderRequest
+) -> None:
+    """Reject bad expansion requests on the event loop instead of in a worker."""
+    if not _wants_expansion(request):
+        return
+    options = request.options
+    if options.layer_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="expandVariants requires layerId.",
+        )
+    try:
+        layer = _coerce_layer_identifier(options.layer_id)
+    except ValueError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc)
+        ) from None
+    if not pipeline.catalog.supports(layer):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Layer '{layer.value}' does not support variant expansion.",
+        )
+    total = len(pipeline.catalog.layers[layer].entries)
+    if options.variant_offset >= total and not options.include_base:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"variantOffset {options.variant_offset} is past the end of the catalog ({total}).",
+        )
+
+
+def _image_to_data_url(image, scale: int = 1) -> str:
+    if scale > 1:
+        return _encode_png(upscale_nearest(image, scale))
+    return _encode_png(image)
+
 
+def _encode_png(image) -> str:
     buffer = BytesIO()
     image.save(buffer, format="PNG")
     encoded = base64.b64encode(buffer.getvalue()).decode("ascii")
@@ -27,8 +27,10 @@ class Settings(BaseSettings):
         description="Filesystem path to the Lifegen sprite directory"
     )
     cache_dir: Path = Field(
-        default_factory=lambda: Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "cat-renderer",
-        description="Directory used for hashed render caches (PNG)"
+        default_factory=lambda: (
+            Path(os.getenv("XDG_CACHE_HOME", Path.home() / ".cache")) / "cat-renderer"
+        ),
+        description="Directory used for persistent caches (pattern atlas, asset manifest, rasterised pattern tiles)",
     )
     default_canvas_size: int = Field(50, ge=32, le=200)
     enable_cache: bool = Field(True)
@@ -36,6 +38,78 @@ class Settings(BaseSettings):
     worker_count: int = Field(4, ge=1, le=32)
     circuit_failure_threshold: int = Field(8, ge=3, le=50)
     circuit_reset_seconds: int = Field(12, ge=3, le=120)
+    warmup_enabled: bool = Field(
+        True, description="Run background warm-up after startup"
+    )
+    warmup_ready_fraction: float = Field(
+        1.0,
+        ge=0.0,
+        le=1.0,
+        description="Fraction of warm-up tasks that must finish before /ready reports ready",
+    )
+    warmup_tiles: bool = Field(
+        True,
+        description="Slice every sprite for every pose during warm-up (~180 MB of tiles)",
+    )
+    tint_cache_size: int = Field(
+        2048,
+        ge=0,
+        le=65536,
+        description="Tinted pelt tiles kept in memory (~10 KB each at 50 px); 0 disables",
+    )
+    tint_cache_warm_colours: list[str] = Field(
+        default_factory=list,
+        description="Palette colours whose pelt tiles are tinted for every pose during warm-up",
+    )
+    pattern_atlas: bool = Field(
+        True,
+        description="Load the precompiled pattern atlas at startup and rebuild stale entries during warm-up",
+    )
+    pattern_workers: int = Field(
+        0,
+        ge=0,
+        le=64,
+        description="Processes used to pre-generate pattern tiles during warm-up; 0 uses half the available cores, 1 stays in-process",
+    )
+    custom_pattern_max_tile_size: int = Field(
+        64,
+        ge=1,
+        le=256,
+        description="Largest tileSize accepted in an inline custom pattern",
+    )
+    custom_pattern_max_stripes: int = Field(
+        16,
+        ge=0,
+        le=256,
+        description="Most stripes accepted in an inline custom pattern",
+    )
+    custom_pattern_svg_per_request: int = Field(
+        2,
+        ge=0,
+        le=32,
+        description="Uncached SVG custom patterns one render request may introduce",
+    )
+    custom_pattern_generation_ms: float = Field(
+        250.0,
+        gt=0,
+        description="Custom patterns estimated or measured to take longer than this to generate are refused",
+    )
+    custom_colour_cache_size: int = Field(
+        256,
+        ge=0,
+        le=8192,
+        description="Inline custom colours kept, with their tiles, in an LRU; 0 shares nothing between requests",
+    )
+    scaled_cache_bytes: int = Field(
+        32 * 1024 * 1024,
+        ge=0,
+        description="Bytes of encoded /render previews and /render/batch responses at scale > 1 kept in an LRU keyed by plan; 0 disables",
+    )
+    asset_watch_seconds: float = Field(
+        0.0,
+        ge=0.0,
+        description="Poll the sprite and data files this often and hot-reload them on change; 0 disables",
+    )
     allowed_origins: list[str] = Field(
         default_factory=lambda: [
             "http://localhost:3000",
@@ -43,6 +43,20 @@ class RenderOptions(BaseModel):
         description="Embed PNG data for each collected layer",
         alias="includeLayerImages",
     )
+    scale: int = Field(
+        1,
+        ge=1,
+        le=16,
+        description="Integer nearest-neighbour upscale factor applied right before encoding",
+    )
+    hi_res_patterns: bool = Field(
+        False,
+        description=(
+            "With scale > 1, composite at the scaled size so palette patterns are "
+            "generated at that resolution instead of upscaled from 50 px"
+        ),
+        alias="hiResPatterns",
+    )
 
     model_config = ConfigDict(
         populate_by_name=True,
@@ -76,6 +90,8 @@ class RenderMeta(BaseModel):
     finished_at: float
     duration_ms: float
     memory_pressure: bool
+    # Global asset digest of the sprites and data the render was produced from.
+    assets: str | None = None
 
 
 class RenderResponse(BaseModel):
@@ -103,6 +119,14 @@ class DiffResponse(BaseModel):
     layers: List[DiffLayerResult]
 
 
+class DiffBatchRequest(BaseModel):
+    pairs: list[DiffRequest] = Field(..., min_length=1, max_length=1000)
+
+
+class DiffBatchResponse(BaseModel):
+    results: list[DiffResponse]
+
+
 class BatchVariant(BaseModel):
     id: str = Field(..., description="Unique identifier for the variant frame")
     label: Optional[str] = Field(
@@ -137,6 +161,16 @@ class BatchRenderOptions(BaseModel):
         description="Output tile size in pixels. Defaults to renderer tile size (50).",
         ge=1,
     )
+    scale: int | None = Field(
+        default=None,
+        description=(
+            "Integer nearest-neighbour upscale factor. Frames render at the native "
+            "canvas size and the sheet is scaled once before encoding; takes "
+            "precedence over tileSize."
+        ),
+        ge=1,
+        le=16,
+    )
     columns: Optional[int] = Field(
         default=None,
         description="Desired column count when packing frames into the sheet.",
@@ -167,6 +201,18 @@ class BatchRenderOptions(BaseModel):
         alias="expandVariants",
         description="When true and variants are omitted, the backend expands all known variants for the requested layer.",
     )
+    variant_offset: int = Field(
+        default=0,
+        alias="variantOffset",
+        description="First catalog entry to render when expandVariants is set.",
+        ge=0,
+    )
+    variant_limit: int | None = Field(
+        default=None,
+        alias="variantLimit",
+        description="Maximum number of expanded variants to render (page size).",
+        ge=1,
+    )
 
     model_config = ConfigDict(populate_by_name=True, extra="ignore")
 
@@ -177,6 +223,21 @@ class BatchRenderRequest(BaseModel):
     options: Optional[BatchRenderOptions] = None
 
 
+class PalettePreviewRequest(BaseModel):
+    palette: str = Field(..., description="Palette id, as listed by GET /palettes")
+    payload: RenderParams = Field(
+        ...,
+        description="Reference cat (pose and pelt); its colour is replaced by each palette colour",
+    )
+    columns: int | None = Field(default=None, ge=1, description="Sheet column count")
+    scale: int | None = Field(
+        default=None,
+        ge=1,
+        le=16,
+        description="Integer nearest-neighbour upscale of the sheet",
+    )
+
+
 class SpritesheetFrame(BaseModel):
     id: str
     label: Optional[str] = None
@@ -202,3 +263,7 @@ class BatchRenderResponse(BaseModel):
     tileSize: int
     frames: List[SpritesheetFrame]
     sources: Optional[List[FrameSource]] = None
+    totalVariants: int | None = Field(
+        default=None,
+        description="Catalog size for the layer when variants were expanded server-side.",
+    )
@@ -1,5 +1,6 @@
 """Renderer pipeline exports."""
 
 from .pipeline import RenderPipeline
+from .plan import PlanCompileError, RenderPlan
 
-__all__ = ["RenderPipeline"]
+__all__ = ["PlanCompileError", "RenderPipeline", "RenderPlan"]
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass
+
+from ..models import BatchVariant, LayerIdentifier
+from .repository import SpriteRepository
+from .sprite_mapper import SpriteMapper
+from .v3_renderer import SCARS_PRIMARY, SCARS_SECONDARY, _normalize_scar
+
+logger = logging.getLogger("renderer.catalog")
+
+
+@dataclass(frozen=True)
+class CatalogEntry:
+    """One selectable option for a layer, resolved once at startup."""
+
+    label: str
+    # Value written into the render params; chosen so the renderer resolves
+    # it on its first lookup (e.g. the atlas key for accessories).
+    value: str
+    sprite_key: str
+
+
+@dataclass(frozen=True)
+class LayerCatalog:
+    identifier: LayerIdentifier
+    param: str
+    # List params (accessories, scars) append the option to the base list.
+    is_list: bool
+    entries: tuple[CatalogEntry, ...]
+
+
+class VariantCatalog:
+    """Per-layer option lists used to expand batch variants server-side."""
+
+    def __init__(self, layers: dict[LayerIdentifier, LayerCatalog]) -> None:
+        self.layers = layers
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def build(
+        cls, mapper: SpriteMapper, repository: SpriteRepository
+    ) -> VariantCatalog:
+        def exists(key: str | None) -> str | None:
+            return key if key and repository.has_sprite(key) else None
+
+        def white(name: str) -> str | None:
+            return exists(mapper.build_sprite_name("white", name, None))
+
+        def accessory(name: str) -> str | None:
+            return mapper.resolve_accessory(name)
+
+        def scar(name: str) -> str | None:
+            normalized = _normalize_scar(name)
+            if normalized not in SCARS_PRIMARY:
+                return None
+            return mapper.resolve_scar(normalized)
+
+        def missing_scar(name: str) -> str | None:
+            normalized = _normalize_scar(name)
+            if normalized not in SCARS_SECONDARY:
+                return None
+            key = f"scars{normalized}"
+            return key if key in mapper.sprite_index else None
+
+        specs: Iterable[
+            tuple[
+                LayerIdentifier, str, bool, list[str], Callable[[str], str | None], bool
+            ]
+        ] = (
+            (
+                LayerIdentifier.accessories,
+                "accessories",
+                True,
+                mapper.accessories,
+                accessory,
+                True,
+            ),
+            (LayerIdentifier.scars_primary, "scars", True, mapper.scars, scar, False),
+            (
+                LayerIdentifier.scars_secondary,
+                "scars",
+                True,
+                mapper.scars,
+                missing_scar,
+                False,
+            ),
+            (
+                LayerIdentifier.white_patches,
+                "whitePatches",
+                False,
+                mapper.white_patches,
+                white,
+                False,
+            ),
+            (LayerIdentifier.points, "points", False, mapper.points, white, False),
+            (
+                LayerIdentifier.vitiligo,
+                "vitiligo",
+                False,
+                mapper.vitiligo,
+                white,
+                False,
+            ),
+            (
+                LayerIdentifier.eyes,
+                "eyeColour",
+                False,
+                mapper.eye_colours,
+                lambda colour: exists(mapper.build_sprite_name("eyes", None, colour)),
+                False,
+            ),
+            (
+                LayerIdentifier.skin,
+                "skinColour",
+                False,
+                mapper.skin_colours,
+                lambda colour: exists(mapper.build_sprite_name("skin", None, colour)),
+                False,
+            ),
+        )
+
+        layers: dict[LayerIdentifier, LayerCatalog] = {}
+        for identifier, param, is_list, options, resolve, value_is_key in specs:
+            entries: list[CatalogEntry] = []
+            seen: set[str] = set()
+            unresolved = 0
+            for option in options:
+                sprite_key = resolve(option)
+                if not sprite_key:
+                    unresolved += 1
+                    continue
+                if sprite_key in seen:
+                    continue
+                seen.add(sprite_key)
+                value = sprite_key if value_is_key else option
+                entries.append(
+                    CatalogEntry(label=option, value=value, sprite_key=sprite_key)
+                )
+            if unresolved:
+                logger.debug(
+                    "variant catalog %s: %d options without sprites skipped",
+                    identifier.value,
+                    unresolved,
+                )
+            layers[identifier] = LayerCatalog(
+                identifier, param, is_list, tuple(entries)
+            )
+        return cls(layers)
+
+    # ------------------------------------------------------------------
+    def supports(self, identifier: LayerIdentifier) -> bool:
+        return identifier in self.layers
+
+    def expand(
+        self,
+        identifier: LayerIdentifier,
+        base_params: dict,
+        *,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[list[BatchVariant], int]:
+        """Return one variant per catalog entry (paginated) plus the total count."""
+        layer = self.layers.get(identifier)
+        if layer is None:
+            raise ValueError(
+                f"Layer '{identifier.value}' does not support variant expansion"
+            )
+
+        total = len(layer.entries)
+        stop = total if limit is None else min(total, offset + limit)
+        page = layer.entries[offset:stop]
+
+        base_list: list[str] = []
+        if layer.is_list and isinstance(base_params.get(layer.param), list):
+            base_list = [
+                str(item)
+                for item in base_params[layer.param]
+                if item and item != "none"
+            ]
+
+        variants: list[BatchVariant] = []
+        for entry in page:
+            if layer.is_list:
+                already = entry.value in base_list or entry.label in base_list
+                values = base_list if already else [*base_list, entry.value]
+                overrides: dict = {layer.param: values}
+                if layer.param == "accessories":
+                    overrides["accessory"] = values[0]
+            else:
+                overrides = {layer.param: entry.value}
+            # model_construct skips pydantic validation; entries are trusted.
+            variants.append(
+                BatchVariant.model_construct(
+                    id=f"{identifier.value}:{entry.sprite_key}",
+                    label=entry.label,
+                    group=identifier.value,
+                    sprite_number=None,
+                    overrides=overrides,
+                    params=None,
+                )
+            )
+        return variants, total
+
+
+__all__ = ["CatalogEntry", "LayerCatalog", "VariantCatalog"]
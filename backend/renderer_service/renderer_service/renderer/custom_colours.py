@@ -0,0 +1,325 @@
+"""Palette colours supplied inline in render params.
+
+Anywhere params take a palette colour key (``colour``, ``tortieColour``, a
+tortie layer's ``colour``) they also accept an object shaped like a palette
+entry::
+
+    {"pattern": {"type": "tartan", "tileSize": 16, ...}, "overlay": [200, 40, 40, 0.3]}
+
+The object is validated at compile time, checked against cost limits
+(including an estimate of its generation time, before anything is generated)
+and registered under a content hash (``CUSTOM:<digest>``). The plan keys its
+layers and caches by that hash and keeps the definition itself alongside, so
+it still renders when the registry has dropped the entry. Repeated
+definitions, such as one per keystroke in an editor, resolve to the same
+entry, so its pattern tile and tinted pelts are reused instead of
+regenerated. With ``maxsize=0`` nothing is shared between requests.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from ..config import settings
+from .patterns import SPRITE_SIZE, VECTOR_PATTERN_TYPES, PatternDefinition
+from .plan import PlanCompileError
+from .sprite_mapper import ExperimentalColourDefinition
+
+logger = logging.getLogger("renderer.custom_colours")
+
+CUSTOM_PREFIX = "CUSTOM:"
+# Pixel-unit fields. Stripes and offsets wrap around the tile (at most 256
+# px) and spacing wraps around the 50 px sprite, so larger values only add work.
+MAX_STRIPE_WIDTH = 256
+MAX_TOTAL_STRIPE_WIDTH = 512
+MAX_OFFSET = 256
+MAX_SPACING = 64
+# Cost model for the pre-generation time check: one pixel pass is one
+# read-modify-write of a tile pixel. Rasterising through cairo and decoding
+# the PNG costs about this many passes per pixel.
+SVG_PIXEL_PASSES = 40
+# Deliberately slow generation rate, so the estimate errs towards refusing.
+PIXEL_PASSES_PER_MS = 100_000
+
+
+@dataclass(frozen=True)
+class CustomPatternLimits:
+    max_tile_size: int = 64
+    max_stripes: int = 16
+    # Uncached SVG (cairo) patterns one request may introduce.
+    svg_per_request: int = 2
+    # A definition whose tile takes longer than this is refused from then on.
+    generation_ms: float = 250.0
+
+    @classmethod
+    def from_settings(cls) -> CustomPatternLimits:
+        return cls(
+            max_tile_size=settings.custom_pattern_max_tile_size,
+            max_stripes=settings.custom_pattern_max_stripes,
+            svg_per_request=settings.custom_pattern_svg_per_request,
+            generation_ms=settings.custom_pattern_generation_ms,
+        )
+
+
+@dataclass
+class CustomColourDefinition(ExperimentalColourDefinition):
+    """Inline colour; times its first tile generation against the registry limit."""
+
+    registry: CustomColourRegistry | None = field(
+        default=None, repr=False, compare=False
+    )
+    digest: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{CUSTOM_PREFIX}{self.digest}"
+
+    def pattern_tile(
+        self, width: int, height: int, scale: int = 1
+    ) -> np.ndarray | None:
+        if scale > 1 or (width, height) in self._pattern_tiles:
+            return super().pattern_tile(width, height, scale)
+        started = time.perf_counter()
+        tile = super().pattern_tile(width, height, scale)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if self.registry is not None:
+            self.registry._record_generation(self, elapsed_ms)
+        return tile
+
+
+class CustomColourRegistry:
+    """Bounded LRU of validated inline colours keyed by content hash."""
+
+    def __init__(
+        self, limits: CustomPatternLimits | None = None, maxsize: int = 256
+    ) -> None:
+        self.limits = limits or CustomPatternLimits()
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, CustomColourDefinition] = OrderedDict()
+        # Digest -> generation time of definitions that blew the time limit.
+        self._too_slow: dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+
+    # ------------------------------------------------------------------
+    def register(self, raw: object) -> CustomColourDefinition:
+        """Validate ``raw`` and return its definition; raises PlanCompileError.
+
+        An equal definition already held is returned instead of the new one,
+        so generated tiles are shared. With ``maxsize=0`` the definition is
+        returned without being kept.
+        """
+        definition = self._build(raw)
+        key = definition.key
+        with self._lock:
+            if definition.digest in self._too_slow:
+                self.rejected += 1
+                raise PlanCompileError(
+                    f"custom pattern took {self._too_slow[definition.digest]:.0f} ms to generate "
+                    f"(limit {self.limits.generation_ms:.0f} ms)"
+                )
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            if self.maxsize > 0:
+                self._entries[key] = definition
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return definition
+
+    def get(self, key: str) -> CustomColourDefinition | None:
+        with self._lock:
+            return self._entries.get(key.upper())
+
+    @staticmethod
+    def needs_rasterising(definition: CustomColourDefinition, size: int) -> bool:
+        """True when the colour's pattern is SVG and has no tile at ``size`` yet."""
+        return (
+            definition.pattern_definition is not None
+            and definition.pattern_definition.type in VECTOR_PATTERN_TYPES
+            and (size, size) not in definition._pattern_tiles
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rejected": self.rejected,
+                "too_slow": len(self._too_slow),
+            }
+
+    # ------------------------------------------------------------------
+    def _record_generation(
+        self, definition: CustomColourDefinition, elapsed_ms: float
+    ) -> None:
+        if elapsed_ms <= self.limits.generation_ms:
+            return
+        logger.warning(
+            "custom pattern %s took %.0f ms (limit %.0f ms); refusing it from now on",
+            definition.pattern,
+            elapsed_ms,
+            self.limits.generation_ms,
+        )
+        with self._lock:
+            self._too_slow[definition.digest] = elapsed_ms
+            self._entries.pop(definition.key, None)
+
+    def _build(self, raw: object) -> CustomColourDefinition:
+        if not isinstance(raw, dict) or not isinstance(raw.get("pattern"), dict):
+            raise PlanCompileError(
+                "custom colours must be objects with a 'pattern' object"
+            )
+        pattern = raw["pattern"]
+        self._check_pattern(pattern)
+        try:
+            pattern_definition = PatternDefinition.from_dict(pattern)
+        except (KeyError, TypeError, ValueError) as exc:
+            raise PlanCompileError(f"invalid custom pattern: {exc}") from None
+        estimated_ms = estimated_pixel_work(pattern_definition) / PIXEL_PASSES_PER_MS
+        if estimated_ms > self.limits.generation_ms:
+            with self._lock:
+                self.rejected += 1
+            raise PlanCompileError(
+                f"custom pattern would take about {estimated_ms:.0f} ms to generate "
+                f"(limit {self.limits.generation_ms:.0f} ms)"
+            )
+
+        blends = {
+            name: _blend_values(name, raw.get(name))
+            for name in ("multiply", "screen", "overlay")
+        }
+        digest = hashlib.sha1(
+            repr((pattern_definition, sorted(blends.items()))).encode("utf-8")
+        )
+        return CustomColourDefinition(
+            base_colour="WHITE",
+            pattern=pattern,
+            pattern_definition=pattern_definition,
+            registry=self,
+            digest=digest.hexdigest()[:20].upper(),
+            **blends,
+        )
+
+    def _check_pattern(self, pattern: dict) -> None:
+        limits = self.limits
+        tile_size = pattern.get("tileSize", 8)
+        if isinstance(tile_size, int) and tile_size > limits.max_tile_size:
+            raise PlanCompileError(
+                f"custom pattern tileSize {tile_size} exceeds the limit of {limits.max_tile_size}"
+            )
+        stripes = pattern.get("stripes", [])
+        if not isinstance(stripes, list):
+            raise PlanCompileError("custom pattern 'stripes' must be a list")
+        if len(stripes) > limits.max_stripes:
+            raise PlanCompileError(
+                f"custom pattern has {len(stripes)} stripes; the limit is {limits.max_stripes}"
+            )
+        for name in ("background", "foreground"):
+            if pattern.get(name) is not None:
+                _check_rgb(f"pattern.{name}", pattern[name])
+        total_width = 0
+        for index, stripe in enumerate(stripes):
+            if not isinstance(stripe, dict):
+                raise PlanCompileError(
+                    f"custom pattern stripe {index} must be an object"
+                )
+            _check_rgb(f"stripes[{index}].color", stripe.get("color"))
+            width = stripe.get("width", 1)
+            _check_int(f"stripes[{index}].width", width, 0, MAX_STRIPE_WIDTH)
+            _check_int(
+                f"stripes[{index}].offset",
+                stripe.get("offset", 0),
+                -MAX_OFFSET,
+                MAX_OFFSET,
+            )
+            total_width += width
+        if total_width > MAX_TOTAL_STRIPE_WIDTH:
+            raise PlanCompileError(
+                f"custom pattern stripes are {total_width} px wide in total; "
+                f"the limit is {MAX_TOTAL_STRIPE_WIDTH}"
+            )
+        _check_int("pattern.spacing", pattern.get("spacing", 6), 1, MAX_SPACING)
+
+
+def estimated_pixel_work(definition: PatternDefinition) -> int:
+    """Pixel passes needed to generate ``definition``'s tile.
+
+    A tile is filled once; each stripe blends the rows and columns it covers,
+    once per time it wraps around the tile.
+    """
+    size = (
+        SPRITE_SIZE
+        if definition.type in ("chevron", "diagonal")
+        else definition.tile_size
+    )
+    passes = 1 + (SVG_PIXEL_PASSES if definition.type in VECTOR_PATTERN_TYPES else 0)
+    for stripe in definition.stripes:
+        if stripe.width > 0:
+            passes += 2 * math.ceil(stripe.width / size)
+    return size * size * passes
+
+
+def _check_int(name: str, value: object, low: int, high: int) -> None:
+    if (
+        isinstance(value, bool)
+        or not isinstance(value, int)
+        or not low <= value <= high
+    ):
+        raise PlanCompileError(
+            f"custom pattern {name} must be an integer in [{low}, {high}], got {value!r}"
+        )
+
+
+def _check_rgb(name: str, value: object) -> None:
+    if (
+        not isinstance(value, (list, tuple))
+        or len(value) != 3
+        or not all(
+            isinstance(v, int) and not isinstance(v, bool) and 0 <= v <= 255
+            for v in value
+        )
+    ):
+        raise PlanCompileError(
+            f"custom pattern {name} must be three integers 0-255, got {value!r}"
+        )
+
+
+def _blend_values(name: str, value: object) -> list[float] | None:
+    if value is None:
+        return None
+    if (
+        not isinstance(value, (list, tuple))
+        or len(value) not in (3, 4)
+        or not all(
+            isinstance(v, (int, float)) and not isinstance(v, bool) for v in value
+        )
+        or not all(0 <= v <= 255 for v in value)
+    ):
+        raise PlanCompileError(
+            f"custom colour {name} must be 3 or 4 numbers 0-255, got {value!r}"
+        )
+    return [float(v) for v in value]
+
+
+__all__ = [
+    "CUSTOM_PREFIX",
+    "CustomColourDefinition",
+    "CustomColourRegistry",
+    "CustomPatternLimits",
+    "estimated_pixel_work",
+]
@@ -0,0 +1,221 @@
+"""Content fingerprints of the sprite and data files a pipeline is built from.
+
+Assets are keyed by their path relative to the asset roots
+(``sprites/<sheet>.png``, ``data/<name>.json``, ``data/palettes/<id>.json``),
+so two fingerprint sets can be diffed to find what a content update touched.
+The global digest covers every asset and identifies a deployment's asset
+version: it is stamped on render metadata and reported on ``/health``, so
+replicas serving different assets stand out.
+
+Hashing ~15 MB of sheets on every start is avoidable: a manifest under
+``cache_dir`` records each file's mtime, size and digest, and only files
+whose mtime or size moved are read again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+logger = logging.getLogger("renderer.fingerprints")
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = "asset-manifest.json"
+
+
+def asset_files(data_dir: Path, sprite_root: Path) -> dict[str, Path]:
+    """Every fingerprinted asset, keyed by its root-relative name."""
+    files: dict[str, Path] = {}
+    for prefix, directory, pattern in (
+        ("sprites", sprite_root, "*.png"),
+        ("data", data_dir, "*.json"),
+        ("data/palettes", data_dir / "palettes", "*.json"),
+    ):
+        for path in sorted(directory.glob(pattern)):
+            files[f"{prefix}/{path.name}"] = path
+    return files
+
+
+def file_digest(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def stat_assets(data_dir: Path, sprite_root: Path) -> dict[str, tuple[int, int]]:
+    """``{asset: (mtime_ns, size)}``; a cheap signature for polling."""
+    signature: dict[str, tuple[int, int]] = {}
+    for name, path in asset_files(data_dir, sprite_root).items():
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        signature[name] = (stat.st_mtime_ns, stat.st_size)
+    return signature
+
+
+class AssetFingerprints:
+    """sha256 of every asset under ``data_dir`` and ``sprite_root``, plus a global digest.
+
+    Build one with ``scan``; ``rescan`` returns a new instance for the files
+    as they are now and leaves this one untouched, so a pipeline keeps the
+    fingerprints it was built from.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        sprite_root: Path,
+        digests: dict[str, str],
+        *,
+        manifest_path: Path | None = None,
+        stats: dict[str, tuple[int, int]] | None = None,
+        hashed: int = 0,
+    ) -> None:
+        self.data_dir = data_dir
+        self.sprite_root = sprite_root
+        self.digests = digests
+        self.manifest_path = manifest_path
+        # (mtime_ns, size) each digest was taken at.
+        self._stats = stats or {}
+        self.hashed = hashed
+        digest = hashlib.sha256(f"assets-v{MANIFEST_VERSION}\n".encode("ascii"))
+        for name, file_hash in sorted(digests.items()):
+            digest.update(f"{name}={file_hash}\n".encode())
+        self.global_digest = digest.hexdigest()
+
+    @classmethod
+    def scan(
+        cls,
+        data_dir: Path,
+        sprite_root: Path,
+        *,
+        manifest_path: Path | None = None,
+        previous: AssetFingerprints | None = None,
+    ) -> AssetFingerprints:
+        """Fingerprint the files, rehashing only those whose mtime or size changed.
+
+        Digests are reused from ``previous`` or, failing that, from the
+        manifest; the manifest is rewritten when anything was hashed.
+        """
+        known = _read_manifest(manifest_path)
+        if previous is not None:
+            for name, stat in previous._stats.items():
+                known[str(previous._path(name))] = (*stat, previous.digests[name])
+        digests: dict[str, str] = {}
+        stats: dict[str, tuple[int, int]] = {}
+        hashed = 0
+        for name, path in asset_files(data_dir, sprite_root).items():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            entry = known.get(str(path))
+            if entry is not None and tuple(entry[:2]) == signature:
+                digests[name] = entry[2]
+            else:
+                digests[name] = file_digest(path)
+                hashed += 1
+            stats[name] = signature
+        fingerprints = cls(
+            data_dir,
+            sprite_root,
+            digests,
+            manifest_path=manifest_path,
+            stats=stats,
+            hashed=hashed,
+        )
+        if hashed and manifest_path is not None:
+            fingerprints._write_manifest(known)
+        logger.info(
+            "fingerprinted %d assets (%d hashed, %d from the manifest): %s",
+            len(digests),
+            hashed,
+            len(digests) - hashed,
+            fingerprints.global_digest[:16],
+        )
+        return fingerprints
+
+    def rescan(self) -> AssetFingerprints:
+        return self.scan(
+            self.data_dir,
+            self.sprite_root,
+            manifest_path=self.manifest_path,
+            previous=self,
+        )
+
+    def changed(self, other: AssetFingerprints) -> set[str]:
+        """Assets added, removed or modified between ``self`` and ``other``."""
+        return {
+            name
+            for name in self.digests.keys() | other.digests.keys()
+            if self.digests.get(name) != other.digests.get(name)
+        }
+
+    def digest(self, name: str) -> str | None:
+        return self.digests.get(name)
+
+    def snapshot(self) -> dict:
+        return {
+            "global": self.global_digest,
+            "count": len(self.digests),
+            "hashed": self.hashed,
+            "manifest": str(self.manifest_path) if self.manifest_path else None,
+            "assets": {name: digest[:16] for name, digest in self.digests.items()},
+        }
+
+    # ------------------------------------------------------------------
+    def _path(self, name: str) -> Path:
+        prefix, _, filename = name.rpartition("/")
+        if prefix == "sprites":
+            return self.sprite_root / filename
+        if prefix == "data/palettes":
+            return self.data_dir / "palettes" / filename
+        return self.data_dir / filename
+
+    def _write_manifest(self, known: dict[str, tuple]) -> None:
+        """Merge this scan into the manifest; entries of other roots are kept."""
+        assert self.manifest_path is not None
+        entries = {
+            path: list(entry) for path, entry in known.items() if os.path.exists(path)
+        }
+        for name, (mtime_ns, size) in self._stats.items():
+            entries[str(self._path(name))] = [mtime_ns, size, self.digests[name]]
+        path = self.manifest_path
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(
+                json.dumps({"version": MANIFEST_VERSION, "files": entries}),
+                encoding="utf-8",
+            )
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("Could not write asset manifest %s", path, exc_info=True)
+            tmp.unlink(missing_ok=True)
+
+
+def _read_manifest(path: Path | None) -> dict[str, tuple]:
+    if path is None:
+        return {}
+    try:
+        manifest = json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError):
+        logger.warning("Ignoring unreadable asset manifest %s", path, exc_info=True)
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return {path: tuple(entry) for path, entry in manifest.get("files", {}).items()}
+
+
+__all__ = [
+    "MANIFEST_NAME",
+    "AssetFingerprints",
+    "asset_files",
+    "file_digest",
+    "stat_assets",
+]
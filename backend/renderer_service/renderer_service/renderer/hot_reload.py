@@ -0,0 +1,143 @@
+"""Hot reload of palettes, sprite data and sprite sheets.
+
+``rebuild_pipeline`` builds a complete new ``RenderPipeline`` from the files
+on disk, off the request path, and carries over every cached entry whose
+inputs are unchanged according to the asset fingerprints: decoded sheets and
+sliced tiles, tinted pelts, colour definitions (with their pattern tiles and
+LUTs) and pattern atlas entries. The caller swaps the new pipeline in between
+jobs; a job already running finishes against the pipeline it started with.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass, field
+
+from ..config import settings
+from ..resources import load_json_cached
+from .fingerprints import AssetFingerprints
+from .pattern_atlas import (
+    AtlasBuilder,
+    PatternAtlas,
+    finish_and_save,
+    install_pattern_atlas,
+)
+from .patterns import installed_pattern_atlas, retain_primed_tiles
+from .pipeline import RenderPipeline
+from .repository import SpriteRepository
+
+logger = logging.getLogger("renderer.hot_reload")
+
+SPRITE_PREFIX = "sprites/"
+PALETTE_PREFIX = "data/palettes/"
+
+
+@dataclass
+class ReloadResult:
+    """A rebuilt pipeline ready to swap in; ``pipeline`` is None when nothing changed."""
+
+    pipeline: RenderPipeline | None
+    report: dict
+    atlas: PatternAtlas | None = field(default=None, repr=False)
+
+    def install(self) -> None:
+        """Publish the process-wide pattern state that goes with ``pipeline``."""
+        if self.pipeline is None:
+            return
+        if self.atlas is not None:
+            # Generated tiles are keyed by pattern content, so they stay valid.
+            install_pattern_atlas(self.atlas, clear=False)
+        retain_primed_tiles(self.pipeline.mapper.pattern_definitions())
+
+
+def rebuild_pipeline(
+    current: RenderPipeline, *, pattern_atlas: bool = False
+) -> ReloadResult:
+    """Build a pipeline from the current asset files, reusing what did not change.
+
+    Without recorded fingerprints on ``current`` nothing can be shown to be
+    unchanged, so every cache starts empty. Raises whatever building or
+    validating the new mapper raises; ``current`` is left untouched.
+    """
+    started = time.perf_counter()
+    data_dir = current.mapper.data_dir
+    sprite_root = current.repository.sprite_root
+    if current.fingerprints is None:
+        fingerprints = AssetFingerprints.scan(data_dir, sprite_root)
+        changed = None
+    else:
+        fingerprints = current.fingerprints.rescan()
+        changed = current.fingerprints.changed(fingerprints)
+        if not changed:
+            return ReloadResult(None, {"changed": [], "elapsed_ms": _since(started)})
+
+    # Data files are parsed through a process-wide cache; read them afresh.
+    load_json_cached.cache_clear()
+    repository = SpriteRepository(sprite_root, tile_size=current.repository.tile_size)
+    pipeline = RenderPipeline(
+        current.canvas_size,
+        repository,
+        validate=False,
+        custom_colours=current.renderer.custom_colours,
+    )
+    pipeline.fingerprints = fingerprints
+    report: dict = {
+        "changed": sorted(changed) if changed is not None else None,
+        "assets": fingerprints.global_digest,
+    }
+
+    palettes_changed = changed is None or any(
+        name.startswith(PALETTE_PREFIX) for name in changed
+    )
+    if changed is not None:
+        sheets = {
+            name[len(SPRITE_PREFIX) :].removesuffix(".png")
+            for name in changed
+            if name.startswith(SPRITE_PREFIX)
+        }
+        stale_sprites = repository.adopt(current.repository, sheets)
+        stale_colours = pipeline.mapper.adopt_definitions(current.mapper)
+        previous_tints = current.renderer.tint_cache
+        tints = previous_tints.carry_over(colours=stale_colours, sprites=stale_sprites)
+        pipeline.renderer.tint_cache = tints
+        pipeline.renderer.adopt_luts(current.renderer)
+        if not palettes_changed:
+            # Same palette files: keep the serialised listing, ETag and sheet.
+            pipeline.palettes = current.palettes
+        report.update(
+            sprites_invalidated=len(stale_sprites),
+            colours_invalidated=sorted(stale_colours),
+            tint_entries_dropped=tints.invalidated - previous_tints.invalidated,
+        )
+
+    pipeline.validate()
+    pipeline.catalog  # noqa: B018 - built here rather than on the first batch request
+
+    atlas = None
+    previous_atlas = installed_pattern_atlas()
+    if pattern_atlas and palettes_changed and previous_atlas is not None:
+        builder = AtlasBuilder(
+            pipeline.mapper.pattern_definitions(),
+            data_dir / "palettes",
+            pipeline.canvas_size,
+            previous_atlas,
+        )
+        builder.generate(builder.pending)
+        atlas = finish_and_save(builder, settings.cache_dir, previous_atlas)
+        report["atlas"] = {
+            "entries": len(atlas.slots),
+            "generated": builder.generated,
+            "dropped": len(set(previous_atlas.slots) - set(atlas.slots)),
+        }
+
+    report["elapsed_ms"] = _since(started)
+    logger.info("assets rebuilt: %s", report)
+    return ReloadResult(pipeline, report, atlas)
+
+
+def _since(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+__all__ = ["ReloadResult", "rebuild_pipeline"]
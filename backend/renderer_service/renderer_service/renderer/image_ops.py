@@ -1,10 +1,13 @@
 from __future__ import annotations
 
-import numpy as np
+from functools import lru_cache
 from typing import Sequence
 
+import numpy as np
 from PIL import Image, ImageChops
 
+_RAMP = np.arange(256, dtype=np.float32) / 255.0
+
 
 def ensure_rgba(image: Image.Image) -> Image.Image:
     if image.mode != "RGBA":
@@ -156,25 +159,92 @@ def apply_missing_scar(canvas: Image.Image, mask: Image.Image) -> Image.Image:
     return Image.fromarray(result, mode="RGBA")
 
 
-def tint_image(image: Image.Image, colour: Sequence[int], mode: str = "multiply") -> Image.Image:
-    arr = np.asarray(ensure_rgba(image), dtype=np.float32) / 255.0
-    rgb = arr[..., :3]
-    alpha = arr[..., 3:]
-    tint = np.array([colour[0], colour[1], colour[2]], dtype=np.float32) / 255.0
+@lru_cache(maxsize=512)
+def tint_lut(colour: tuple[int, int, int], mode: str = "multiply") -> np.ndarray:
+    """(3, 256) uint8 table of ``tint_image`` for a constant colour.
 
+    Built with the same float32 arithmetic as the per-pixel path, so applying
+    it is byte-identical.
+    """
+    tint = np.array(colour[:3], dtype=np.float32) / 255.0
+    rgb = _RAMP[:, None]
     if mode == "multiply":
-        tinted_rgb = rgb * tint
+        tinted = rgb * tint
     elif mode == "add":
-        tinted_rgb = np.clip(rgb + tint, 0.0, 1.0)
+        tinted = np.clip(rgb + tint, 0.0, 1.0)
     else:
         raise ValueError(f"Unsupported tint mode: {mode}")
+    return finish_channel_lut(tinted)
+
+
+def finish_channel_lut(values: np.ndarray) -> np.ndarray:
+    """Quantise a (256, 3) float ramp result into a (3, 256) uint8 LUT."""
+    return np.ascontiguousarray(
+        np.clip(np.rint(values * 255.0), 0, 255).astype(np.uint8).T
+    )
+
 
-    result = np.concatenate([tinted_rgb, alpha], axis=-1)
-    arr = np.clip(np.rint(result * 255.0), 0, 255).astype(np.uint8)
-    arr = np.where(arr[..., 3:] == 0, 0, arr)
+def take_channel_lut(arr: np.ndarray, lut: np.ndarray) -> np.ndarray:
+    """Map the RGB bytes of a uint8 RGBA array through ``lut`` (3, 256) in place.
+
+    One ``np.take`` per channel; much cheaper than a broadcast fancy-index.
+    """
+    for channel in range(3):
+        np.take(lut[channel], arr[..., channel], out=arr[..., channel])
+    return arr
+
+
+def tint_image(
+    image: Image.Image, colour: Sequence[int], mode: str = "multiply"
+) -> Image.Image:
+    lut = tint_lut((int(colour[0]), int(colour[1]), int(colour[2])), mode)
+    arr = take_channel_lut(np.array(ensure_rgba(image), dtype=np.uint8, copy=True), lut)
+    arr[arr[..., 3] == 0] = 0
     return Image.fromarray(arr, mode="RGBA")
 
 
+def multiply_colour(base: Image.Image, colour: Sequence[int]) -> Image.Image:
+    """``multiply(base, fill_with_colour(base.size, colour + (255,), base))`` without the float passes.
+
+    Opaque pixels go through the multiply LUT; only the few partially
+    transparent edge pixels are blended in float32.
+    """
+    arr = np.asarray(ensure_rgba(base), dtype=np.uint8)
+    alpha = arr[..., 3]
+    out = np.zeros_like(arr)
+    out[..., 3] = alpha
+
+    opaque = alpha == 255
+    lut = tint_lut((int(colour[0]), int(colour[1]), int(colour[2])), "multiply")
+    if opaque.any():
+        out[opaque, :3] = take_channel_lut(arr[opaque][:, None, :], lut)[:, 0, :3]
+
+    partial = (alpha > 0) & ~opaque
+    if partial.any():
+        pixels = arr[partial].astype(np.float32) / 255.0
+        tint = np.array(colour[:3], dtype=np.float32) / 255.0
+        pixel_alpha = pixels[:, 3:4]
+        rgb = pixels[:, :3]
+        blended = pixel_alpha * (rgb * tint) + (1.0 - pixel_alpha) * rgb
+        out[partial, :3] = np.clip(np.rint(blended * 255.0), 0, 255).astype(np.uint8)
+    return Image.fromarray(out, mode="RGBA")
+
+
+def upscale_nearest(image: Image.Image, factor: int) -> Image.Image:
+    """Integer nearest-neighbour upscale; every source pixel becomes a factor×factor block."""
+    factor = int(factor)
+    if factor <= 1:
+        return image
+    arr = np.asarray(ensure_rgba(image), dtype=np.uint8)
+    height, width = arr.shape[:2]
+    # Broadcast to (h, f, w, f, 4) without copying, then materialise once via reshape.
+    blocks = np.broadcast_to(
+        arr[:, None, :, None, :], (height, factor, width, factor, 4)
+    )
+    scaled = np.ascontiguousarray(blocks).reshape(height * factor, width * factor, 4)
+    return Image.fromarray(scaled, mode="RGBA")
+
+
 def sanitize_transparency(image: Image.Image) -> Image.Image:
     arr = np.array(ensure_rgba(image), dtype=np.uint8, copy=True)
     mask = arr[..., 3] == 0
@@ -0,0 +1,126 @@
+"""Prebuilt ``/palettes`` response and palette swatch sheet.
+
+The palette listing only changes when the palette files do, so it is
+serialised once per mapper into bytes with a strong ETag. Every colour
+entry gains a ``swatch`` rectangle ``[x, y, width, height]`` into one PNG
+sheet holding a thumbnail per colour, so a palette picker needs two cacheable
+requests instead of a render per colour.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from .sprite_mapper import ExperimentalColourDefinition, SpriteMapper
+from .v3_renderer import _experimental_blends
+
+logger = logging.getLogger("renderer.palette_catalog")
+
+SWATCH_SIZE = 25
+SHEET_COLUMNS = 32
+
+
+def strong_etag(body: bytes) -> str:
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+class PaletteCatalog:
+    """Serialised palette listing plus a lazily rendered swatch sheet."""
+
+    def __init__(
+        self,
+        mapper: SpriteMapper,
+        canvas_size: int = 50,
+        *,
+        swatch_size: int = SWATCH_SIZE,
+        columns: int = SHEET_COLUMNS,
+    ) -> None:
+        self.mapper = mapper
+        self.canvas_size = canvas_size
+        self.swatch_size = swatch_size
+        self.columns = columns
+        # Colour keys in sheet order; a colour listed by two palettes gets two cells.
+        self.cells: list[str] = []
+        palettes = []
+        for palette in mapper.get_palette_metadata():
+            colours = {}
+            for name, raw in palette["colors"].items():
+                colours[name] = {**raw, "swatch": list(self.cell(len(self.cells)))}
+                self.cells.append(name.upper())
+            palettes.append({**palette, "colors": colours})
+        self.body = json.dumps(palettes, separators=(",", ":")).encode("utf-8")
+        self.etag = strong_etag(self.body)
+        self._sheet: tuple[bytes, str] | None = None
+        self._lock = threading.Lock()
+
+    def cell(self, index: int) -> tuple[int, int, int, int]:
+        row, column = divmod(index, self.columns)
+        size = self.swatch_size
+        return column * size, row * size, size, size
+
+    @property
+    def sheet_ready(self) -> bool:
+        return self._sheet is not None
+
+    def swatch_sheet(self) -> tuple[bytes, str]:
+        """``(png_bytes, etag)`` of the swatch sheet, rendered on first use."""
+        if self._sheet is None:
+            with self._lock:
+                if self._sheet is None:
+                    self._sheet = self._render_sheet()
+        return self._sheet
+
+    # ------------------------------------------------------------------
+    def _render_sheet(self) -> tuple[bytes, str]:
+        started = time.perf_counter()
+        size = self.swatch_size
+        rows = max(1, -(-len(self.cells) // self.columns))
+        sheet = np.zeros((rows * size, self.columns * size, 4), dtype=np.uint8)
+        swatches = {}
+        for index, colour in enumerate(self.cells):
+            if colour not in swatches:
+                swatches[colour] = self._swatch(
+                    self.mapper.get_experimental_definition(colour)
+                )
+            x, y, _, _ = self.cell(index)
+            sheet[y : y + size, x : x + size] = swatches[colour]
+        buffer = BytesIO()
+        Image.fromarray(sheet, mode="RGBA").save(buffer, format="PNG", optimize=True)
+        body = buffer.getvalue()
+        logger.info(
+            "rendered %d palette swatches (%d KB) in %.0f ms",
+            len(self.cells),
+            len(body) // 1024,
+            (time.perf_counter() - started) * 1000,
+        )
+        return body, strong_etag(body)
+
+    def _swatch(self, definition: ExperimentalColourDefinition | None) -> np.ndarray:
+        """The colour as it tints a white pelt pixel, shrunk to ``swatch_size``."""
+        size = self.swatch_size
+        if definition is None:
+            return np.zeros((size, size, 4), dtype=np.uint8)
+        rgb = np.ones((1, 1, 3), dtype=np.float32)
+        if definition.pattern:
+            tile = definition.pattern_tile(self.canvas_size, self.canvas_size)
+            if tile is not None:
+                rgb = tile
+        # As in the renderer, a pattern takes the place of the multiply blend.
+        rgb = _experimental_blends(
+            rgb, definition, include_multiply=not definition.pattern
+        )
+        rgb = np.clip(np.rint(np.clip(rgb, 0.0, 1.0) * 255.0), 0, 255).astype(np.uint8)
+        image = Image.fromarray(np.ascontiguousarray(rgb), mode="RGB")
+        image = image.resize((size, size), Image.Resampling.BOX)
+        return np.asarray(image.convert("RGBA"))
+
+
+__all__ = ["SHEET_COLUMNS", "SWATCH_SIZE", "PaletteCatalog", "strong_etag"]
@@ -0,0 +1,418 @@
+"""Ahead-of-time pattern atlas compiled from ``data/palettes``.
+
+Every distinct palette pattern is generated once at the canvas size and
+packed into one ``(N, size, size, 3)`` array saved under ``cache_dir``, with
+a JSON index mapping pattern digests to slots. Once installed,
+``generate_pattern_tile`` is a slice of that array and cairo never runs on
+the request path.
+
+The index records a fingerprint of the palette files and of the generator
+source. When a palette changes only the patterns missing from the atlas are
+generated; a change to the generators discards every entry. Patterns that
+failed to generate (SVG patterns without cairo) are listed in the index and
+only retried once the fingerprint changes or a build is forced.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+
+from . import patterns
+from .pattern_pool import PatternPool, generate_pattern_tiles
+from .patterns import PatternDefinition
+
+logger = logging.getLogger("renderer.pattern_atlas")
+
+ATLAS_VERSION = 1
+# Tiles stay float32: several procedural generators blend to values between
+# uint8 steps, and quantising them would change rendered pixels.
+ATLAS_DTYPE = np.float32
+
+
+def pattern_digest(definition: PatternDefinition) -> str:
+    """Stable content key of a parsed pattern (dataclass repr of plain values)."""
+    return hashlib.sha1(repr(definition).encode("utf-8")).hexdigest()
+
+
+def generator_hash() -> str:
+    return hashlib.sha256(Path(patterns.__file__).read_bytes()).hexdigest()[:16]
+
+
+def palette_hashes(palettes_dir: Path) -> dict[str, str]:
+    return {
+        path.name: hashlib.sha256(path.read_bytes()).hexdigest()[:16]
+        for path in sorted(palettes_dir.glob("*.json"))
+    }
+
+
+def palette_fingerprint(hashes: dict[str, str], size: int, generators: str) -> str:
+    digest = hashlib.sha256(f"{ATLAS_VERSION}:{size}:{generators}\n".encode("ascii"))
+    for name, file_hash in sorted(hashes.items()):
+        digest.update(f"{name}={file_hash}\n".encode())
+    return digest.hexdigest()
+
+
+def atlas_paths(directory: Path, size: int) -> tuple[Path, Path]:
+    return (
+        directory / f"pattern_atlas_{size}.npy",
+        directory / f"pattern_atlas_{size}.json",
+    )
+
+
+@dataclass
+class PatternAtlas:
+    size: int
+    fingerprint: str
+    generators: str
+    tiles: np.ndarray
+    slots: dict[str, int]
+    palettes: dict[str, str] = field(default_factory=dict)
+    failed: list[str] = field(default_factory=list)
+
+    def lookup(
+        self, definition: PatternDefinition, width: int, height: int
+    ) -> np.ndarray | None:
+        if width != self.size or height != self.size:
+            return None
+        slot = self.slots.get(pattern_digest(definition))
+        if slot is None:
+            return None
+        return self.tiles[slot]
+
+    def tile(self, digest: str) -> np.ndarray | None:
+        slot = self.slots.get(digest)
+        return None if slot is None else self.tiles[slot]
+
+    def snapshot(self) -> dict:
+        return {
+            "size": self.size,
+            "entries": len(self.slots),
+            "failed": len(self.failed),
+            "fingerprint": self.fingerprint[:16],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+
+
+def load_atlas(directory: Path, size: int) -> PatternAtlas | None:
+    """Memory-map a saved atlas; None if it is missing or unreadable."""
+    tiles_path, index_path = atlas_paths(directory, size)
+    try:
+        index = json.loads(index_path.read_text(encoding="utf-8"))
+        if index.get("version") != ATLAS_VERSION or index.get("size") != size:
+            return None
+        tiles = np.load(tiles_path, mmap_mode="r", allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+    if tiles.shape[1:] != (size, size, 3) or len(tiles) != len(index.get("slots", {})):
+        logger.warning(
+            "Ignoring pattern atlas %s: index does not match tiles", tiles_path
+        )
+        return None
+    return PatternAtlas(
+        size=size,
+        fingerprint=index["fingerprint"],
+        generators=index["generators"],
+        tiles=tiles,
+        slots=dict(index["slots"]),
+        palettes=dict(index.get("palettes", {})),
+        failed=list(index.get("failed", [])),
+    )
+
+
+def save_atlas(atlas: PatternAtlas, directory: Path) -> None:
+    tiles_path, index_path = atlas_paths(directory, atlas.size)
+    suffix = f".{os.getpid()}.tmp"
+    tmp_tiles = tiles_path.with_name(tiles_path.name + suffix)
+    tmp_index = index_path.with_name(index_path.name + suffix)
+    try:
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(tmp_tiles, "wb") as handle:
+            np.save(
+                handle,
+                np.ascontiguousarray(atlas.tiles, dtype=ATLAS_DTYPE),
+                allow_pickle=False,
+            )
+        tmp_index.write_text(
+            json.dumps(
+                {
+                    "version": ATLAS_VERSION,
+                    "size": atlas.size,
+                    "fingerprint": atlas.fingerprint,
+                    "generators": atlas.generators,
+                    "palettes": atlas.palettes,
+                    "slots": atlas.slots,
+                    "failed": atlas.failed,
+                },
+                indent=1,
+                sort_keys=True,
+            ),
+            encoding="utf-8",
+        )
+        # Tiles first: a reader pairing a new index with old tiles is caught
+        # by the length check in load_atlas.
+        os.replace(tmp_tiles, tiles_path)
+        os.replace(tmp_index, index_path)
+    finally:
+        tmp_tiles.unlink(missing_ok=True)
+        tmp_index.unlink(missing_ok=True)
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+
+class AtlasBuilder:
+    """Incremental atlas compilation, split into chunks for the warm-up loop.
+
+    Entries of ``previous`` are reused when the generator source is unchanged;
+    only patterns without a tile are generated. Failures recorded in
+    ``previous`` stay failed while its fingerprint matches.
+    """
+
+    def __init__(
+        self,
+        definitions: Iterable[PatternDefinition],
+        palettes_dir: Path,
+        size: int,
+        previous: PatternAtlas | None = None,
+    ) -> None:
+        self.size = size
+        self.palettes = palette_hashes(palettes_dir)
+        self.generators = generator_hash()
+        self.fingerprint = palette_fingerprint(self.palettes, size, self.generators)
+        self.definitions: dict[str, PatternDefinition] = {}
+        for definition in definitions:
+            self.definitions.setdefault(pattern_digest(definition), definition)
+
+        reusable = (
+            previous
+            if previous is not None and previous.generators == self.generators
+            else None
+        )
+        self.tiles: dict[str, np.ndarray] = {}
+        if reusable is not None:
+            for digest in self.definitions:
+                tile = reusable.tile(digest)
+                if tile is not None:
+                    self.tiles[digest] = tile
+        self.reused = len(self.tiles)
+        known_failures = (
+            set(previous.failed)
+            if previous is not None and previous.fingerprint == self.fingerprint
+            else set()
+        )
+        self.failed: list[str] = [
+            digest
+            for digest in self.definitions
+            if digest in known_failures and digest not in self.tiles
+        ]
+        self.pending: list[str] = [
+            digest
+            for digest in self.definitions
+            if digest not in self.tiles and digest not in known_failures
+        ]
+
+    @property
+    def up_to_date(self) -> bool:
+        return not self.pending
+
+    @property
+    def generated(self) -> int:
+        return len(self.tiles) - self.reused
+
+    def chunks(self, size: int) -> list[list[str]]:
+        return [
+            self.pending[start : start + size]
+            for start in range(0, len(self.pending), size)
+        ]
+
+    def generate(self, digests: list[str]) -> None:
+        for digest in digests:
+            definition = self.definitions[digest]
+            try:
+                tile = patterns.generate_pattern_tile.__wrapped__(
+                    definition, self.size, self.size
+                )
+            except Exception as exc:  # noqa: BLE001 - reported in the index, retried next build
+                logger.debug("pattern %s failed: %s", definition.type, exc)
+                self.failed.append(digest)
+                continue
+            self.tiles[digest] = tile
+
+    def generate_parallel(
+        self, digests: list[str], workers: int = 0, *, pool: PatternPool | None = None
+    ) -> None:
+        """Like ``generate`` but on a process pool (``pattern_pool``)."""
+        tiles = generate_pattern_tiles(
+            (self.definitions[digest] for digest in digests),
+            self.size,
+            workers=workers,
+            pool=pool,
+        )
+        self.add_tiles(
+            {pattern_digest(definition): tile for definition, tile in tiles.items()}
+        )
+
+    def add_tiles(self, tiles: dict[str, np.ndarray | None]) -> None:
+        """Record tiles produced elsewhere (e.g. a process pool); None marks a failure."""
+        for digest, tile in tiles.items():
+            if tile is None:
+                self.failed.append(digest)
+            else:
+                self.tiles[digest] = tile
+
+    def finish(self) -> PatternAtlas:
+        digests = sorted(self.tiles)
+        stacked = np.empty((len(digests), self.size, self.size, 3), dtype=ATLAS_DTYPE)
+        for slot, digest in enumerate(digests):
+            stacked[slot] = self.tiles[digest]
+        return PatternAtlas(
+            size=self.size,
+            fingerprint=self.fingerprint,
+            generators=self.generators,
+            tiles=stacked,
+            slots={digest: slot for slot, digest in enumerate(digests)},
+            palettes=self.palettes,
+            failed=sorted(set(self.failed)),
+        )
+
+
+def needs_rebuild(atlas: PatternAtlas | None, palettes_dir: Path, size: int) -> bool:
+    """True when the palettes or generators changed since ``atlas`` was built.
+
+    Recorded failures do not count: retrying them with the same inputs would
+    fail again on every start.
+    """
+    if atlas is None:
+        return True
+    return atlas.fingerprint != palette_fingerprint(
+        palette_hashes(palettes_dir), size, generator_hash()
+    )
+
+
+def install_pattern_atlas(atlas: PatternAtlas | None, *, clear: bool = True) -> None:
+    """Serve ``generate_pattern_tile`` from ``atlas`` (None uninstalls)."""
+    patterns.set_pattern_atlas(atlas, clear=clear)
+
+
+def load_and_install(directory: Path, size: int) -> PatternAtlas | None:
+    """Startup hook: install a saved atlas built by the current generators.
+
+    Entries are content-addressed, so a stale fingerprint (changed palettes)
+    only means some patterns are missing; those still generate on demand.
+    """
+    atlas = load_atlas(directory, size)
+    if atlas is None or atlas.generators != generator_hash():
+        return None
+    install_pattern_atlas(atlas)
+    logger.info("pattern atlas installed: %s", atlas.snapshot())
+    return atlas
+
+
+def _unchanged(
+    builder: AtlasBuilder, previous: PatternAtlas | None, atlas: PatternAtlas
+) -> bool:
+    return (
+        previous is not None
+        and builder.generated == 0
+        and previous.fingerprint == builder.fingerprint
+        and previous.slots == atlas.slots
+    )
+
+
+def finish_and_save(
+    builder: AtlasBuilder, directory: Path, previous: PatternAtlas | None
+) -> PatternAtlas:
+    """Pack the builder's tiles and save them unless nothing changed."""
+    atlas = builder.finish()
+    if not _unchanged(builder, previous, atlas):
+        try:
+            save_atlas(atlas, directory)
+        except OSError:
+            logger.warning(
+                "Could not save pattern atlas to %s; keeping it in memory",
+                directory,
+                exc_info=True,
+            )
+    return atlas
+
+
+def finish_and_install(
+    builder: AtlasBuilder, directory: Path, previous: PatternAtlas | None
+) -> PatternAtlas:
+    """``finish_and_save``, then install the atlas."""
+    atlas = finish_and_save(builder, directory, previous)
+    install_pattern_atlas(atlas)
+    return atlas
+
+
+def build_pattern_atlas(
+    definitions: Iterable[PatternDefinition],
+    palettes_dir: Path,
+    directory: Path,
+    size: int,
+    *,
+    force: bool = False,
+    workers: int = 1,
+) -> tuple[PatternAtlas, dict]:
+    """Compile (incrementally unless ``force``) and save the atlas; returns it plus a report.
+
+    ``workers`` other than 1 generates missing tiles on a process pool (0: half the cores).
+    """
+    started = time.perf_counter()
+    previous = None if force else load_atlas(directory, size)
+    builder = AtlasBuilder(definitions, palettes_dir, size, previous)
+    changed = sorted(
+        name
+        for name, file_hash in builder.palettes.items()
+        if previous is None or previous.palettes.get(name) != file_hash
+    )
+    if workers == 1:
+        builder.generate(builder.pending)
+    else:
+        builder.generate_parallel(builder.pending, workers)
+    atlas = builder.finish()
+    saved = not _unchanged(builder, previous, atlas)
+    if saved:
+        save_atlas(atlas, directory)
+    report = {
+        "saved": saved,
+        "entries": len(atlas.slots),
+        "reused": builder.reused,
+        "generated": len(atlas.slots) - builder.reused,
+        "failed": len(atlas.failed),
+        "changed_palettes": changed,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+    return atlas, report
+
+
+__all__ = [
+    "ATLAS_VERSION",
+    "AtlasBuilder",
+    "PatternAtlas",
+    "atlas_paths",
+    "build_pattern_atlas",
+    "finish_and_install",
+    "finish_and_save",
+    "install_pattern_atlas",
+    "load_and_install",
+    "load_atlas",
+    "needs_rebuild",
+    "pattern_digest",
+    "save_atlas",
+]
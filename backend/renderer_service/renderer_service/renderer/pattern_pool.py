@@ -0,0 +1,208 @@
+"""Batch pattern tile generation on a process pool.
+
+Pattern generators are pure NumPy (or cairo) and hold the GIL, so generating
+every palette pattern on one interpreter scales with nothing. The batch is
+split across worker processes which write finished tiles straight into one
+shared-memory block; the parent copies the block out once and primes
+``generate_pattern_tile`` with the results.
+
+Workers are spawned rather than forked: the service runs render threads, and
+forking a threaded process can copy a held lock into the child. Warm-up
+keeps one ``PatternPool`` up across many small batches so it can yield to
+live requests between them without paying the spawn cost each time.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import patterns
+from .patterns import PatternDefinition
+
+logger = logging.getLogger("renderer.pattern_pool")
+
+# Jobs per worker; small enough that a few slow SVG tiles do not leave the
+# other workers idle at the end of the batch.
+CHUNKS_PER_WORKER = 4
+
+
+def resolve_workers(requested: int) -> int:
+    """``0`` means half the available cores; the other half keeps serving renders."""
+    if requested > 0:
+        return requested
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS
+        cores = os.cpu_count() or 1
+    return max(1, cores // 2)
+
+
+class PatternPool:
+    """Spawned worker processes kept alive across ``generate`` calls until ``close``."""
+
+    def __init__(self, workers: int) -> None:
+        self.workers = max(1, workers)
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    def executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def generate(
+        self, definitions: Iterable[PatternDefinition], size: int
+    ) -> dict[PatternDefinition, np.ndarray | None]:
+        return generate_pattern_tiles(definitions, size, pool=self)
+
+    def close(self, *, wait: bool = True) -> None:
+        """Shut the workers down; ``wait=False`` drops queued work and returns at once."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def _render_slots(
+    shm_name: str,
+    count: int,
+    size: int,
+    jobs: list[tuple[int, PatternDefinition]],
+) -> dict[int, str]:
+    """Worker entry point: write each job's tile into its slot; return failures."""
+    block = shared_memory.SharedMemory(name=shm_name)
+    try:
+        tiles = np.ndarray((count, size, size, 3), dtype=np.float32, buffer=block.buf)
+        failed: dict[int, str] = {}
+        for slot, definition in jobs:
+            try:
+                tiles[slot] = patterns.generate_pattern_tile.__wrapped__(
+                    definition, size, size
+                )
+            except Exception as exc:  # noqa: BLE001 - reported to the parent
+                failed[slot] = f"{type(exc).__name__}: {exc}"
+        del tiles
+        return failed
+    finally:
+        block.close()
+
+
+def _run_chunks(
+    executor: ProcessPoolExecutor,
+    shm_name: str,
+    count: int,
+    size: int,
+    chunks: list[list[tuple[int, PatternDefinition]]],
+) -> dict[int, str]:
+    futures = [
+        executor.submit(_render_slots, shm_name, count, size, chunk) for chunk in chunks
+    ]
+    failed: dict[int, str] = {}
+    for future in futures:
+        failed.update(future.result())
+    return failed
+
+
+def _generate_inline(
+    definitions: list[PatternDefinition], size: int
+) -> dict[PatternDefinition, np.ndarray | None]:
+    results: dict[PatternDefinition, np.ndarray | None] = {}
+    for definition in definitions:
+        try:
+            results[definition] = patterns.generate_pattern_tile(definition, size, size)
+        except Exception as exc:  # noqa: BLE001
+            logger.debug("pattern %s failed: %s", definition.type, exc)
+            results[definition] = None
+    return results
+
+
+def generate_pattern_tiles(
+    definitions: Iterable[PatternDefinition],
+    size: int,
+    *,
+    workers: int = 0,
+    pool: PatternPool | None = None,
+) -> dict[PatternDefinition, np.ndarray | None]:
+    """Generate ``size``-square tiles for ``definitions`` across ``workers`` processes.
+
+    Returns a tile per distinct definition, None where generation failed
+    (e.g. SVG patterns without cairo). Tiles already in the atlas or primed
+    are returned as they are; new ones are primed into ``generate_pattern_tile``
+    so later lookups never regenerate them. With a single worker, or a single
+    missing definition, everything runs in-process. A ``pool`` supplies both
+    the processes and the worker count instead of a pool started per call.
+    """
+    results: dict[PatternDefinition, np.ndarray | None] = {}
+    missing: list[PatternDefinition] = []
+    for definition in dict.fromkeys(definitions):
+        results[definition] = patterns.lookup_pattern_tile(definition, size, size)
+        if results[definition] is None:
+            missing.append(definition)
+    if pool is not None:
+        workers = pool.workers
+    workers = min(resolve_workers(workers), len(missing))
+    if workers <= 1:
+        results.update(_generate_inline(missing, size))
+        return results
+
+    started = time.perf_counter()
+    count = len(missing)
+    block = shared_memory.SharedMemory(create=True, size=count * size * size * 3 * 4)
+    try:
+        chunk_count = min(count, workers * CHUNKS_PER_WORKER)
+        # Strided chunks spread each palette's expensive SVG patterns across workers.
+        chunks = [
+            [(slot, missing[slot]) for slot in range(start, count, chunk_count)]
+            for start in range(chunk_count)
+        ]
+        if pool is not None:
+            failed = _run_chunks(pool.executor(), block.name, count, size, chunks)
+        else:
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context) as own:
+                failed = _run_chunks(own, block.name, count, size, chunks)
+        # One copy out of the block so it can be released.
+        tiles = np.ndarray(
+            (count, size, size, 3), dtype=np.float32, buffer=block.buf
+        ).copy()
+    finally:
+        block.close()
+        block.unlink()
+
+    generated: dict[PatternDefinition, np.ndarray] = {}
+    for slot, definition in enumerate(missing):
+        results[definition] = None
+        if slot not in failed:
+            results[definition] = generated[definition] = tiles[slot]
+    patterns.prime_pattern_tiles(generated, size, size)
+    if failed:
+        reasons = sorted(set(failed.values()))
+        logger.warning(
+            "%d of %d pattern tiles failed: %s",
+            len(failed),
+            count,
+            "; ".join(reasons[:3]),
+        )
+    logger.info(
+        "generated %d pattern tiles on %d processes in %.0f ms",
+        count - len(failed),
+        workers,
+        (time.perf_counter() - started) * 1000,
+    )
+    return results
+
+
+__all__ = ["PatternPool", "generate_pattern_tiles", "resolve_workers"]
@@ -8,12 +8,16 @@ from __future__ import annotations
 
 import logging
 import math
+from collections.abc import Iterable
+from contextvars import ContextVar
 from dataclasses import dataclass, field
 from functools import lru_cache
 from typing import Literal, Optional, Tuple
 
 import numpy as np
 
+from .tile_store import get_tile_store
+
 logger = logging.getLogger("renderer.patterns")
 
 PatternType = Literal[
@@ -164,18 +168,61 @@ def _fg(defn: PatternDefinition) -> np.ndarray:
     return _c(defn.foreground or (255, 255, 255))
 
 
+@lru_cache(maxsize=64)
+def _grid(size: int) -> tuple[np.ndarray, np.ndarray]:
+    """Read-only ``np.mgrid[:size, :size]``, shared by every generator of that size."""
+    yy, xx = np.mgrid[:size, :size]
+    yy.flags.writeable = False
+    xx.flags.writeable = False
+    return yy, xx
+
+
 def _svg_rgb(rgb: Tuple[int, int, int]) -> str:
     """Format an RGB tuple as an SVG color string."""
     return f"rgb({rgb[0]},{rgb[1]},{rgb[2]})"
 
 
+_CAIROSVG_ERROR: str | None = None
+
+
+def _import_cairosvg():
+    """Import cairosvg, remembering failure: probing for libcairo costs ~60 ms a try."""
+    global _CAIROSVG_ERROR
+    if _CAIROSVG_ERROR is not None:
+        raise ImportError(f"cairosvg unavailable: {_CAIROSVG_ERROR}")
+    try:
+        import cairosvg
+    except (ImportError, OSError) as exc:
+        _CAIROSVG_ERROR = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+        raise
+    return cairosvg
+
+
+# Output multiplier for SVG rasterisation, set by ``generate_scaled_pattern_tile``
+# so the generators keep their ``(defn) -> tile`` signature.
+_RASTER_SCALE: ContextVar[int] = ContextVar("pattern_raster_scale", default=1)
+
+
 def _svg_to_array(svg_str: str, width: int, height: int) -> np.ndarray:
-    """Rasterize an SVG string to a float32 (H, W, 3) array in [0, 1]."""
+    """Rasterize an SVG string to a float32 (H, W, 3) array in [0, 1].
+
+    Results are kept in the on-disk tile store keyed by the SVG source and
+    size, so cairo only runs once per distinct tile per deployment.
+    """
+    scale = _RASTER_SCALE.get()
+    width, height = width * scale, height * scale
+    store = get_tile_store()
+    key = store.key(svg_str, width, height)
+    cached = store.load(key)
+    if cached is not None:
+        return cached.astype(np.float32) / 255.0
+
     import io
 
-    import cairosvg
     from PIL import Image
 
+    cairosvg = _import_cairosvg()
+
     try:
         png = cairosvg.svg2png(
             bytestring=svg_str.encode("utf-8"),
@@ -185,8 +232,9 @@ def _svg_to_array(svg_str: str, width: int, height: int) -> np.ndarray:
     except Exception:
         logger.exception("cairosvg rasterisation failed; returning grey tile")
         return np.full((height, width, 3), 0.5, dtype=np.float32)
-    img = Image.open(io.BytesIO(png)).convert("RGB")
-    return np.asarray(img, dtype=np.float32) / 255.0
+    rgb = np.asarray(Image.open(io.BytesIO(png)).convert("RGB"), dtype=np.uint8)
+    store.save(key, rgb)
+    return rgb.astype(np.float32) / 255.0
 
 
 # ---------------------------------------------------------------------------
@@ -195,19 +243,56 @@ def _svg_to_array(svg_str: str, width: int, height: int) -> np.ndarray:
 # ---------------------------------------------------------------------------
 
 
+@lru_cache(maxsize=256)
+def _tartan_layout(
+    ts: int, stripes: tuple[tuple[int, int], ...]
+) -> tuple[int, tuple[tuple[np.ndarray, ...], ...], tuple[np.ndarray, np.ndarray]]:
+    """Blend steps of the sequential tartan for ``(offset, width)`` stripes.
+
+    Every stripe pixel blends its row, then its column, halfway to the stripe
+    colour. Blends towards one colour commute, so a stripe amounts to applying
+    its blend ``n`` times to each pixel its rows and columns cover ``n`` times.
+    Lines with the same pass counts for every stripe end up identical, so the
+    tile is blended once per class of lines and expanded afterwards. Returns
+    the class count, per stripe the masks of the pixels each successive blend
+    reaches, and the index that expands the classes to ``ts`` lines.
+    """
+    passes = np.zeros((len(stripes), ts), dtype=np.int64)
+    for row, (offset, width) in enumerate(stripes):
+        passes[row] = np.bincount(np.arange(offset, offset + width) % ts, minlength=ts)
+    classes, line_class = np.unique(passes, axis=1, return_inverse=True)
+    steps = []
+    for counts in classes:
+        covered = counts[:, None] + counts[None, :]
+        steps.append(
+            tuple(covered >= count for count in range(1, int(covered.max()) + 1))
+        )
+    line_class = line_class.reshape(-1)
+    return classes.shape[1], tuple(steps), np.ix_(line_class, line_class)
+
+
 def _generate_tartan(defn: PatternDefinition) -> np.ndarray:
-    """Intersecting H+V colored stripes on a background."""
+    """Intersecting H+V colored stripes on a background.
+
+    Bit-identical to blending every stripe pixel in order (see
+    ``_tartan_layout``), at a few masked steps per stripe.
+    """
     ts = defn.tile_size
-    tile = np.full((ts, ts, 3), _c(defn.background), dtype=np.float32)
+    stripes = [stripe for stripe in defn.stripes if stripe.width > 0]
+    if not stripes:
+        return np.clip(
+            np.full((ts, ts, 3), _c(defn.background), dtype=np.float32), 0.0, 1.0
+        )
 
-    for stripe in defn.stripes:
+    size, steps, expand = _tartan_layout(
+        ts, tuple((stripe.offset, stripe.width) for stripe in stripes)
+    )
+    tile = np.full((size, size, 3), _c(defn.background), dtype=np.float32)
+    for stripe, masks in zip(stripes, steps):
         sc = _c(stripe.color)
-        for i in range(stripe.width):
-            idx = (stripe.offset + i) % ts
-            tile[idx, :] = 0.5 * tile[idx, :] + 0.5 * sc
-            tile[:, idx] = 0.5 * tile[:, idx] + 0.5 * sc
-
-    return np.clip(tile, 0.0, 1.0)
+        for mask in masks:
+            tile[mask] = 0.5 * tile[mask] + 0.5 * sc
+    return np.clip(tile[expand], 0.0, 1.0)
 
 
 def _generate_gingham(defn: PatternDefinition) -> np.ndarray:
@@ -236,7 +321,7 @@ def _generate_houndstooth(defn: PatternDefinition) -> np.ndarray:
     half = max(ts // 2, 2)
     step = max(half // 4, 1)
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
 
     # Position within each half-cell
     cy = yy % half
@@ -275,7 +360,7 @@ def _generate_chevron(defn: PatternDefinition) -> np.ndarray:
     stripe_w = max(defn.spacing, 2)
     half = size // 2
 
-    yy, xx = np.mgrid[:size, :size]
+    yy, xx = _grid(size)
     # Mirror x around center to form V-shape
     mirrored_x = np.where(xx < half, xx, size - 1 - xx)
     mask = (yy + mirrored_x) % stripe_w < stripe_w // 2
@@ -291,7 +376,7 @@ def _generate_polkadot(defn: PatternDefinition) -> np.ndarray:
     bg, fg = _c(defn.background), _fg(defn)
     radius = ts / 3.0
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     dist = np.sqrt((xx + 0.5 - ts / 2.0) ** 2 + (yy + 0.5 - ts / 2.0) ** 2)
 
     # Anti-alias blend factor: 1.0 inside, smooth falloff in the last 0.8px
@@ -307,7 +392,7 @@ def _generate_argyle(defn: PatternDefinition) -> np.ndarray:
     bg, fg = _c(defn.background), _fg(defn)
     cx, cy = ts / 2.0, ts / 2.0
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     # Diamond mask: |x - cx| / cx + |y - cy| / cy <= 1
     diamond = (np.abs(xx + 0.5 - cx) / cx + np.abs(yy + 0.5 - cy) / cy) <= 1.0
     tile = np.where(diamond[..., None], fg, bg)
@@ -347,7 +432,7 @@ def _generate_checkerboard(defn: PatternDefinition) -> np.ndarray:
     c1, c2 = _c(defn.background), _fg(defn)
     half = max(ts // 2, 1)
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     mask = ((yy // half) + (xx // half)) % 2 == 0
     return np.where(mask[..., None], c1, c2).astype(np.float32)
 
@@ -375,7 +460,7 @@ def _generate_diagonal(defn: PatternDefinition) -> np.ndarray:
     bg, fg = _c(defn.background), _fg(defn)
     stripe_w = max(defn.spacing, 2)
 
-    yy, xx = np.mgrid[:size, :size]
+    yy, xx = _grid(size)
     mask = (xx + yy) % (stripe_w * 2) < stripe_w
 
     tile = np.full((size, size, 3), bg, dtype=np.float32)
@@ -389,7 +474,7 @@ def _generate_basketweave(defn: PatternDefinition) -> np.ndarray:
     c1, c2 = _c(defn.background), _fg(defn)
     half = max(ts // 2, 1)
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     is_horiz = ((yy // half) + (xx // half)) % 2 == 0
 
     # Gradient factor: 0..0.15 across each half-cell
@@ -419,21 +504,20 @@ def _generate_flag(defn: PatternDefinition) -> np.ndarray:
         tile[half:] = fg
         return tile
 
-    # Distribute stripe heights proportionally
-    total_weight = sum(s.width for s in defn.stripes)
-    n_stripes = len(defn.stripes)
-    y = 0
-    for i, stripe in enumerate(defn.stripes):
-        if i == n_stripes - 1:
-            h = ts - y  # absorb rounding remainder into last stripe
-        else:
-            h = max(round(ts * stripe.width / total_weight), 1)
-        end = min(y + h, ts)
-        tile[y:end, :] = _c(stripe.color)
-        y = end
-        if y >= ts:
-            break
-
+    # Distribute stripe heights proportionally; the last stripe absorbs the
+    # rounding remainder and stripes pushed past the bottom edge vanish.
+    weights = np.array([s.width for s in defn.stripes], dtype=np.int64)
+    total_weight = int(weights.sum())
+    if total_weight == 0 and len(weights) > 1:
+        raise ZeroDivisionError("flag stripe widths sum to zero")
+    heights = np.ones(len(weights), dtype=np.int64)
+    if len(weights) > 1:
+        heights[:-1] = np.maximum(np.rint(ts * weights[:-1] / total_weight), 1)
+    ends = np.minimum(np.cumsum(heights), ts)
+    ends[-1] = ts
+    colours = np.array([_c(s.color) for s in defn.stripes], dtype=np.float32)
+    rows = colours[np.searchsorted(ends, np.arange(ts), side="right")]
+    tile[:] = rows[:, None, :]
     return tile
 
 
@@ -636,7 +720,7 @@ def _generate_uroko(defn: PatternDefinition) -> np.ndarray:
     c1, c2 = _c(defn.background), _fg(defn)
     half = max(ts // 2, 2)
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     cy = (yy % half).astype(np.float32) / half
     cx = (xx % half).astype(np.float32) / half
 
@@ -657,7 +741,7 @@ def _generate_eight_point_star(defn: PatternDefinition) -> np.ndarray:
     c1, c2 = _c(defn.background), _fg(defn)
     center = ts / 2.0
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     dx = np.abs(xx + 0.5 - center)
     dy = np.abs(yy + 0.5 - center)
 
@@ -685,7 +769,7 @@ def _generate_kente(defn: PatternDefinition) -> np.ndarray:
     blend = 0.5 * c1 + 0.5 * c2
     half = max(ts // 2, 2)
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     block = ((yy // half) + (xx // half)) % 2
 
     # Stripe width: 2-3 pixels per stripe for visibility
@@ -710,7 +794,7 @@ def _generate_shweshwe(defn: PatternDefinition) -> np.ndarray:
     """Dense tiny geometric shapes on contrasting ground (South African shweshwe)."""
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
 
     # Dense small diamond grid — two offset layers of tiny diamonds
     spacing = max(ts // 4, 3)
@@ -735,7 +819,7 @@ def _generate_chinese_coin(defn: PatternDefinition) -> np.ndarray:
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
     center = ts / 2.0
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     dx = xx + 0.5 - center
     dy = yy + 0.5 - center
 
@@ -757,7 +841,7 @@ def _generate_dancheong(defn: PatternDefinition) -> np.ndarray:
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     # Chebyshev distance from center gives concentric squares
     center = ts / 2.0
     dist = np.maximum(np.abs(xx + 0.5 - center), np.abs(yy + 0.5 - center))
@@ -800,7 +884,7 @@ def _generate_same_komon(defn: PatternDefinition) -> np.ndarray:
     """Tiny offset semicircle dots (Japanese shark skin / same komon)."""
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
 
     spacing = max(ts // 4, 2)
     half = spacing // 2
@@ -821,7 +905,7 @@ def _generate_kanoko(defn: PatternDefinition) -> np.ndarray:
     """Fawn spot tie-dye dots (Japanese kanoko shibori)."""
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
 
     # Staggered dot grid — offset every other row
     spacing = max(ts // 3, 2)
@@ -843,7 +927,7 @@ def _generate_hishi(defn: PatternDefinition) -> np.ndarray:
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
     center = ts / 2.0
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
 
     # Diamond outline — |x-cx|/a + |y-cy|/b == 1
     dx = np.abs(xx + 0.5 - center) / center
@@ -861,7 +945,7 @@ def _generate_nordic_snowflake(defn: PatternDefinition) -> np.ndarray:
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
     center = ts / 2.0
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
 
     dx = np.abs(xx + 0.5 - center)
     dy = np.abs(yy + 0.5 - center)
@@ -890,7 +974,7 @@ def _generate_nordic_diamond(defn: PatternDefinition) -> np.ndarray:
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
     center = ts / 2.0
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
 
     dx = np.abs(xx + 0.5 - center)
     dy = np.abs(yy + 0.5 - center)
@@ -914,7 +998,7 @@ def _generate_native_step(defn: PatternDefinition) -> np.ndarray:
     center = ts / 2.0
     step_size = max(ts // 6, 1)
 
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
     dx = np.abs(xx + 0.5 - center)
     dy = np.abs(yy + 0.5 - center)
 
@@ -931,7 +1015,7 @@ def _generate_camouflage(defn: PatternDefinition) -> np.ndarray:
     ts = defn.tile_size
     c1, c2 = _c(defn.background), _fg(defn)
     # Use a deterministic pseudo-random pattern based on coordinates
-    yy, xx = np.mgrid[:ts, :ts]
+    yy, xx = _grid(ts)
 
     # Tile-size-commensurate frequencies for seamless tiling
     f1 = 2 * np.pi / ts
@@ -1571,48 +1655,52 @@ def _generate_greek_key(defn: PatternDefinition) -> np.ndarray:
     return _svg_to_array(svg, defn.tile_size, defn.tile_size)
 
 
+@lru_cache(maxsize=64)
+def _art_deco_fan_marks(ts: int) -> tuple[tuple[str, ...], float]:
+    """Colour-free SVG geometry of the fan tile: arcs and rays, stroke left open.
+
+    Only the SVG text is cached per tile size; cairo still rasterises every
+    tile (once per deployment, through the tile store).
+    """
+    r = ts * 0.45
+    # Fans from bottom-center and offset positions
+    fan_positions = ((ts / 2, ts), (0, ts / 2), (ts, ts / 2))
+    # 5 rays spread over 180 degrees
+    rays = [(math.cos(math.pi * j / 4), math.sin(math.pi * j / 4)) for j in range(5)]
+    marks = []
+    for fx, fy in fan_positions:
+        marks.extend(
+            f'<circle cx="{fx}" cy="{fy}" r="{r * i / 3}" fill="none" stroke='
+            for i in range(3, 0, -1)
+        )
+        marks.extend(
+            f'<line x1="{fx}" y1="{fy}" x2="{fx + r * cos}" y2="{fy - r * sin}" stroke='
+            for cos, sin in rays
+        )
+    return tuple(marks), max(0.5, ts / 12)
+
+
 def _generate_art_deco_fan(defn: PatternDefinition) -> np.ndarray:
     """Offset semicircles with radiating lines (Art Deco fan / scallop)."""
     ts = defn.tile_size
     bg_s = _svg_rgb(defn.background)
     fg_s = _svg_rgb(defn.foreground or (255, 255, 255))
-    sw = max(0.5, ts / 12)
-    r = ts * 0.45
-
-    svg = (
-        f'<svg xmlns="http://www.w3.org/2000/svg" width="{ts}" height="{ts}">'
-        f'<defs><clipPath id="c"><rect width="{ts}" height="{ts}"/>'
-        f"</clipPath></defs>"
-        f'<g clip-path="url(#c)">'
-        f'<rect width="{ts}" height="{ts}" fill="{bg_s}"/>'
+    marks, sw = _art_deco_fan_marks(ts)
+    stroke = f'"{fg_s}" stroke-width="{sw}"/>'
+
+    svg = "".join(
+        (
+            (
+                f'<svg xmlns="http://www.w3.org/2000/svg" width="{ts}" height="{ts}">'
+                f'<defs><clipPath id="c"><rect width="{ts}" height="{ts}"/>'
+                f"</clipPath></defs>"
+                f'<g clip-path="url(#c)">'
+                f'<rect width="{ts}" height="{ts}" fill="{bg_s}"/>'
+            ),
+            *(mark + stroke for mark in marks),
+            "</g></svg>",
+        )
     )
-
-    # Fans from bottom-center and offset positions
-    fan_positions = [
-        (ts / 2, ts),
-        (0, ts / 2),
-        (ts, ts / 2),
-    ]
-
-    for fx, fy in fan_positions:
-        # Concentric arcs
-        for i in range(3, 0, -1):
-            ri = r * i / 3
-            svg += (
-                f'<circle cx="{fx}" cy="{fy}" r="{ri}" '
-                f'fill="none" stroke="{fg_s}" stroke-width="{sw}"/>'
-            )
-        # Radiating lines (5 lines spread over 180 degrees)
-        for j in range(5):
-            angle = math.pi * j / 4
-            x2 = fx + r * math.cos(angle)
-            y2 = fy - r * math.sin(angle)
-            svg += (
-                f'<line x1="{fx}" y1="{fy}" x2="{x2}" y2="{y2}" '
-                f'stroke="{fg_s}" stroke-width="{sw}"/>'
-            )
-
-    svg += "</g></svg>"
     return _svg_to_array(svg, ts, ts)
 
 
@@ -1737,7 +1825,68 @@ _GENERATORS = {
 }
 
 
-@lru_cache(maxsize=256)
+# Generators that rasterise SVG and can therefore be drawn at any resolution.
+VECTOR_PATTERN_TYPES = frozenset(
+    name
+    for name, generator in _GENERATORS.items()
+    if "_svg_to_array" in generator.__code__.co_names
+)
+
+
+# Precompiled tiles (``pattern_atlas.PatternAtlas``) consulted before any
+# generator runs; installed by the startup hook or warm-up.
+_ATLAS = None
+
+
+def set_pattern_atlas(atlas, *, clear: bool = True) -> None:
+    """Install ``atlas``; ``clear=False`` keeps generated tiles (they are content-keyed)."""
+    global _ATLAS
+    _ATLAS = atlas
+    if clear:
+        generate_pattern_tile.cache_clear()
+
+
+def installed_pattern_atlas():
+    return _ATLAS
+
+
+# Tiles produced out of process (``pattern_pool.generate_pattern_tiles``),
+# keyed by (definition, width, height). Unlike the LRU this is never evicted.
+_PRIMED: dict[tuple[PatternDefinition, int, int], np.ndarray] = {}
+
+
+def prime_pattern_tiles(
+    tiles: dict[PatternDefinition, np.ndarray], width: int, height: int
+) -> None:
+    """Serve ``generate_pattern_tile`` for these definitions from ready-made tiles."""
+    for defn, tile in tiles.items():
+        tile.flags.writeable = False
+        _PRIMED[(defn, width, height)] = tile
+
+
+def retain_primed_tiles(definitions: Iterable[PatternDefinition]) -> int:
+    """Forget primed tiles of every other definition; returns how many were dropped."""
+    keep = set(definitions)
+    stale = [key for key in list(_PRIMED) if key[0] not in keep]
+    for key in stale:
+        _PRIMED.pop(key, None)
+    return len(stale)
+
+
+def lookup_pattern_tile(
+    defn: PatternDefinition, width: int, height: int
+) -> np.ndarray | None:
+    """Atlas or primed tile for ``defn``, without generating; None if neither has it."""
+    if _ATLAS is not None:
+        tile = _ATLAS.lookup(defn, width, height)
+        if tile is not None:
+            return tile
+    return _PRIMED.get((defn, width, height))
+
+
+# Sized to hold every patterned palette colour (~540 today) so warm-up
+# pre-generation is not evicted; a 50px tile is ~30 KB.
+@lru_cache(maxsize=1024)
 def generate_pattern_tile(
     defn: PatternDefinition,
     target_w: int = SPRITE_SIZE,
@@ -1748,11 +1897,51 @@ def generate_pattern_tile(
     Returns a float32 RGB array shape (target_h, target_w, 3) in range [0, 1].
     The result is cached — callers must not mutate the returned array.
     """
+    ready = lookup_pattern_tile(defn, target_w, target_h)
+    if ready is not None:
+        return ready
+
     generator = _GENERATORS.get(defn.type)
     if generator is None:
         raise ValueError(f"Unknown pattern type: {defn.type}")
 
-    tile = generator(defn)
+    return _fill(generator(defn), target_w, target_h)
+
+
+# Hi-res tiles are large (a 350 px tile is ~1.4 MB), so they get their own,
+# smaller LRU rather than crowding out the 1x tiles.
+@lru_cache(maxsize=32)
+def generate_scaled_pattern_tile(
+    defn: PatternDefinition,
+    target_w: int,
+    target_h: int,
+    scale: int,
+) -> np.ndarray:
+    """Pattern tile for a canvas rendered at ``scale``x, filling ``target_w`` x ``target_h``.
+
+    SVG patterns are rasterised at ``scale`` times their tile size, so emblems
+    stay sharp; pixel-grid patterns are defined in canvas pixels and are
+    nearest-upscaled, which matches upscaling the 1x render.
+    """
+    if scale == 1:
+        return generate_pattern_tile(defn, target_w, target_h)
+    generator = _GENERATORS.get(defn.type)
+    if generator is None:
+        raise ValueError(f"Unknown pattern type: {defn.type}")
+
+    if defn.type in VECTOR_PATTERN_TYPES:
+        token = _RASTER_SCALE.set(scale)
+        try:
+            tile = generator(defn)
+        finally:
+            _RASTER_SCALE.reset(token)
+    else:
+        native = generate_pattern_tile(defn, target_w // scale, target_h // scale)
+        tile = np.repeat(np.repeat(native, scale, axis=0), scale, axis=1)
+    return _fill(tile, target_w, target_h)
+
+
+def _fill(tile: np.ndarray, target_w: int, target_h: int) -> np.ndarray:
     ts_h, ts_w = tile.shape[:2]
 
     reps_y = (target_h + ts_h - 1) // ts_h
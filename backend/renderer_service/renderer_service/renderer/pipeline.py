@@ -1,23 +1,39 @@
 from __future__ import annotations
 
-import time
-from dataclasses import dataclass
 import math
+import time
+from collections import OrderedDict
+from collections.abc import Iterator, Sequence
 from copy import deepcopy
+from dataclasses import dataclass
 from pathlib import Path
 from typing import List
 
+import numpy as np
 from PIL import Image
 
+from ..config import settings
 from ..models import (
-    LayerIdentifier,
+    BatchVariant,
+    DiffLayerResult,
+    DiffRequest,
+    DiffResponse,
     LayerDiagnostic,
+    LayerIdentifier,
     RenderMeta,
-    BatchVariant,
+    RenderParams,
 )
+from .catalog import VariantCatalog
+from .custom_colours import CustomColourRegistry, CustomPatternLimits
+from .fingerprints import AssetFingerprints
+from .palette_catalog import PaletteCatalog
+from .plan import PlanCompileError, RenderPlan
 from .repository import SpriteRepository
 from .sprite_mapper import SpriteMapper
-from .v3_renderer import CatRendererV3, StageInfo
+from .tint_cache import TintCache
+from .v3_renderer import CatRendererV3
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
 
 
 @dataclass
@@ -37,6 +53,13 @@ class PipelineResult:
     meta: RenderMeta
 
 
+@dataclass
+class _DiffRender:
+    composed: np.ndarray
+    # (identifier, occurrence) keys so repeated ids (tint/shading) pair up in order.
+    layers: OrderedDict[tuple[LayerIdentifier, int], np.ndarray]
+
+
 @dataclass
 class BatchFrameResult:
     id: str
@@ -53,30 +76,140 @@ class BatchFrameResult:
 
 @dataclass
 class BatchPipelineResult:
+    # ``sheet`` stays at native resolution; callers upscale by ``scale`` right
+    # before encoding. Frame geometry is in output pixels, while ``sources``
+    # holds ``(frame_id, box)`` crop boxes into the native sheet.
     sheet: Image.Image
     frames: List[BatchFrameResult]
-    sources: List[tuple[str, Image.Image]]
+    sources: list[tuple[str, tuple[int, int, int, int]]]
     tile_size: int
+    scale: int = 1
+
+    def iter_source_images(self) -> Iterator[tuple[str, Image.Image]]:
+        """Yield each source frame lazily as a crop of the sheet."""
+        for frame_id, box in self.sources:
+            yield frame_id, self.sheet.crop(box)
+
+    @property
+    def width(self) -> int:
+        return self.sheet.width * self.scale
+
+    @property
+    def height(self) -> int:
+        return self.sheet.height * self.scale
 
 
 class RenderPipeline:
     """Wrapper around the CatRendererV3 that prepares API responses."""
 
-    def __init__(self, canvas_size: int = 50, repository: SpriteRepository | None = None) -> None:
+    def __init__(
+        self,
+        canvas_size: int = 50,
+        repository: SpriteRepository | None = None,
+        *,
+        validate: bool = True,
+        tint_cache: TintCache | None = None,
+        custom_colours: CustomColourRegistry | None = None,
+    ) -> None:
         self.canvas_size = canvas_size
         self.repository = repository or SpriteRepository(tile_size=canvas_size)
-        data_dir = Path(__file__).resolve().parents[1] / "data"
-        self.mapper = SpriteMapper(data_dir)
-        self.renderer = CatRendererV3(self.repository, self.mapper)
+        self.mapper = SpriteMapper(DATA_DIR, validate=False)
+        self.mapper.resolve_aliases(self.repository)
+        self.renderer = CatRendererV3(
+            self.repository,
+            self.mapper,
+            tint_cache
+            if tint_cache is not None
+            else TintCache(settings.tint_cache_size),
+            custom_colours
+            if custom_colours is not None
+            else CustomColourRegistry(
+                CustomPatternLimits.from_settings(), settings.custom_colour_cache_size
+            ),
+        )
+        self.palettes = PaletteCatalog(self.mapper, canvas_size)
+        self._catalog: VariantCatalog | None = None
+        # Fingerprints of the asset files this pipeline was built from; None
+        # until the startup step (or a hot reload) records them.
+        self.fingerprints: AssetFingerprints | None = None
+        if validate:
+            self.validate()
+
+    @property
+    def catalog(self) -> VariantCatalog:
+        """Variant catalog, built on first use (only batch expansion needs it)."""
+        if self._catalog is None:
+            self._catalog = VariantCatalog.build(self.mapper, self.repository)
+        return self._catalog
+
+    def fingerprint_assets(
+        self, manifest_path: Path | None = None
+    ) -> AssetFingerprints:
+        self.fingerprints = AssetFingerprints.scan(
+            self.mapper.data_dir,
+            self.repository.sprite_root,
+            manifest_path=manifest_path,
+        )
+        return self.fingerprints
 
-    def render(self, params: dict, collect_layers: bool = False) -> PipelineResult:
+    def validate(self) -> None:
+        """Check accessory atlas mappings against this pipeline's repository."""
+        self.mapper.validate_accessory_sprites(self.repository)
+
+    def compile(self, params: dict) -> RenderPlan:
+        """Compile params into a ``RenderPlan``; raises ``PlanCompileError``."""
         params = {**params}  # shallow copy to avoid side-effects
         params.setdefault("spriteNumber", params.get("sprite_number", 0))
+        return self.renderer.compile(params)
 
-        layer_results: List[LayerResult] = []
+    def compile_payload(self, payload: RenderParams) -> RenderPlan:
+        params = {**payload.params}
+        params.setdefault("spriteNumber", payload.spriteNumber)
+        return self.compile(params)
+
+    def compile_variants(
+        self, base_params: dict, variants: Sequence[BatchVariant]
+    ) -> list[RenderPlan]:
+        """Compile each variant over ``base_params``; the error names the failing variant."""
+        normalized_base = self._normalize_params(base_params)
+        plans = []
+        for variant in variants:
+            try:
+                plans.append(
+                    self.compile(self._prepare_variant_params(normalized_base, variant))
+                )
+            except PlanCompileError as exc:
+                raise PlanCompileError(f"variant {variant.id!r}: {exc}") from exc
+        return plans
+
+    def compile_batch(
+        self, base_params: dict, variants: Sequence[BatchVariant], include_base: bool
+    ) -> list[RenderPlan]:
+        """One plan per ``render_batch`` frame, in sheet order."""
+        base = (
+            [self.compile(self._normalize_params(base_params))] if include_base else []
+        )
+        return base + self.compile_variants(base_params, variants)
+
+    def render(self, params: dict, collect_layers: bool = False) -> PipelineResult:
         start_time = time.perf_counter()
+        return self.render_plan(
+            self.compile(params), collect_layers, start_time=start_time
+        )
+
+    def render_plan(
+        self,
+        plan: RenderPlan,
+        collect_layers: bool = False,
+        *,
+        start_time: float | None = None,
+        scale: int = 1,
+    ) -> PipelineResult:
+        """Execute a compiled plan; ``scale`` > 1 renders hi-res (see ``CatRendererV3.execute``)."""
+        layer_results: List[LayerResult] = []
+        start_time = time.perf_counter() if start_time is None else start_time
 
-        composed, stage_infos = self.renderer.render(params)
+        composed, stage_infos = self.renderer.execute(plan, scale=scale)
 
         if collect_layers:
             for info in stage_infos:
@@ -98,6 +231,7 @@ class RenderPipeline:
             finished_at=time.perf_counter(),
             duration_ms=(time.perf_counter() - start_time) * 1000,
             memory_pressure=False,
+            assets=self.fingerprints.global_digest if self.fingerprints else None,
         )
 
         return PipelineResult(composed=composed, layers=layer_results, meta=meta)
@@ -114,67 +248,62 @@ class RenderPipeline:
         include_sources: bool = False,
         frame_mode: str = "composed",
         layer_identifier: LayerIdentifier | None = None,
+        scale: int | None = None,
+        plans: Sequence[RenderPlan] | None = None,
     ) -> BatchPipelineResult:
-        normalized_base = self._normalize_params(base_params)
-
-        render_specs: List[tuple[str, str | None, str | None, dict]] = []
+        """Render ``variants`` (after the base frame) into one spritesheet.
 
-        if include_base:
-            render_specs.append(("base", None, None, normalized_base))
-
-        for variant in variants:
-            params = self._prepare_variant_params(normalized_base, variant)
-            render_specs.append((variant.id, variant.label, variant.group, params))
-
-        if not render_specs:
+        ``plans`` holds each frame's plan from ``compile_batch`` when the
+        caller already compiled them; otherwise they are compiled here.
+        """
+        frame_count = len(variants) + (1 if include_base else 0)
+        if frame_count == 0:
             raise ValueError("render_batch requires at least one frame")
+        if plans is None:
+            plans = self.compile_batch(base_params, variants, include_base)
+        elif len(plans) != frame_count:
+            raise ValueError(f"expected {frame_count} plans, got {len(plans)}")
 
         if frame_mode not in {"composed", "layer"}:
             raise ValueError(f"Unsupported frame_mode '{frame_mode}'")
         if frame_mode == "layer" and layer_identifier is None:
             raise ValueError("layer_identifier is required when frame_mode='layer'")
 
-        images: List[Image.Image] = []
-        frame_infos: List[tuple[str, str | None, str | None]] = []
-        sources: List[tuple[str, Image.Image]] = []
+        native_tile, scale_factor = self.resolve_scale(tile_size, scale)
+        sheet_tile = native_tile * scale_factor
+        column_count = self._resolve_columns(frame_count, columns)
+        row_count = math.ceil(frame_count / column_count)
 
-        for frame_id, label, group, params in render_specs:
-            composed, stages = self.renderer.render(params)
+        # Frames are written straight into one preallocated buffer as they are
+        # rendered, so peak memory is the sheet plus the frame in flight.
+        sheet_array = np.zeros(
+            (row_count * native_tile, column_count * native_tile, 4), dtype=np.uint8
+        )
+        frames: List[BatchFrameResult] = []
+        sources: list[tuple[str, tuple[int, int, int, int]]] = []
+
+        labels = [("base", None, None)] if include_base else []
+        labels.extend(
+            (variant.id, variant.label, variant.group) for variant in variants
+        )
+        for index, ((frame_id, label, group), plan) in enumerate(zip(labels, plans)):
             if frame_mode == "layer" and layer_identifier is not None:
-                overlay = self._extract_layer_image(stages, layer_identifier)
-                if overlay is not None:
-                    image = overlay
-                else:
+                image = self.renderer.execute_layer(plan, layer_identifier)
+                if image is None:
                     image = self.repository.blank_canvas()
             else:
-                image = composed
-
-            images.append(image)
-            frame_infos.append((frame_id, label, group))
-            if include_sources:
-                sources.append((frame_id, image.copy()))
-
-        sheet_tile = tile_size or self.canvas_size
-        column_count = self._resolve_columns(len(images), columns)
-        row_count = math.ceil(len(images) / column_count)
-        sheet_width = column_count * sheet_tile
-        sheet_height = row_count * sheet_tile
+                image, _stages = self.renderer.execute(plan)
 
-        sheet = Image.new("RGBA", (sheet_width, sheet_height), (0, 0, 0, 0))
-        frames: List[BatchFrameResult] = []
+            if image.size != (native_tile, native_tile):
+                image = image.resize((native_tile, native_tile), Image.NEAREST)
 
-        for index, (image, info) in enumerate(zip(images, frame_infos)):
-            frame_id, label, group = info
             column = index % column_count
             row = index // column_count
-            x = column * sheet_tile
-            y = row * sheet_tile
-
-            tile = image
-            if image.size != (sheet_tile, sheet_tile):
-                tile = image.resize((sheet_tile, sheet_tile), Image.NEAREST)
-
-            sheet.paste(tile, (x, y), tile)
+            left = column * native_tile
+            top = row * native_tile
+            sheet_array[top : top + native_tile, left : left + native_tile] = (
+                np.asarray(image.convert("RGBA") if image.mode != "RGBA" else image)
+            )
 
             frames.append(
                 BatchFrameResult(
@@ -184,14 +313,201 @@ class RenderPipeline:
                     index=index,
                     column=column,
                     row=row,
-                    x=x,
-                    y=y,
+                    x=column * sheet_tile,
+                    y=row * sheet_tile,
                     width=sheet_tile,
                     height=sheet_tile,
                 )
             )
+            if include_sources:
+                sources.append(
+                    (frame_id, (left, top, left + native_tile, top + native_tile))
+                )
+
+        sheet = Image.fromarray(sheet_array, mode="RGBA")
+
+        return BatchPipelineResult(
+            sheet=sheet,
+            frames=frames,
+            sources=sources,
+            tile_size=sheet_tile,
+            scale=scale_factor,
+        )
+
+    def render_palette_preview(
+        self,
+        base_params: dict,
+        palette_id: str,
+        *,
+        columns: int | None = None,
+        scale: int | None = None,
+    ) -> BatchPipelineResult:
+        """Sheet of ``base_params`` rendered in every colour of ``palette_id``.
+
+        Raises ``KeyError`` for an unknown palette. Palette colours all tint
+        the WHITE pelt sprites, so one compiled plan serves every colour and
+        ``CatRendererV3.execute_colours`` renders them in one pass.
+        """
+        colours = self.mapper.experimental_categories[palette_id]
+        if not colours:
+            raise ValueError(f"palette {palette_id!r} has no colours")
+        params = {**self._normalize_params(base_params), "colour": colours[0]}
+        tiles = self.renderer.execute_colours(self.renderer.compile(params), colours)
+
+        native_tile = self.canvas_size
+        scale_factor = scale or 1
+        sheet_tile = native_tile * scale_factor
+        column_count = self._resolve_columns(len(colours), columns)
+        row_count = math.ceil(len(colours) / column_count)
+        padded = np.zeros(
+            (row_count * column_count, native_tile, native_tile, 4), dtype=np.uint8
+        )
+        padded[: len(colours)] = tiles
+        sheet_array = (
+            padded.reshape(row_count, column_count, native_tile, native_tile, 4)
+            .transpose(0, 2, 1, 3, 4)
+            .reshape(row_count * native_tile, column_count * native_tile, 4)
+        )
+        frames = [
+            BatchFrameResult(
+                id=colour,
+                label=colour,
+                group=palette_id,
+                index=index,
+                column=index % column_count,
+                row=index // column_count,
+                x=(index % column_count) * sheet_tile,
+                y=(index // column_count) * sheet_tile,
+                width=sheet_tile,
+                height=sheet_tile,
+            )
+            for index, colour in enumerate(colours)
+        ]
+        return BatchPipelineResult(
+            sheet=Image.fromarray(sheet_array, mode="RGBA"),
+            frames=frames,
+            sources=[],
+            tile_size=sheet_tile,
+            scale=scale_factor,
+        )
+
+    # ------------------------------------------------------------------
+    def resolve_scale(
+        self, tile_size: int | None, scale: int | None
+    ) -> tuple[int, int]:
+        """Return ``(native_tile, scale)`` for the requested output geometry.
+
+        An explicit ``scale`` wins. A ``tile_size`` that is an exact multiple of
+        the canvas is turned into an integer scale so the sheet is composed at
+        native size; anything else falls back to per-frame resizing.
+        """
+        if scale and scale > 1:
+            return self.canvas_size, int(scale)
+        if (
+            tile_size
+            and tile_size > self.canvas_size
+            and tile_size % self.canvas_size == 0
+        ):
+            return self.canvas_size, tile_size // self.canvas_size
+        return tile_size or self.canvas_size, 1
 
-        return BatchPipelineResult(sheet=sheet, frames=frames, sources=sources, tile_size=sheet_tile)
+    # ------------------------------------------------------------------
+    def diff(
+        self,
+        request: DiffRequest,
+        plans: tuple[RenderPlan, RenderPlan] | None = None,
+    ) -> DiffResponse:
+        return self.diff_batch([request], plans=None if plans is None else [plans])[0]
+
+    def diff_batch(
+        self,
+        requests: Sequence[DiffRequest],
+        *,
+        plans: Sequence[tuple[RenderPlan, RenderPlan]] | None = None,
+        max_cached_renders: int = 256,
+    ) -> list[DiffResponse]:
+        """Diff many param pairs, rendering each distinct param set once.
+
+        A pixel counts as mismatched when any channel differs by more than the
+        pair's ``epsilon``. All layers of a pair are stacked and compared in a
+        single int16 pass. Renders are keyed by compiled plan, so param sets
+        that only differ in ways the renderer ignores are rendered once.
+        ``plans`` holds each pair's (v2, v3) plans when the caller already
+        compiled them; otherwise they are compiled here.
+        """
+        if plans is None:
+            plans = [
+                (self.compile_payload(request.v2), self.compile_payload(request.v3))
+                for request in requests
+            ]
+        cache: OrderedDict[tuple[RenderPlan, bool], _DiffRender] = OrderedDict()
+
+        def rendered(
+            key: RenderPlan, collect_layers: bool
+        ) -> tuple[RenderPlan, _DiffRender]:
+            cache_key = (key, collect_layers)
+            entry = cache.get(cache_key)
+            if entry is not None:
+                cache.move_to_end(cache_key)
+                return key, entry
+            composed, stages = self.renderer.execute(key)
+            layers: OrderedDict[tuple[LayerIdentifier, int], np.ndarray] = OrderedDict()
+            if collect_layers:
+                seen: dict[LayerIdentifier, int] = {}
+                for info in stages:
+                    if info.image is None:
+                        continue
+                    occurrence = seen.get(info.identifier, 0)
+                    seen[info.identifier] = occurrence + 1
+                    layers[(info.identifier, occurrence)] = np.asarray(
+                        info.image, dtype=np.uint8
+                    )
+            entry = _DiffRender(np.asarray(composed, dtype=np.uint8), layers)
+            cache[cache_key] = entry
+            if len(cache) > max_cached_renders:
+                cache.popitem(last=False)
+            return key, entry
+
+        responses: list[DiffResponse] = []
+        for request, (plan_a, plan_b) in zip(requests, plans):
+            key_a, side_a = rendered(plan_a, request.collect_layers)
+            key_b, side_b = rendered(plan_b, request.collect_layers)
+            layer_keys = list(side_a.layers)
+            layer_keys.extend(k for k in side_b.layers if k not in side_a.layers)
+
+            total_pixels = int(side_a.composed.shape[0] * side_a.composed.shape[1])
+            if key_a == key_b:
+                counts = np.zeros(len(layer_keys) + 1, dtype=np.int64)
+            else:
+                blank = np.zeros_like(side_a.composed)
+                stack_a = np.stack(
+                    [
+                        side_a.composed,
+                        *(side_a.layers.get(k, blank) for k in layer_keys),
+                    ]
+                )
+                stack_b = np.stack(
+                    [
+                        side_b.composed,
+                        *(side_b.layers.get(k, blank) for k in layer_keys),
+                    ]
+                )
+                delta = np.abs(stack_a.astype(np.int16) - stack_b.astype(np.int16))
+                counts = (delta > request.epsilon).any(axis=-1).sum(axis=(1, 2))
+
+            results = [
+                DiffLayerResult(
+                    id=identifier,
+                    mismatch_pixels=int(count),
+                    total_pixels=total_pixels,
+                    mismatch_ratio=float(count) / total_pixels if total_pixels else 0.0,
+                )
+                for identifier, count in zip(
+                    [LayerIdentifier.output, *(k[0] for k in layer_keys)], counts
+                )
+            ]
+            responses.append(DiffResponse(composed=results[0], layers=results[1:]))
+        return responses
 
     # ------------------------------------------------------------------
     def _normalize_params(self, params: dict) -> dict:
@@ -211,14 +527,6 @@ class RenderPipeline:
         params.setdefault("spriteNumber", base_params.get("spriteNumber", 0))
         return params
 
-    # ------------------------------------------------------------------
-    @staticmethod
-    def _extract_layer_image(stage_infos: List[StageInfo], target: LayerIdentifier) -> Image.Image | None:
-        for info in stage_infos:
-            if info.identifier == target and info.image is not None:
-                return info.image.copy()
-        return None
-
     # ------------------------------------------------------------------
     @staticmethod
     def _resolve_columns(total_frames: int, requested: int | None) -> int:
@@ -0,0 +1,79 @@
+"""Compiled render plans.
+
+``CatRendererV3.compile`` resolves a raw params dict into a ``RenderPlan``:
+every name is normalised, every sprite key looked up and every tint resolved
+up front, so executing the plan only touches image data. Plans are immutable
+and hashable, which also makes them usable as cache keys.
+
+Inline custom colours are keyed by a content hash, and the pelt step holds a
+reference to each definition it uses. A plan therefore stays renderable after
+the registry evicts the colour, and that reference is left out of the key.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Literal
+
+from ..models import LayerIdentifier
+
+if TYPE_CHECKING:
+    from .custom_colours import CustomColourDefinition
+
+RGB = tuple[int, int, int]
+
+PlanOp = Literal[
+    # single sprite, optionally multiplied by ``tint``
+    "sprite",
+    # ``sprites`` alpha-composited onto a blank canvas
+    "stack",
+    # pelt layers: ``sprites`` with per-layer ``colours`` (experimental palette
+    # keys) and tortie ``masks``
+    "pelt",
+    # multiply ``tint`` then add ``dilute`` over the current canvas
+    "canvas_tint",
+    # fixed Dark Forest multiply over the current canvas
+    "dark_forest",
+    # cut missing-scar masks (``sprites`` holds scar names) out of the canvas
+    "missing_scars",
+]
+
+# Ops whose overlay is derived from the canvas composed so far.
+CANVAS_OPS = frozenset({"canvas_tint", "dark_forest", "missing_scars"})
+
+
+class PlanCompileError(ValueError):
+    """Raised when render params cannot be compiled into a plan."""
+
+
+@dataclass(frozen=True, slots=True)
+class PlanStep:
+    stage: str
+    op: PlanOp
+    identifier: LayerIdentifier
+    blend: str
+    diagnostics: tuple[str, ...]
+    sprites: tuple[str, ...] = ()
+    colours: tuple[str | None, ...] = ()
+    masks: tuple[str | None, ...] = ()
+    tint: RGB | None = None
+    dilute: RGB | None = None
+    # ``CUSTOM:`` keys in ``colours`` -> their definitions, resolved at compile time.
+    custom_colours: Mapping[str, CustomColourDefinition] = field(
+        default_factory=dict, compare=False, hash=False, repr=False
+    )
+
+    @property
+    def needs_canvas(self) -> bool:
+        return self.op in CANVAS_OPS
+
+
+@dataclass(frozen=True, slots=True)
+class RenderPlan:
+    sprite_number: int
+    reverse: bool
+    steps: tuple[PlanStep, ...]
+
+
+__all__ = ["CANVAS_OPS", "PlanCompileError", "PlanOp", "PlanStep", "RenderPlan"]
@@ -1,15 +1,12 @@
 from __future__ import annotations
 
-from __future__ import annotations
-
-import json
-from functools import lru_cache
 from pathlib import Path
 from typing import Dict
 
 from PIL import Image
 
 from ..config import settings
+from ..resources import load_json_cached
 from .colors import resolve_colour
 
 
@@ -20,14 +17,17 @@ class SpriteRepository:
         self.sprite_root = sprite_root or settings.sprite_root
         self.tile_size = tile_size
         data_root = Path(__file__).resolve().parents[1] / "data"
-        with open(data_root / "spritesIndex.json", "r", encoding="utf-8") as fh:
-            self.sprite_index: Dict[str, dict] = json.load(fh)
-        with open(data_root / "spritesOffsetMap.json", "r", encoding="utf-8") as fh:
-            self.sprite_offsets = json.load(fh)
+        self.sprite_index: dict[str, dict] = load_json_cached(
+            data_root / "spritesIndex.json"
+        )
+        self.sprite_offsets = load_json_cached(data_root / "spritesOffsetMap.json")
 
         self._sheet_cache: Dict[str, Image.Image] = {}
         self._sprite_cache: Dict[tuple[str, int], Image.Image] = {}
         self._missing_mask_cache: Dict[tuple[str, int], Image.Image] = {}
+        # Plan compilation asks has_sprite for every candidate key; memoise
+        # the filesystem probe per sheet.
+        self._sheet_exists: dict[str, bool] = {}
 
     # ------------------------------------------------------------------
     # Sprite sheet helpers
@@ -43,6 +43,14 @@ class SpriteRepository:
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
+    def preload_sheet(self, sheet_name: str) -> bool:
+        """Decode an atlas into the sheet cache ahead of use; False if it is missing."""
+        try:
+            self._load_sheet(sheet_name)
+        except FileNotFoundError:
+            return False
+        return True
+
     def blank_canvas(self, colour: tuple[int, int, int, int] | None = None) -> Image.Image:
         colour = colour or (0, 0, 0, 0)
         return Image.new("RGBA", (self.tile_size, self.tile_size), colour)
@@ -159,10 +167,46 @@ class SpriteRepository:
         sprite.putdata(new_data)
         return sprite
 
-    def has_sprite(self, sprite_name: str, sprite_number: int | None = None) -> bool:
+    def adopt(self, previous: SpriteRepository, changed_sheets: set[str]) -> set[str]:
+        """Take over ``previous``'s decoded sheets and tiles that are still valid.
+
+        Sheets named in ``changed_sheets`` are left behind, as is every tile
+        whose index entry differs. Returns the sprite names whose tiles may
+        differ from ``previous``.
+        """
+        names = previous.sprite_index.keys() | self.sprite_index.keys()
+        if (
+            previous.tile_size != self.tile_size
+            or previous.sprite_offsets != self.sprite_offsets
+        ):
+            return set(names) | changed_sheets
+        stale = {
+            name
+            for name in names
+            if previous.sprite_index.get(name) != self.sprite_index.get(name)
+            or self._sheet_name(name) in changed_sheets
+        } | changed_sheets
+        # Snapshot first: render threads may still be filling ``previous``.
+        for sheet, image in dict(previous._sheet_cache).items():
+            if sheet not in changed_sheets:
+                self._sheet_cache.setdefault(sheet, image)
+        for key, tile in dict(previous._sprite_cache).items():
+            if key[0] not in stale:
+                self._sprite_cache.setdefault(key, tile)
+        if "missingscars" not in changed_sheets:
+            for key, mask in dict(previous._missing_mask_cache).items():
+                if f"scars{key[0]}" not in stale:
+                    self._missing_mask_cache.setdefault(key, mask)
+        return stale
+
+    def _sheet_name(self, sprite_name: str) -> str:
         info = self.sprite_index.get(sprite_name)
-        if info:
-            sheet_path = self.sprite_root / f"{info['spritesheet']}.png"
-            return sheet_path.exists()
-        sheet_path = self.sprite_root / f"{sprite_name}.png"
-        return sheet_path.exists()
+        return info["spritesheet"] if info else sprite_name
+
+    def has_sprite(self, sprite_name: str, sprite_number: int | None = None) -> bool:
+        sheet_name = self._sheet_name(sprite_name)
+        exists = self._sheet_exists.get(sheet_name)
+        if exists is None:
+            exists = (self.sprite_root / f"{sheet_name}.png").exists()
+            self._sheet_exists[sheet_name] = exists
+        return exists
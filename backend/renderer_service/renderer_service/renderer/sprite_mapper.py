@@ -2,15 +2,63 @@ from __future__ import annotations
 
 import json
 import logging
-from dataclasses import dataclass
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Dict, Iterable, List, Optional
 
+import numpy as np
+
+from ..resources import load_json_cached
+from .patterns import (
+    PatternDefinition,
+    generate_pattern_tile,
+    generate_scaled_pattern_tile,
+)
 from .repository import SpriteRepository
 
 logger = logging.getLogger("renderer.sprite_mapper")
 
 
+# Fallback lists mirrored from the browser sprite mapper; peltInfo.json only
+# ships scar and accessory groups.
+DEFAULT_EYE_COLOURS = [
+    "YELLOW",
+    "AMBER",
+    "HAZEL",
+    "PALEGREEN",
+    "GREEN",
+    "BLUE",
+    "DARKBLUE",
+    "GREY",
+    "CYAN",
+    "EMERALD",
+    "HEATHERBLUE",
+    "SUNLITICE",
+    "COPPER",
+    "SAGE",
+    "COBALT",
+    "PALEBLUE",
+    "PALEYELLOW",
+    "GOLD",
+    "GREENYELLOW",
+    "BRONZE",
+    "SILVER",
+]
+DEFAULT_POINTS = ["COLOURPOINT", "RAGDOLL", "SEPIAPOINT", "MINKPOINT", "SEALPOINT"]
+DEFAULT_VITILIGO = [
+    "VITILIGO",
+    "VITILIGOTWO",
+    "MOON",
+    "PHANTOM",
+    "KARPATI",
+    "POWDER",
+    "BLEACHED",
+    "SMOKEY",
+]
+
+
 class MissingAccessorySprite(RuntimeError):
     """Raised when an accessory cannot be mapped to an atlas sprite."""
 
@@ -21,7 +69,87 @@ class ExperimentalColourDefinition:
     multiply: Optional[List[float]] = None
     screen: Optional[List[float]] = None
     overlay: Optional[List[float]] = None
+    # Raw palette JSON (kept for /palettes); ``pattern_definition`` is the
+    # validated form, None when the pattern failed validation at load.
     pattern: Optional[dict] = None
+    pattern_definition: PatternDefinition | None = None
+    # Generated tiles per (width, height); None records a generation failure.
+    _pattern_tiles: dict[tuple[int, int], np.ndarray | None] = field(
+        default_factory=dict, repr=False, compare=False
+    )
+
+    def pattern_tile(
+        self, width: int, height: int, scale: int = 1
+    ) -> np.ndarray | None:
+        """Pattern tile for a canvas size, generated once and kept on the definition.
+
+        Returns None for invalid patterns or when generation failed (logged once).
+        ``scale`` > 1 is a hi-res canvas of ``width`` x ``height``; those tiles
+        live in the bounded LRU of ``generate_scaled_pattern_tile`` instead.
+        """
+        if self.pattern_definition is None:
+            return None
+        if scale > 1:
+            native = self.pattern_tile(width // scale, height // scale)
+            if native is None:
+                return None
+            try:
+                return generate_scaled_pattern_tile(
+                    self.pattern_definition, width, height, scale
+                )
+            except Exception:
+                logger.warning(
+                    "Hi-res pattern failed; upscaling the 1x tile. pattern=%r",
+                    self.pattern,
+                    exc_info=True,
+                )
+                return np.repeat(np.repeat(native, scale, axis=0), scale, axis=1)
+        key = (width, height)
+        if key not in self._pattern_tiles:
+            try:
+                tile = generate_pattern_tile(self.pattern_definition, width, height)
+            except (ImportError, OSError) as exc:
+                # SVG generators need cairo; without it the colour stays plain.
+                logger.warning(
+                    "No SVG rasteriser for pattern %r: %s", self.pattern, exc
+                )
+                tile = None
+            except Exception:
+                logger.exception(
+                    "Pattern generation failed; colour renders without it. pattern=%r",
+                    self.pattern,
+                )
+                tile = None
+            self._pattern_tiles[key] = tile
+        return self._pattern_tiles[key]
+
+
+# Sprite-index prefixes of accessory atlases, longest first so that e.g.
+# ``acc_smallAnimal`` wins over a bare ``acc_`` split.
+ACCESSORY_PREFIXES = (
+    "tail2_accessories",
+    "acc_smallanimal",
+    "acc_smallAnimal",
+    "acc_aliveinsect",
+    "acc_aliveInsect",
+    "acc_deadinsect",
+    "acc_deadInsect",
+    "acc_crafted",
+    "acc_flower",
+    "acc_plant2",
+    "acc_herbs",
+    "acc_snake",
+    "acc_fruit",
+    "acc_tail2",
+    "acc_wild",
+    "collars",
+)
+SCAR_PREFIXES = ("scars", "scar")
+
+
+def _alias_key(name: str) -> str:
+    """Canonical spelling used to key alias tables: no whitespace/dashes, upper case."""
+    return "".join(str(name).split()).replace("-", "").upper()
 
 
 def _dedupe(seq: Iterable[str]) -> List[str]:
@@ -42,7 +170,7 @@ def _dedupe(seq: Iterable[str]) -> List[str]:
 class SpriteMapper:
     """Python port of the browser sprite mapper used by catGeneratorV2."""
 
-    def __init__(self, data_dir: Path) -> None:
+    def __init__(self, data_dir: Path, *, validate: bool = True) -> None:
         self.data_dir = data_dir
         self.sprites_index: Dict[str, dict] | None = None
         self.pelt_info: Dict[str, list] | None = None
@@ -62,26 +190,20 @@ class SpriteMapper:
         self.vitiligo: List[str] = []
 
         self._load()
+        if validate:
+            self.validate_accessory_sprites()
 
     # ------------------------------------------------------------------
     def _load(self) -> None:
-        index_path = self.data_dir / "spritesIndex.json"
-        with index_path.open("r", encoding="utf-8") as fh:
-            self.sprites_index = json.load(fh)
+        # Shared with SpriteRepository, which reads the same index.
+        self.sprites_index = load_json_cached(self.data_dir / "spritesIndex.json")
+        self.pelt_info = load_json_cached(self.data_dir / "peltInfo.json")
 
-        pelt_path = self.data_dir / "peltInfo.json"
-        with pelt_path.open("r", encoding="utf-8") as fh:
-            self.pelt_info = json.load(fh)
-
-        tint_path = self.data_dir / "tint.json"
-        with tint_path.open("r", encoding="utf-8") as fh:
-            tint_data = json.load(fh)
+        tint_data = load_json_cached(self.data_dir / "tint.json")
         self.tints = tint_data.get("tint_colours", {})
         self.dilute_tints = tint_data.get("dilute_tint_colours", {})
 
-        wp_tint_path = self.data_dir / "white_patches_tint.json"
-        with wp_tint_path.open("r", encoding="utf-8") as fh:
-            wp_tint_data = json.load(fh)
+        wp_tint_data = load_json_cached(self.data_dir / "white_patches_tint.json")
         self.white_patch_tints = wp_tint_data.get("tint_colours", {})
 
         self.experimental_defs = self._load_experimental_defs()
@@ -136,7 +258,13 @@ class SpriteMapper:
             for name in sprite_keys
             if name.startswith("collars")
         }
-        self.accessory_lookup: Dict[str, str] = {}
+        self.accessory_lookup: dict[str, str] = {}
+        self.accessory_aliases: dict[str, str] = {}
+        self.scar_aliases: dict[str, str] = {}
+        # Alias key -> sprite key that renders, for the repository given to
+        # ``resolve_aliases``.
+        self.accessory_sprites: dict[str, str] = {}
+        self.scar_sprites: dict[str, str] = {}
 
         self.accessories = self._collect_accessories()
         if not self.accessories:
@@ -152,13 +280,22 @@ class SpriteMapper:
                 "peltInfo.json does not contain scar definitions (scars1/2/3)."
             )
 
+        if not self.eye_colours:
+            self.eye_colours = list(DEFAULT_EYE_COLOURS)
+        if not self.skin_colours:
+            self.skin_colours = self._gather_skin_colours()
+        if not self.points:
+            self.points = list(DEFAULT_POINTS)
+        if not self.vitiligo:
+            self.vitiligo = list(DEFAULT_VITILIGO)
+
         if not self.white_patches:
             self.white_patches = self._gather_white_patches()
         if not self.white_patches:
             raise ValueError("Could not derive white patches from sprite index data.")
 
         self._build_accessory_lookup()
-        self._validate_accessory_sprites()
+        self._build_alias_tables()
 
     # ------------------------------------------------------------------
     def _load_experimental_defs(self) -> Dict[str, ExperimentalColourDefinition]:
@@ -167,11 +304,14 @@ class SpriteMapper:
         result: Dict[str, ExperimentalColourDefinition] = {}
         self.experimental_categories = {}
         self._palette_metadata: List[dict] = []
+        self.palette_load_ms: dict[str, float] = {}
+        self.palette_errors: list[dict] = []
 
         if not palettes_dir.exists():
             return result
 
         for palette_file in sorted(palettes_dir.glob("*.json")):
+            started = time.perf_counter()
             try:
                 with open(palette_file, "r", encoding="utf-8") as f:
                     palette_data = json.load(f)
@@ -194,15 +334,22 @@ class SpriteMapper:
                 for color_name, color_def in colors.items():
                     upper_name = color_name.upper()
                     category_colors.append(upper_name)
+                    pattern = color_def.get("pattern")
                     result[upper_name] = ExperimentalColourDefinition(
                         base_colour="WHITE",
                         multiply=color_def.get("multiply"),
                         screen=color_def.get("screen"),
                         overlay=color_def.get("overlay"),
-                        pattern=color_def.get("pattern"),
+                        pattern=pattern,
+                        pattern_definition=self._compile_pattern(
+                            palette_id, upper_name, pattern
+                        ),
                     )
 
                 self.experimental_categories[palette_id] = category_colors
+                self.palette_load_ms[palette_id] = (
+                    time.perf_counter() - started
+                ) * 1000
 
             except (
                 json.JSONDecodeError,
@@ -213,8 +360,59 @@ class SpriteMapper:
             ) as e:
                 logger.error("Failed to load palette %s: %s", palette_file, e)
 
+        if self.palette_load_ms:
+            slowest = sorted(self.palette_load_ms.items(), key=lambda item: -item[1])[
+                :3
+            ]
+            logger.info(
+                "Loaded %d palettes (%d colours) in %.1f ms; slowest: %s; %d invalid patterns",
+                len(self.palette_load_ms),
+                len(result),
+                sum(self.palette_load_ms.values()),
+                ", ".join(f"{name} {ms:.1f} ms" for name, ms in slowest),
+                len(self.palette_errors),
+            )
         return result
 
+    def _compile_pattern(
+        self, palette_id: str, colour: str, pattern: dict | None
+    ) -> PatternDefinition | None:
+        if not pattern:
+            return None
+        try:
+            return PatternDefinition.from_dict(pattern)
+        except (KeyError, TypeError, ValueError) as exc:
+            logger.warning("Invalid pattern for %s/%s: %s", palette_id, colour, exc)
+            self.palette_errors.append(
+                {"palette": palette_id, "colour": colour, "error": str(exc)}
+            )
+            return None
+
+    def adopt_definitions(self, previous: SpriteMapper) -> set[str]:
+        """Reuse ``previous``'s colour definitions wherever they are unchanged.
+
+        A reused definition keeps its generated pattern tiles, and renderer
+        LUTs keyed on the definition object stay valid. Returns the colour
+        keys that changed or disappeared.
+        """
+        changed: set[str] = set()
+        for colour, definition in previous.experimental_defs.items():
+            if self.experimental_defs.get(colour) == definition:
+                self.experimental_defs[colour] = definition
+            else:
+                changed.add(colour)
+        return changed
+
+    def pattern_definitions(self) -> list[PatternDefinition]:
+        """Distinct valid pattern definitions across all palettes."""
+        return list(
+            dict.fromkeys(
+                definition.pattern_definition
+                for definition in self.experimental_defs.values()
+                if definition.pattern_definition is not None
+            )
+        )
+
     def get_palette_metadata(self) -> List[dict]:
         """Return palette metadata for API endpoint"""
         return getattr(self, "_palette_metadata", [])
@@ -307,7 +505,89 @@ class SpriteMapper:
         return self.sprites_index or {}
 
     # ------------------------------------------------------------------
-    def accessory_sprite_name(self, raw: str) -> Optional[str]:
+    def accessory_sprite_name(self, raw: str) -> str | None:
+        """Sprite key for an accessory, without checking that its atlas exists."""
+        if not raw:
+            return None
+        return self.accessory_aliases.get(_alias_key(raw))
+
+    def scar_sprite_name(self, raw: str) -> str | None:
+        if not raw:
+            return None
+        return self.scar_aliases.get(_alias_key(raw))
+
+    def resolve_accessory(self, raw: str) -> str | None:
+        """Sprite key an accessory renders with, or None; see ``resolve_aliases``."""
+        return self.accessory_sprites.get(_alias_key(raw)) if raw else None
+
+    def resolve_scar(self, normalized: str) -> str | None:
+        """Sprite key a scar (as ``_alias_key`` spells it) renders with, or None."""
+        return self.scar_sprites.get(normalized)
+
+    def resolve_aliases(self, repository: SpriteRepository) -> None:
+        """Resolve every accepted spelling against ``repository``'s atlases, once.
+
+        Compiling a plan then resolves an accessory or scar with one dict
+        lookup. Hot reload builds a new mapper, so the tables follow the
+        files on disk.
+        """
+        self.accessory_sprites, self.scar_sprites = self._alias_sprites(
+            repository.has_sprite
+        )
+
+    def _alias_sprites(
+        self, has_sprite: Callable[[str], bool]
+    ) -> tuple[dict[str, str], dict[str, str]]:
+        """``(accessories, scars)``: alias key -> first candidate ``has_sprite`` finds.
+
+        Declared accessories try what the renderer always has: the candidate
+        walk, then the raw, upper-case, space-free, collar, herb and wild
+        spellings, then the alias table. Scars try ``scars<NAME>``, then
+        ``scar<NAME>``, then the alias table. Other atlas spellings only add
+        keys no declared name already holds.
+        """
+        accessories: dict[str, str] = {}
+        for name in self.accessories:
+            key = _alias_key(name)
+            if key in accessories:
+                continue
+            trimmed = name.strip()
+            upper = trimmed.upper()
+            for candidate in (
+                self._probe_accessory_sprite(trimmed),
+                trimmed,
+                upper,
+                trimmed.replace(" ", ""),
+                upper.replace(" ", ""),
+                f"collars{upper}",
+                f"collars{trimmed}",
+                f"acc_herbs{trimmed}",
+                f"acc_herbs{upper}",
+                f"acc_wild{trimmed}",
+                f"acc_wild{upper}",
+                self.accessory_aliases.get(key),
+            ):
+                if candidate and has_sprite(candidate):
+                    accessories[key] = candidate
+                    break
+        for alias, sprite_key in self.accessory_aliases.items():
+            if alias not in accessories and has_sprite(sprite_key):
+                accessories[alias] = sprite_key
+
+        scars: dict[str, str] = {}
+        for key in dict.fromkeys(
+            [*self.scar_aliases, *(_alias_key(name) for name in self.scars)]
+        ):
+            alias = self.scar_aliases.get(key)
+            for candidate in (f"scars{key}", f"scar{key}", alias):
+                if candidate and has_sprite(candidate):
+                    scars[key] = candidate
+                    break
+        return accessories, scars
+
+    def _probe_accessory_sprite(self, raw: str) -> str | None:
+        """Original candidate walk; seeds the alias table, and is the first
+        candidate ``resolve_aliases`` tries for each declared accessory."""
         if not raw:
             return None
 
@@ -405,6 +685,14 @@ class SpriteMapper:
                 combined.extend(str(item) for item in values if item)
         return _dedupe(combined)
 
+    # ------------------------------------------------------------------
+    def _gather_skin_colours(self) -> list[str]:
+        return _dedupe(
+            key[4:]
+            for key in self.sprites_index
+            if key.startswith("skin") and key not in {"skin", "skinparalyzed"}
+        )
+
     # ------------------------------------------------------------------
     def _gather_white_patches(self) -> List[str]:
         derived: List[str] = []
@@ -436,16 +724,76 @@ class SpriteMapper:
         self.accessory_lookup = lookup
 
     # ------------------------------------------------------------------
-    def _validate_accessory_sprites(self) -> None:
-        repository = SpriteRepository()
-        missing: List[tuple[str, str | None]] = []
+    def _build_alias_tables(self) -> None:
+        """Map accepted spellings of accessories and scars to sprite keys.
+
+        The alias tables key every atlas key (and its suffix after a known
+        prefix) by ``_alias_key``, declared accessories first with the
+        candidate walk's answer. They do not check that atlases exist; see
+        ``resolve_aliases``.
+        """
+        accessories: dict[str, str] = {}
         for name in self.accessories:
-            sprite_key = self.accessory_sprite_name(name)
-            if not sprite_key or not repository.has_sprite(sprite_key, 8):
-                missing.append((name, sprite_key))
+            sprite_key = self._probe_accessory_sprite(name)
+            if sprite_key:
+                accessories.setdefault(_alias_key(name), sprite_key)
+
+        scar_keys: list[tuple[int, str, str]] = []
+        for key in self.sprite_index:
+            for prefix in ACCESSORY_PREFIXES:
+                if key.startswith(prefix) and len(key) > len(prefix):
+                    accessories.setdefault(_alias_key(key), key)
+                    accessories.setdefault(_alias_key(key[len(prefix) :]), key)
+                    break
+            for rank, prefix in enumerate(SCAR_PREFIXES):
+                if key.startswith(prefix) and len(key) > len(prefix):
+                    scar_keys.append((rank, key, prefix))
+                    break
+        for alias, key in self.accessory_lookup.items():
+            accessories.setdefault(_alias_key(alias), key)
+
+        # ``scars<NAME>`` wins over ``scar<NAME>``, as in ``resolve_scar``.
+        scars: dict[str, str] = {}
+        for _rank, key, prefix in sorted(scar_keys, key=lambda entry: entry[0]):
+            scars.setdefault(_alias_key(key[len(prefix) :]), key)
+
+        self.accessory_aliases = accessories
+        self.scar_aliases = scars
+
+    def unresolved_aliases(
+        self, repository: SpriteRepository | None = None
+    ) -> dict[str, list[dict]]:
+        """Declared accessories/scars that map to no sprite, or to one whose atlas is missing."""
+        repository = repository or SpriteRepository()
+        accessories, scars = self._alias_sprites(repository.has_sprite)
+        report: dict[str, list[dict]] = {"accessories": [], "scars": []}
+        for kind, names, resolved, sprite_name in (
+            ("accessories", self.accessories, accessories, self.accessory_sprite_name),
+            ("scars", self.scars, scars, self.scar_sprite_name),
+        ):
+            for name in names:
+                if _alias_key(name) in resolved:
+                    continue
+                sprite_key = sprite_name(name)
+                report[kind].append(
+                    {
+                        "alias": name,
+                        "sprite": sprite_key,
+                        "reason": "missing_atlas" if sprite_key else "unmapped",
+                    }
+                )
+        return report
+
+    # ------------------------------------------------------------------
+    def validate_accessory_sprites(
+        self, repository: SpriteRepository | None = None
+    ) -> None:
+        """Raise MissingAccessorySprite if any accessory lacks an atlas sprite."""
+        missing = self.unresolved_aliases(repository)["accessories"]
         if missing:
             sample = ", ".join(
-                f"{name} -> {sprite or 'None'}" for name, sprite in missing[:10]
+                f"{entry['alias']} -> {entry['sprite'] or 'None'}"
+                for entry in missing[:10]
             )
             raise MissingAccessorySprite(
                 f"{len(missing)} accessories do not have sprite mappings. Sample: {sample}. "
@@ -453,5 +801,5 @@ class SpriteMapper:
             )
 
 
-def get_sprite_mapper(data_dir: Path) -> SpriteMapper:
-    return SpriteMapper(data_dir)
+def get_sprite_mapper(data_dir: Path, *, validate: bool = True) -> SpriteMapper:
+    return SpriteMapper(data_dir, validate=validate)
@@ -0,0 +1,116 @@
+"""Content-addressed on-disk store for rasterised pattern tiles.
+
+SVG pattern generators go through cairo, which is slow and not always
+installed. Each rasterised tile is saved under ``cache_dir`` as a raw uint8
+``.npy`` array keyed by a hash of the SVG source and output size, so a tile is
+rasterised once per deployment and every later worker or restart memory-maps
+it instead.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+
+from ..config import settings
+
+logger = logging.getLogger("renderer.tile_store")
+
+# Bump when the stored array layout or rasterisation settings change.
+STORE_VERSION = "v1"
+
+
+class TileStore:
+    def __init__(self, root: Path | None, *, enabled: bool = True) -> None:
+        self.root = root
+        self.enabled = enabled and root is not None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.errors = 0
+
+    @staticmethod
+    def key(source: str, width: int, height: int) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{STORE_VERSION}:{width}x{height}\n".encode("ascii"))
+        digest.update(source.encode("utf-8"))
+        return digest.hexdigest()
+
+    def path(self, key: str) -> Path:
+        assert self.root is not None
+        return self.root / key[:2] / f"{key}.npy"
+
+    def load(self, key: str) -> np.ndarray | None:
+        """Memory-mapped uint8 tile for ``key``, or None on a miss."""
+        if not self.enabled:
+            return None
+        path = self.path(key)
+        try:
+            array = np.load(path, mmap_mode="r", allow_pickle=False)
+        except FileNotFoundError:
+            self._count("misses")
+            return None
+        except (OSError, ValueError):
+            # Truncated or foreign file; drop it so the next write replaces it.
+            logger.warning("Discarding unreadable tile %s", path, exc_info=True)
+            path.unlink(missing_ok=True)
+            self._count("errors")
+            self._count("misses")
+            return None
+        self._count("hits")
+        return array
+
+    def save(self, key: str, array: np.ndarray) -> None:
+        if not self.enabled:
+            return
+        path = self.path(key)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "wb") as handle:
+                np.save(
+                    handle,
+                    np.ascontiguousarray(array, dtype=np.uint8),
+                    allow_pickle=False,
+                )
+            os.replace(tmp, path)
+        except OSError:
+            logger.warning("Could not write tile %s", path, exc_info=True)
+            tmp.unlink(missing_ok=True)
+            self._count("errors")
+            return
+        self._count("writes")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "root": str(self.root) if self.root else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "errors": self.errors,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+@lru_cache(maxsize=1)
+def get_tile_store() -> TileStore:
+    return TileStore(
+        settings.cache_dir / "pattern-tiles", enabled=settings.enable_cache
+    )
+
+
+__all__ = ["STORE_VERSION", "TileStore", "get_tile_store"]
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Callable, Collection, Hashable
+
+from PIL import Image
+
+from .custom_colours import CUSTOM_PREFIX
+
+# Lookups of every custom colour share one counter: they are one-off
+# inline specs, not catalog colours an operator could pre-warm.
+CUSTOM_BUCKET = f"{CUSTOM_PREFIX}*"
+
+
+class TintCache:
+    """Bounded LRU of tinted pelt tiles keyed by ``(sprite, pose, colour)``.
+
+    Shared by the render workers, so every access takes a lock. ``maxsize=0``
+    disables caching while still counting lookups. ``colour_counts`` tracks at
+    most ``max_tracked`` colours; past that the least requested half is
+    dropped.
+    """
+
+    def __init__(self, maxsize: int = 2048, *, max_tracked: int = 512) -> None:
+        self.maxsize = maxsize
+        self.max_tracked = max_tracked
+        self._entries: OrderedDict[Hashable, Image.Image] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidated = 0
+        # Lookups per colour key; tells operators which colours to pre-warm.
+        self.colour_counts: Counter[str] = Counter()
+
+    def get_or_create(
+        self,
+        sprite_name: str,
+        sprite_number: int,
+        colour: str,
+        create: Callable[[], Image.Image],
+    ) -> Image.Image:
+        key = (sprite_name, int(sprite_number), colour)
+        with self._lock:
+            self._count(colour)
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached.copy()
+            self.misses += 1
+
+        image = create()
+        if self.maxsize > 0:
+            with self._lock:
+                self._entries[key] = image
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return image.copy()
+
+    def _count(self, colour: str) -> None:
+        if colour.startswith(CUSTOM_PREFIX):
+            colour = CUSTOM_BUCKET
+        counts = self.colour_counts
+        counts[colour] += 1
+        if len(counts) > self.max_tracked:
+            self.colour_counts = Counter(
+                dict(counts.most_common(max(1, self.max_tracked // 2)))
+            )
+
+    def contains(self, sprite_name: str, sprite_number: int, colour: str) -> bool:
+        with self._lock:
+            return (sprite_name, int(sprite_number), colour) in self._entries
+
+    def clear(self, colour: str | None = None) -> None:
+        """Drop every entry, or only those tinted with ``colour``."""
+        with self._lock:
+            if colour is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[2] == colour]:
+                del self._entries[key]
+
+    def carry_over(
+        self, *, colours: Collection[str] = (), sprites: Collection[str] = ()
+    ) -> TintCache:
+        """A new cache with this one's entries, minus those of ``colours`` or ``sprites``.
+
+        Used by hot reload: jobs still running against the old pipeline keep
+        filling this cache without leaking stale tiles into the new one.
+        Counters carry over so ``/health`` stays continuous.
+        """
+        cache = TintCache(self.maxsize, max_tracked=self.max_tracked)
+        with self._lock:
+            cache._entries = OrderedDict(
+                (key, image)
+                for key, image in self._entries.items()
+                if key[0] not in sprites and key[2] not in colours
+            )
+            cache.hits = self.hits
+            cache.misses = self.misses
+            cache.evictions = self.evictions
+            cache.invalidated = (
+                self.invalidated + len(self._entries) - len(cache._entries)
+            )
+            cache.colour_counts = self.colour_counts.copy()
+        return cache
+
+    def stats(self, top: int = 10) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidated": self.invalidated,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "top_colours": self.colour_counts.most_common(top),
+            }
+
+
+__all__ = ["TintCache"]
@@ -1,27 +1,39 @@
 from __future__ import annotations
 
 import logging
+from collections.abc import Sequence
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from functools import cached_property
+from typing import Dict, List, Optional
 
 import numpy as np
 from PIL import Image, ImageOps
 
+from ..models import LayerIdentifier
+from .custom_colours import (
+    CUSTOM_PREFIX,
+    CustomColourDefinition,
+    CustomColourRegistry,
+)
 from .image_ops import (
     add,
+    alpha_over,
+    apply_mask,
+    apply_missing_scar,
     fill_with_colour,
+    finish_channel_lut,
     multiply,
+    multiply_colour,
+    sanitize_transparency,
     screen,
-    apply_mask,
-    apply_missing_scar,
+    take_channel_lut,
     tint_image,
-    sanitize_transparency,
-    alpha_over,
+    upscale_nearest,
 )
-from .patterns import PatternDefinition, generate_pattern_tile
+from .plan import PlanCompileError, PlanStep, RenderPlan
 from .repository import SpriteRepository
 from .sprite_mapper import SpriteMapper
-from ..models import LayerIdentifier
+from .tint_cache import TintCache
 
 logger = logging.getLogger("renderer.v3")
 
@@ -97,7 +109,55 @@ class StageInfo:
     blend_mode: str
 
 
-def _deduplicate(items: List[str]) -> List[str]:
+_RAMP = np.arange(256, dtype=np.float32) / 255.0
+
+
+def _parse_blend(values) -> tuple[np.ndarray, float]:
+    colour = np.array([values[0], values[1], values[2]], dtype=np.float32) / 255.0
+    if len(values) >= 4:
+        raw_alpha = values[3]
+        blend_alpha = raw_alpha / 255.0 if raw_alpha > 1 else raw_alpha
+    else:
+        blend_alpha = 1.0
+    return colour, np.clip(blend_alpha, 0.0, 1.0)
+
+
+def _blend(rgb: np.ndarray, values, mode: str) -> np.ndarray:
+    colour, blend_alpha = _parse_blend(values)
+    if mode == "multiply":
+        blend_rgb = rgb * colour
+    elif mode == "screen":
+        blend_rgb = 1.0 - (1.0 - rgb) * (1.0 - colour)
+    elif mode == "overlay":
+        blend_rgb = np.where(
+            rgb <= 0.5,
+            2.0 * rgb * colour,
+            1.0 - 2.0 * (1.0 - rgb) * (1.0 - colour),
+        )
+    else:
+        blend_rgb = rgb
+    return (1.0 - blend_alpha) * rgb + blend_alpha * blend_rgb
+
+
+def _experimental_blends(
+    rgb: np.ndarray, definition, *, include_multiply: bool
+) -> np.ndarray:
+    """Apply an experimental colour's multiply/screen/overlay blends to float RGB."""
+    if include_multiply and definition.multiply:
+        rgb = _blend(rgb, definition.multiply, "multiply")
+    if definition.screen:
+        rgb = _blend(rgb, definition.screen, "screen")
+    if definition.overlay:
+        rgb = _blend(rgb, definition.overlay, "overlay")
+    return rgb
+
+
+def _tile_rows(image: Image.Image, count: int) -> Image.Image:
+    """``count`` copies of ``image`` stacked vertically."""
+    return Image.fromarray(np.tile(np.asarray(image), (count, 1, 1)), mode="RGBA")
+
+
+def _deduplicate(items: list[str]) -> list[str]:
     seen = set()
     result: List[str] = []
     for item in items:
@@ -109,10 +169,82 @@ def _deduplicate(items: List[str]) -> List[str]:
     return result
 
 
+@dataclass(frozen=True)
+class StageSpec:
+    name: str
+    identifier: LayerIdentifier
+    # True when the stage reads the composed canvas rather than only sprites.
+    needs_canvas: bool = False
+
+    @property
+    def method(self) -> str:
+        """Name of the ``CatRendererV3`` method compiling this stage."""
+        return f"_plan_{self.name}"
+
+
+STAGE_SEQUENCE: tuple[StageSpec, ...] = (
+    StageSpec("base", LayerIdentifier.base),
+    StageSpec("tint", LayerIdentifier.tint, needs_canvas=True),
+    StageSpec("white_patches", LayerIdentifier.white_patches),
+    StageSpec("points", LayerIdentifier.points),
+    StageSpec("vitiligo", LayerIdentifier.vitiligo),
+    StageSpec("eyes", LayerIdentifier.eyes),
+    StageSpec("scar_primary", LayerIdentifier.scars_primary),
+    StageSpec("shading", LayerIdentifier.tint),
+    StageSpec("lighting", LayerIdentifier.lighting),
+    StageSpec("dark_forest", LayerIdentifier.tint, needs_canvas=True),
+    StageSpec("lineart", LayerIdentifier.lineart),
+    StageSpec("skin", LayerIdentifier.skin),
+    StageSpec("scar_secondary", LayerIdentifier.scars_secondary, needs_canvas=True),
+    StageSpec("accessories", LayerIdentifier.accessories),
+)
+
+DARK_FOREST_FILL = (120, 30, 30, 200)
+
+
+class _CompileContext:
+    """Params plus values shared by several stage compilers."""
+
+    def __init__(self, params: dict) -> None:
+        self.params = params
+        # Uncached SVG custom patterns seen so far, against their per-request budget.
+        self.custom_svg = 0
+        raw_number = params.get("spriteNumber", 0)
+        try:
+            self.sprite_number = int(raw_number)
+        except (TypeError, ValueError) as exc:
+            raise PlanCompileError(
+                f"spriteNumber must be an integer, got {raw_number!r}"
+            ) from exc
+
+    @cached_property
+    def scars(self) -> list[str]:
+        params = self.params
+        scars_raw: List[str] = []
+        if isinstance(params.get("scars"), list):
+            scars_raw.extend(str(s) for s in params["scars"] if s and s != "none")
+        if isinstance(params.get("scarSlots"), list):
+            scars_raw.extend(str(s) for s in params["scarSlots"] if s and s != "none")
+        if params.get("scar") and params.get("scar") != "none":
+            scars_raw.append(str(params.get("scar")))
+        return _deduplicate(scars_raw)
+
+
 class CatRendererV3:
-    def __init__(self, repository: SpriteRepository, mapper: SpriteMapper) -> None:
+    def __init__(
+        self,
+        repository: SpriteRepository,
+        mapper: SpriteMapper,
+        tint_cache: TintCache | None = None,
+        custom_colours: CustomColourRegistry | None = None,
+    ) -> None:
         self.repo = repository
         self.mapper = mapper
+        self.tint_cache = tint_cache if tint_cache is not None else TintCache()
+        self.custom_colours = (
+            custom_colours if custom_colours is not None else CustomColourRegistry()
+        )
+        self._experimental_luts: dict[int, tuple[object, np.ndarray]] = {}
 
     # ------------------------------------------------------------------
     @staticmethod
@@ -122,49 +254,53 @@ class CatRendererV3:
         return bool(value)
 
     # ------------------------------------------------------------------
+    def compile(self, params: dict) -> RenderPlan:
+        """Resolve params into an immutable plan; raises PlanCompileError."""
+        ctx = _CompileContext(params)
+        steps: list[PlanStep] = []
+        for spec in STAGE_SEQUENCE:
+            step = getattr(self, spec.method)(ctx)
+            if step is not None:
+                steps.append(step)
+        return RenderPlan(
+            sprite_number=ctx.sprite_number,
+            reverse=self._truthy(params.get("reverse")),
+            steps=tuple(steps),
+        )
+
     def render(self, params: Dict) -> tuple[Image.Image, List[StageInfo]]:
-        canvas = self.repo.blank_canvas()
+        return self.execute(self.compile(params))
+
+    def execute(
+        self, plan: RenderPlan, *, scale: int = 1
+    ) -> tuple[Image.Image, list[StageInfo]]:
+        """Composite ``plan``; ``scale`` > 1 composes at that multiple of the canvas.
+
+        Hi-res mode nearest-upscales every sprite and generates pattern tiles
+        at the target resolution. All other ops are per-pixel, so only
+        patterned pelts differ from upscaling the 1x render; plans without one
+        render at 1x and are upscaled once.
+        """
+        if scale > 1 and not self._uses_patterns(plan):
+            canvas, stages = self.execute(plan)
+            for info in stages:
+                if info.image is not None:
+                    info.image = upscale_nearest(info.image, scale)
+            return upscale_nearest(canvas, scale), stages
+
+        canvas = self._blank_canvas(scale)
         stages: List[StageInfo] = []
-        reverse = self._truthy(params.get("reverse"))
-
-        stage_sequence = [
-            self._stage_base,
-            self._stage_tint,
-            self._stage_white_patches,
-            self._stage_points,
-            self._stage_vitiligo,
-            self._stage_eyes,
-            self._stage_scar_primary,
-            self._stage_shading,
-            self._stage_lighting,
-            self._stage_dark_forest,
-            self._stage_lineart,
-            self._stage_skin,
-            self._stage_scar_secondary,
-            self._stage_accessories,
-        ]
 
-        for stage_fn in stage_sequence:
-            overlay, diagnostics, blend, identifier = stage_fn(params, canvas)
+        for step in plan.steps:
+            overlay, diagnostics = self._execute_step(
+                step, canvas, plan.sprite_number, scale
+            )
             if overlay is None:
                 continue
+            canvas = self._blend(canvas, overlay, step.blend)
+            stages.append(StageInfo(step.identifier, diagnostics, overlay, step.blend))
 
-            if blend == "alpha":
-                canvas = alpha_over(canvas, overlay)
-            elif blend == "multiply":
-                canvas = multiply(canvas, overlay)
-            elif blend == "screen":
-                canvas = screen(canvas, overlay)
-            elif blend == "add":
-                canvas = add(canvas, overlay)
-            elif blend == "replace":
-                canvas = overlay
-            else:
-                canvas = alpha_over(canvas, overlay)
-
-            stages.append(StageInfo(identifier, diagnostics, overlay, blend))
-
-        if reverse:
+        if plan.reverse:
             canvas = ImageOps.mirror(canvas)
             for info in stages:
                 if info.image is not None:
@@ -173,24 +309,396 @@ class CatRendererV3:
         canvas = sanitize_transparency(canvas)
         return canvas, stages
 
+    def execute_colours(self, plan: RenderPlan, colours: Sequence[str]) -> np.ndarray:
+        """``(len(colours), size, size, 4)`` renders of ``plan``, one per base colour.
+
+        Each colour replaces the colour of the plan's first pelt layer. That
+        layer is tinted for every colour in one stacked pass; the results are
+        then stacked into one tall canvas and run through the rest of the plan
+        together. Steps that do not read the canvas draw once and are tiled.
+        The output matches executing one plan per colour.
+        """
+        count = len(colours)
+        size = self.repo.tile_size
+        pelt = plan.steps[0] if plan.steps and plan.steps[0].op == "pelt" else None
+        if pelt is None or count == 0:
+            canvas, _stages = self.execute(plan)
+            return np.repeat(np.asarray(canvas)[None], count, axis=0)
+
+        sprite_number = plan.sprite_number
+        first = self._tint_stack(pelt.sprites[0], sprite_number, colours)
+        layer = Image.fromarray(first.reshape(count * size, size, 4), mode="RGBA")
+        if pelt.masks[0]:
+            layer = apply_mask(
+                layer, _tile_rows(self._sprite(pelt.masks[0], sprite_number), count)
+            )
+        blank = _tile_rows(self.repo.blank_canvas(), count)
+        overlay = alpha_over(blank, layer)
+        for index in range(1, len(pelt.sprites)):
+            # Tortie layers keep their own colours: the same for every tile.
+            overlay = alpha_over(
+                overlay, _tile_rows(self._pelt_layer(pelt, index, sprite_number), count)
+            )
+        canvas = self._blend(blank, overlay, pelt.blend)
+
+        for step in plan.steps[1:]:
+            if step.op == "missing_scars":
+                # Scar masks are per tile; cut each colour's render separately.
+                tiles = []
+                for index in range(count):
+                    tile = canvas.crop((0, index * size, size, (index + 1) * size))
+                    cut, _diagnostics = self._execute_step(step, tile, sprite_number)
+                    tiles.append(np.asarray(cut if cut is not None else tile))
+                canvas = Image.fromarray(np.concatenate(tiles), mode="RGBA")
+                continue
+            if step.needs_canvas:
+                overlay, _diagnostics = self._execute_step(step, canvas, sprite_number)
+            else:
+                overlay, _diagnostics = self._execute_step(
+                    step, self.repo.blank_canvas(), sprite_number
+                )
+                overlay = _tile_rows(overlay, count) if overlay is not None else None
+            if overlay is not None:
+                canvas = self._blend(canvas, overlay, step.blend)
+
+        if plan.reverse:
+            canvas = ImageOps.mirror(canvas)
+        canvas = sanitize_transparency(canvas)
+        return np.asarray(canvas).reshape(count, size, size, 4)
+
+    def _tint_stack(
+        self, sprite_name: str, sprite_number: int, colours: Sequence[str]
+    ) -> np.ndarray:
+        """The pelt tile tinted by every colour: stacked LUT gathers and pattern products."""
+        sprite = np.asarray(
+            self.repo.get_sprite(sprite_name, sprite_number), dtype=np.uint8
+        )
+        out = np.repeat(sprite[None], len(colours), axis=0)
+        definitions = [self._colour_definition(colour) for colour in colours]
+
+        flat = [
+            i
+            for i, definition in enumerate(definitions)
+            if definition and not definition.pattern
+        ]
+        if flat:
+            luts = np.stack([self._experimental_lut(definitions[i]) for i in flat])
+            for channel in range(3):
+                out[flat, ..., channel] = np.take(
+                    luts[:, channel], sprite[..., channel], axis=1
+                )
+
+        patterned = [
+            i
+            for i, definition in enumerate(definitions)
+            if definition and definition.pattern
+        ]
+        if patterned:
+            # Same float path as _apply_experimental_tint, over a stack of tiles.
+            arr = sprite.astype(np.float32) / 255.0
+            h, w = sprite.shape[:2]
+            tiles = []
+            for i in patterned:
+                tile = definitions[i].pattern_tile(w, h)
+                tiles.append(
+                    tile if tile is not None else np.ones((h, w, 3), dtype=np.float32)
+                )
+            products = arr[None, ..., :3] * np.stack(tiles)
+            result = np.repeat(arr[None], len(patterned), axis=0)
+            for k, i in enumerate(patterned):
+                rgb = _experimental_blends(
+                    products[k], definitions[i], include_multiply=False
+                )
+                result[k, ..., :3] = np.clip(rgb, 0.0, 1.0)
+            out[patterned] = np.clip(np.rint(result * 255.0), 0, 255).astype(np.uint8)
+        return out
+
+    def _pelt_layer(
+        self, step: PlanStep, index: int, sprite_number: int, scale: int = 1
+    ) -> Image.Image:
+        colour, mask = step.colours[index], step.masks[index]
+        if colour:
+            layer = self._tinted_sprite(
+                step.sprites[index],
+                sprite_number,
+                colour,
+                scale,
+                step.custom_colours.get(colour),
+            )
+        else:
+            layer = self._sprite(step.sprites[index], sprite_number, scale)
+        if mask:
+            layer = apply_mask(layer, self._sprite(mask, sprite_number, scale))
+        return layer
+
+    # ------------------------------------------------------------------
+    def render_layer(self, params: dict, target: LayerIdentifier) -> Image.Image | None:
+        return self.execute_layer(self.compile(params), target)
+
+    def execute_layer(
+        self, plan: RenderPlan, target: LayerIdentifier
+    ) -> Image.Image | None:
+        """Return the first overlay ``execute`` would record for ``target``.
+
+        Overlay-only steps are evaluated on their own; steps that read the
+        canvas (tint, dark forest, missing scars) only composite the prefix of
+        the plan they depend on. Returns ``None`` when no step with that
+        identifier draws anything.
+        """
+        canvas: Image.Image | None = None
+        composed_upto = 0
+
+        for index, step in enumerate(plan.steps):
+            if step.identifier != target:
+                continue
+            if step.needs_canvas:
+                canvas = self._compose_prefix(
+                    plan, canvas, plan.steps[composed_upto:index]
+                )
+                composed_upto = index + 1
+                stage_canvas = canvas
+            else:
+                stage_canvas = self.repo.blank_canvas()
+
+            overlay, _diagnostics = self._execute_step(
+                step, stage_canvas, plan.sprite_number
+            )
+            if overlay is None:
+                continue
+            if plan.reverse:
+                overlay = ImageOps.mirror(overlay)
+            return overlay
+        return None
+
+    def _compose_prefix(
+        self,
+        plan: RenderPlan,
+        canvas: Image.Image | None,
+        steps: tuple[PlanStep, ...],
+    ) -> Image.Image:
+        canvas = canvas if canvas is not None else self.repo.blank_canvas()
+        for step in steps:
+            overlay, _diagnostics = self._execute_step(step, canvas, plan.sprite_number)
+            if overlay is not None:
+                canvas = self._blend(canvas, overlay, step.blend)
+        return canvas
+
+    @staticmethod
+    def _blend(canvas: Image.Image, overlay: Image.Image, blend: str) -> Image.Image:
+        if blend == "alpha":
+            return alpha_over(canvas, overlay)
+        if blend == "multiply":
+            return multiply(canvas, overlay)
+        if blend == "screen":
+            return screen(canvas, overlay)
+        if blend == "add":
+            return add(canvas, overlay)
+        if blend == "replace":
+            return overlay
+        return alpha_over(canvas, overlay)
+
+    # ------------------------------------------------------------------
+    # Execution
+    # ------------------------------------------------------------------
+    def _execute_step(
+        self, step: PlanStep, canvas: Image.Image, sprite_number: int, scale: int = 1
+    ) -> tuple[Image.Image | None, list[str]]:
+        op = step.op
+        if op == "sprite":
+            overlay = self._sprite(step.sprites[0], sprite_number, scale)
+            if step.tint:
+                overlay = tint_image(overlay, list(step.tint), mode="multiply")
+            return overlay, list(step.diagnostics)
+        if op == "stack":
+            overlay = self._blank_canvas(scale)
+            for sprite_name in step.sprites:
+                overlay = alpha_over(
+                    overlay, self._sprite(sprite_name, sprite_number, scale)
+                )
+            return overlay, list(step.diagnostics)
+        if op == "pelt":
+            overlay = self._blank_canvas(scale)
+            for index in range(len(step.sprites)):
+                overlay = alpha_over(
+                    overlay, self._pelt_layer(step, index, sprite_number, scale)
+                )
+            return overlay, list(step.diagnostics)
+        if op == "canvas_tint":
+            result = canvas
+            if step.tint:
+                result = multiply_colour(result, step.tint)
+            if step.dilute:
+                result = add(
+                    result, fill_with_colour(canvas.size, step.dilute + (255,), canvas)
+                )
+            return result, list(step.diagnostics)
+        if op == "dark_forest":
+            return fill_with_colour(canvas.size, DARK_FOREST_FILL, canvas), list(
+                step.diagnostics
+            )
+        if op == "missing_scars":
+            diagnostics: List[str] = []
+            current = canvas.copy()
+            for normalized in step.sprites:
+                mask = self.repo.get_missing_scar_mask(normalized, sprite_number)
+                if scale > 1:
+                    mask = upscale_nearest(mask, scale)
+                mask_alpha = np.array(mask.split()[3], dtype=np.uint16)
+                if mask_alpha.max() == 0:
+                    continue
+                diagnostics.append(f"missingscars{normalized}")
+                current = apply_missing_scar(current, mask)
+            if not diagnostics:
+                return None, []
+            return current, diagnostics
+        raise ValueError(f"Unknown plan op: {op}")
+
+    def _uses_patterns(self, plan: RenderPlan) -> bool:
+        for step in plan.steps:
+            for colour in step.colours:
+                definition = step.custom_colours.get(colour) or self._colour_definition(
+                    colour
+                )
+                if definition is not None and definition.pattern_definition is not None:
+                    return True
+        return False
+
+    def _sprite(
+        self, sprite_name: str, sprite_number: int, scale: int = 1
+    ) -> Image.Image:
+        sprite = self.repo.get_sprite(sprite_name, sprite_number)
+        return sprite if scale == 1 else upscale_nearest(sprite, scale)
+
+    def _blank_canvas(self, scale: int = 1) -> Image.Image:
+        if scale == 1:
+            return self.repo.blank_canvas()
+        size = self.repo.tile_size * scale
+        return Image.new("RGBA", (size, size), (0, 0, 0, 0))
+
+    def _tinted_sprite(
+        self,
+        sprite_name: str,
+        sprite_number: int,
+        colour: str,
+        scale: int = 1,
+        definition: CustomColourDefinition | None = None,
+    ) -> Image.Image:
+        """Pelt tile tinted with an experimental colour, via ``tint_cache``.
+
+        ``definition`` is the plan's own reference to a custom colour; other
+        colours are looked up. Hi-res tiles bypass the cache: they are scale²
+        times larger and are cheap to rebuild next to the cached pattern tile.
+        """
+        if definition is None:
+            definition = self._colour_definition(colour)
+        if definition is None:
+            raise LookupError(f"no definition for colour {colour!r}")
+        if scale > 1:
+            return self._apply_experimental_tint(
+                self._sprite(sprite_name, sprite_number, scale), definition, scale
+            )
+        return self.tint_cache.get_or_create(
+            sprite_name,
+            sprite_number,
+            colour,
+            lambda: self._apply_experimental_tint(
+                self.repo.get_sprite(sprite_name, sprite_number), definition
+            ),
+        )
+
+    def _colour_definition(self, colour: str | None):
+        if colour and colour.upper().startswith(CUSTOM_PREFIX):
+            return self.custom_colours.get(colour)
+        return self.mapper.get_experimental_definition(colour)
+
+    def prewarm_tints(
+        self, colour: str, pelts: Sequence[str], poses: Sequence[int]
+    ) -> int:
+        """Tint ``pelts`` in ``colour`` for every pose; returns the tiles produced."""
+        produced = 0
+        for pelt in pelts:
+            resolved = self._resolve_pelt(pelt, colour)
+            if resolved is None or resolved[1] is None:
+                continue
+            sprite_name, colour_key = resolved
+            for pose in poses:
+                self._tinted_sprite(sprite_name, pose, colour_key)
+                produced += 1
+        return produced
+
+    def _apply_experimental_tint(self, sprite: Image.Image, definition, scale: int = 1):
+        if not definition.pattern:
+            # Without a pattern every blend is a per-channel function of the
+            # input byte, so the whole chain collapses into one LUT gather.
+            arr = np.array(sprite, dtype=np.uint8, copy=True)
+            take_channel_lut(arr, self._experimental_lut(definition))
+            return Image.fromarray(arr, mode="RGBA")
+
+        sprite = sprite.copy()
+        arr = np.asarray(sprite, dtype=np.float32) / 255.0
+        rgb = arr[..., :3]
+        alpha = arr[..., 3:4]
+
+        h, w = rgb.shape[:2]
+        pattern_rgb = definition.pattern_tile(w, h, scale)
+        if pattern_rgb is not None:
+            rgb = rgb * pattern_rgb
+        rgb = _experimental_blends(rgb, definition, include_multiply=False)
+
+        arr[..., :3] = np.clip(rgb, 0.0, 1.0)
+        arr[..., 3:4] = alpha
+        arr = np.clip(np.rint(arr * 255.0), 0, 255).astype(np.uint8)
+        return Image.fromarray(arr, mode="RGBA")
+
+    def adopt_luts(self, previous: CatRendererV3) -> None:
+        """Keep ``previous``'s LUTs for definitions this renderer's mapper still holds."""
+        live = {id(definition) for definition in self.mapper.experimental_defs.values()}
+        for key, entry in dict(previous._experimental_luts).items():
+            if key in live:
+                self._experimental_luts.setdefault(key, entry)
+
+    def _experimental_lut(self, definition) -> np.ndarray:
+        """(3, 256) LUT of the multiply/screen/overlay chain, compiled once per definition."""
+        key = id(definition)
+        cached = self._experimental_luts.get(key)
+        if cached is not None and cached[0] is definition:
+            return cached[1]
+        ramp = np.repeat(_RAMP[:, None], 3, axis=1)
+        lut = finish_channel_lut(
+            np.clip(
+                _experimental_blends(ramp, definition, include_multiply=True), 0.0, 1.0
+            )
+        )
+        self._experimental_luts[key] = (definition, lut)
+        return lut
+
     # ------------------------------------------------------------------
-    def _stage_base(self, params: Dict, canvas: Image.Image):
-        sprite_number = int(params.get("spriteNumber", 0))
+    # Compilation (one method per StageSpec)
+    # ------------------------------------------------------------------
+    def _plan_base(self, ctx: _CompileContext) -> PlanStep | None:
+        params = ctx.params
         pelt_name = params.get("peltName")
         colour = params.get("colour") or "WHITE"
-
-        layers: List[Tuple[Image.Image, Optional[Image.Image]]] = []
+        sprites: list[str] = []
+        colours: list[str | None] = []
+        masks: list[str | None] = []
+        custom_colours: dict[str, CustomColourDefinition] = {}
 
         def draw(pattern, colour, mask=None):
-            base = self._build_pelt_layer(pattern, colour, sprite_number)
-            if base is None:
+            definition = None
+            if isinstance(colour, dict):
+                definition = self._register_custom_colour(ctx, colour)
+                colour = definition.key
+            elif isinstance(colour, str) and colour.upper().startswith(CUSTOM_PREFIX):
+                definition = self.custom_colours.get(colour)
+            resolved = self._resolve_pelt(pattern, colour, definition)
+            if resolved is None:
                 return
-            mask_sprite = None
-            if mask:
-                mask_sprite = self._load_tortie_mask(mask, sprite_number)
-                if mask_sprite:
-                    base = apply_mask(base, mask_sprite)
-            layers.append((base, mask_sprite))
+            if definition is not None:
+                custom_colours[definition.key] = definition
+            sprites.append(resolved[0])
+            colours.append(resolved[1])
+            masks.append(self._resolve_tortie_mask(mask))
 
         if params.get("isTortie"):
             if isinstance(params.get("tortie"), list) and params["tortie"]:
@@ -198,6 +706,10 @@ class CatRendererV3:
                 for layer in params["tortie"]:
                     if not layer:
                         continue
+                    if not isinstance(layer, dict):
+                        raise PlanCompileError(
+                            f"tortie layers must be objects, got {layer!r}"
+                        )
                     draw(
                         layer.get("pattern"),
                         layer.get("colour") or "GINGER",
@@ -215,20 +727,42 @@ class CatRendererV3:
         else:
             draw(pelt_name, colour)
 
-        if not layers:
-            return None, ["base:missing"], "alpha", LayerIdentifier.base
-
-        overlay = self.repo.blank_canvas()
-        for layer, _mask in layers:
-            overlay = alpha_over(overlay, layer)
-        return overlay, ["base"] * len(layers), "alpha", LayerIdentifier.base
+        if not sprites:
+            return None
+        return PlanStep(
+            stage="base",
+            op="pelt",
+            identifier=LayerIdentifier.base,
+            blend="alpha",
+            diagnostics=("base",) * len(sprites),
+            sprites=tuple(sprites),
+            colours=tuple(colours),
+            masks=tuple(masks),
+            custom_colours=custom_colours,
+        )
+
+    def _register_custom_colour(
+        self, ctx: _CompileContext, raw: dict
+    ) -> CustomColourDefinition:
+        definition = self.custom_colours.register(raw)
+        if self.custom_colours.needs_rasterising(definition, self.repo.tile_size):
+            ctx.custom_svg += 1
+            budget = self.custom_colours.limits.svg_per_request
+            if ctx.custom_svg > budget:
+                raise PlanCompileError(
+                    f"at most {budget} new SVG custom patterns may be rendered per request"
+                )
+        return definition
 
-    # ------------------------------------------------------------------
-    def _build_pelt_layer(self, pattern, colour, sprite_number):
+    def _resolve_pelt(
+        self, pattern, colour, definition=None
+    ) -> tuple[str, str | None] | None:
+        """Return ``(sprite_key, experimental_colour_key)`` for a pelt layer."""
         if not pattern:
             return None
-        raw_colour = colour or "WHITE"
-        definition = self.mapper.get_experimental_definition(raw_colour)
+        raw_colour = str(colour or "WHITE")
+        if definition is None:
+            definition = self._colour_definition(raw_colour)
         base_colour = definition.base_colour if definition else raw_colour
 
         sprite_name = self.mapper.build_sprite_name("pelt", pattern, base_colour)
@@ -239,310 +773,230 @@ class CatRendererV3:
 
         if not sprite_name or not self.repo.has_sprite(sprite_name):
             return None
+        return sprite_name, raw_colour.upper() if definition else None
 
-        sprite = self.repo.get_sprite(sprite_name, sprite_number).copy()
-        if definition:
-            sprite = self._apply_experimental_tint(sprite, definition)
-        return sprite
-
-    def _load_tortie_mask(self, mask, sprite_number):
-        if isinstance(mask, Image.Image):
-            return mask
+    def _resolve_tortie_mask(self, mask) -> str | None:
         if isinstance(mask, str) and mask.lower() != "none":
             mask_name = f"tortiemask{mask}"
             if self.repo.has_sprite(mask_name):
-                return self.repo.get_sprite(mask_name, sprite_number)
+                return mask_name
         return None
 
-    def _apply_experimental_tint(self, sprite: Image.Image, definition):
-        sprite = sprite.copy()
-        arr = np.asarray(sprite, dtype=np.float32) / 255.0
-        rgb = arr[..., :3]
-        alpha = arr[..., 3:4]
-
-        def parse(values):
-            colour = (
-                np.array([values[0], values[1], values[2]], dtype=np.float32) / 255.0
-            )
-            if len(values) >= 4:
-                raw_alpha = values[3]
-                blend_alpha = raw_alpha / 255.0 if raw_alpha > 1 else raw_alpha
-            else:
-                blend_alpha = 1.0
-            blend_alpha = np.clip(blend_alpha, 0.0, 1.0)
-            return colour, blend_alpha
-
-        def blend(rgb, colour, blend_alpha, mode):
-            if mode == "multiply":
-                blend_rgb = rgb * colour
-            elif mode == "screen":
-                blend_rgb = 1.0 - (1.0 - rgb) * (1.0 - colour)
-            elif mode == "overlay":
-                blend_rgb = np.where(
-                    rgb <= 0.5,
-                    2.0 * rgb * colour,
-                    1.0 - 2.0 * (1.0 - rgb) * (1.0 - colour),
-                )
-            else:
-                blend_rgb = rgb
-            return (1.0 - blend_alpha) * rgb + blend_alpha * blend_rgb
-
-        if definition.pattern:
-            try:
-                h, w = rgb.shape[:2]
-                pat_def = PatternDefinition.from_dict(definition.pattern)
-                pattern_rgb = generate_pattern_tile(pat_def, w, h)
-                rgb = rgb * pattern_rgb
-            except Exception:
-                logger.error(
-                    "Pattern generation failed, skipping multiply. pattern=%r",
-                    definition.pattern,
-                    exc_info=True,
-                )
-        elif definition.multiply:
-            colour, blend_alpha = parse(definition.multiply)
-            rgb = blend(rgb, colour, blend_alpha, "multiply")
-
-        if definition.screen:
-            colour, blend_alpha = parse(definition.screen)
-            rgb = blend(rgb, colour, blend_alpha, "screen")
-        if definition.overlay:
-            colour, blend_alpha = parse(definition.overlay)
-            rgb = blend(rgb, colour, blend_alpha, "overlay")
-
-        rgb = np.clip(rgb, 0.0, 1.0)
-        arr[..., :3] = rgb
-        arr[..., 3:4] = alpha
-        arr = np.clip(np.rint(arr * 255.0), 0, 255).astype(np.uint8)
-        return Image.fromarray(arr, mode="RGBA")
-
-    # ------------------------------------------------------------------
-    def _stage_tint(self, params: Dict, canvas: Image.Image):
-        tint = self.mapper.get_tint_colour(params.get("tint"))
-        dilute = self.mapper.get_dilute_tint_colour(params.get("tint"))
-        overlays = []
+    def _plan_tint(self, ctx: _CompileContext) -> PlanStep | None:
+        tint = self.mapper.get_tint_colour(ctx.params.get("tint"))
+        dilute = self.mapper.get_dilute_tint_colour(ctx.params.get("tint"))
+        if not tint and not dilute:
+            return None
         diagnostics = []
         if tint:
-            overlay = fill_with_colour(
-                canvas.size, tuple(int(c) for c in tint[:3]) + (255,), canvas
-            )
-            overlays.append((overlay, "multiply"))
             diagnostics.append("tint-multiply")
         if dilute:
-            overlay = fill_with_colour(
-                canvas.size, tuple(int(c) for c in dilute[:3]) + (255,), canvas
-            )
-            overlays.append((overlay, "add"))
             diagnostics.append("tint-dilute")
-
-        if not overlays:
-            return None, [], "alpha", LayerIdentifier.tint
-
-        # Combine overlays sequentially
-        result = canvas
-        for overlay, mode in overlays:
-            if mode == "multiply":
-                result = multiply(result, overlay)
-            elif mode == "add":
-                result = add(result, overlay)
-            elif mode == "screen":
-                result = screen(result, overlay)
-            else:
-                result = alpha_over(result, overlay)
-        return result, diagnostics, "replace", LayerIdentifier.tint
-
-    def _stage_white_patches(self, params: Dict, canvas: Image.Image):
-        pattern = params.get("whitePatches")
-        if not pattern or pattern == "none":
-            return None, [], "alpha", LayerIdentifier.white_patches
-        sprite_number = int(params.get("spriteNumber", 0))
-        sprite_name = self.mapper.build_sprite_name("white", pattern, None)
-        if not sprite_name or not self.repo.has_sprite(sprite_name):
-            return None, [f"missing:{pattern}"], "alpha", LayerIdentifier.white_patches
-        overlay = self.repo.get_sprite(sprite_name, sprite_number)
-        tint = self.mapper.get_white_patch_tint(params.get("whitePatchesTint"))
-        if tint:
-            overlay = tint_image(overlay, [int(c) for c in tint[:3]], mode="multiply")
-        return overlay, [f"white:{pattern}"], "alpha", LayerIdentifier.white_patches
-
-    def _stage_points(self, params: Dict, canvas: Image.Image):
-        pattern = params.get("points")
-        if not pattern or pattern == "none":
-            return None, [], "alpha", LayerIdentifier.points
-        sprite_number = int(params.get("spriteNumber", 0))
-        sprite_name = self.mapper.build_sprite_name("white", pattern, None)
-        if not sprite_name or not self.repo.has_sprite(sprite_name):
-            return None, [f"missing:{pattern}"], "alpha", LayerIdentifier.points
-        overlay = self.repo.get_sprite(sprite_name, sprite_number)
-        return overlay, [f"points:{pattern}"], "alpha", LayerIdentifier.points
-
-    def _stage_vitiligo(self, params: Dict, canvas: Image.Image):
-        pattern = params.get("vitiligo")
+        return PlanStep(
+            stage="tint",
+            op="canvas_tint",
+            identifier=LayerIdentifier.tint,
+            blend="replace",
+            diagnostics=tuple(diagnostics),
+            tint=tuple(int(c) for c in tint[:3]) if tint else None,
+            dilute=tuple(int(c) for c in dilute[:3]) if dilute else None,
+        )
+
+    def _plan_white_overlay(
+        self, ctx: _CompileContext, stage: str, param: str, identifier: LayerIdentifier
+    ) -> PlanStep | None:
+        pattern = ctx.params.get(param)
         if not pattern or pattern == "none":
-            return None, [], "alpha", LayerIdentifier.vitiligo
-        sprite_number = int(params.get("spriteNumber", 0))
+            return None
         sprite_name = self.mapper.build_sprite_name("white", pattern, None)
         if not sprite_name or not self.repo.has_sprite(sprite_name):
-            return None, [f"missing:{pattern}"], "alpha", LayerIdentifier.vitiligo
-        overlay = self.repo.get_sprite(sprite_name, sprite_number)
-        return overlay, [f"vitiligo:{pattern}"], "alpha", LayerIdentifier.vitiligo
-
-    def _stage_eyes(self, params: Dict, canvas: Image.Image):
-        sprite_number = int(params.get("spriteNumber", 0))
+            return None
+        tint = None
+        if identifier == LayerIdentifier.white_patches:
+            colour = self.mapper.get_white_patch_tint(
+                ctx.params.get("whitePatchesTint")
+            )
+            tint = tuple(int(c) for c in colour[:3]) if colour else None
+        label = "white" if identifier == LayerIdentifier.white_patches else stage
+        return PlanStep(
+            stage=stage,
+            op="sprite",
+            identifier=identifier,
+            blend="alpha",
+            diagnostics=(f"{label}:{pattern}",),
+            sprites=(sprite_name,),
+            tint=tint,
+        )
+
+    def _plan_white_patches(self, ctx: _CompileContext) -> PlanStep | None:
+        return self._plan_white_overlay(
+            ctx, "white_patches", "whitePatches", LayerIdentifier.white_patches
+        )
+
+    def _plan_points(self, ctx: _CompileContext) -> PlanStep | None:
+        return self._plan_white_overlay(ctx, "points", "points", LayerIdentifier.points)
+
+    def _plan_vitiligo(self, ctx: _CompileContext) -> PlanStep | None:
+        return self._plan_white_overlay(
+            ctx, "vitiligo", "vitiligo", LayerIdentifier.vitiligo
+        )
+
+    def _plan_eyes(self, ctx: _CompileContext) -> PlanStep | None:
+        params = ctx.params
         primary = params.get("eyeColour") or params.get("eyeColor")
         secondary = params.get("eyeColour2") or params.get("eyeColor2")
-
-        overlay = self.repo.blank_canvas()
-        diagnostics = []
+        sprites: list[str] = []
+        diagnostics: list[str] = []
 
         if primary:
             name = self.mapper.build_sprite_name("eyes", None, primary)
             if name and self.repo.has_sprite(name):
-                eye_sprite = self.repo.get_sprite(name, sprite_number)
-                overlay = alpha_over(overlay, eye_sprite)
+                sprites.append(name)
                 diagnostics.append(f"eye:{primary}")
 
         if secondary and secondary != "none":
             name = f"eyes2{str(secondary).upper()}"
             if self.repo.has_sprite(name):
-                eye_sprite = self.repo.get_sprite(name, sprite_number)
-                overlay = alpha_over(overlay, eye_sprite)
+                sprites.append(name)
                 diagnostics.append(f"eye2:{secondary}")
 
         if not diagnostics:
-            return None, [], "alpha", LayerIdentifier.eyes
-
-        return overlay, diagnostics, "alpha", LayerIdentifier.eyes
-
-    def _stage_shading(self, params: Dict, canvas: Image.Image):
-        if not self._truthy(params.get("shading")):
-            return None, [], "alpha", LayerIdentifier.tint
-        sprite_number = int(params.get("spriteNumber", 0))
+            return None
+        return PlanStep(
+            stage="eyes",
+            op="stack",
+            identifier=LayerIdentifier.eyes,
+            blend="alpha",
+            diagnostics=tuple(diagnostics),
+            sprites=tuple(sprites),
+        )
+
+    def _plan_shading(self, ctx: _CompileContext) -> PlanStep | None:
+        if not self._truthy(ctx.params.get("shading")):
+            return None
         sprite_key = "shaders"
-        if not self.repo.has_sprite(sprite_key, sprite_number):
+        if not self.repo.has_sprite(sprite_key, ctx.sprite_number):
             # fallback to legacy names present in some mod packs
             for fallback in ("shadersnewwhite", "lightingnewwhite"):
-                if self.repo.has_sprite(fallback, sprite_number):
+                if self.repo.has_sprite(fallback, ctx.sprite_number):
                     sprite_key = fallback
                     break
             else:
-                return None, ["missing:shaders"], "alpha", LayerIdentifier.tint
-
-        overlay = self.repo.get_sprite(sprite_key, sprite_number)
-        return overlay, ["shading"], "multiply", LayerIdentifier.tint
-
-    def _stage_lighting(self, params: Dict, canvas: Image.Image):
-        lighting_param = params.get("lighting")
+                return None
+        return PlanStep(
+            stage="shading",
+            op="sprite",
+            identifier=LayerIdentifier.tint,
+            blend="multiply",
+            diagnostics=("shading",),
+            sprites=(sprite_key,),
+        )
+
+    def _plan_lighting(self, ctx: _CompileContext) -> PlanStep | None:
+        lighting_param = ctx.params.get("lighting")
         if lighting_param is None or not self._truthy(lighting_param):
-            return None, [], "alpha", LayerIdentifier.lighting
-        sprite_number = int(params.get("spriteNumber", 0))
-        sprite_key = "lighting"
-        if not self.repo.has_sprite(sprite_key, sprite_number):
-            return None, ["missing:lighting"], "alpha", LayerIdentifier.lighting
-        overlay = self.repo.get_sprite(sprite_key, sprite_number)
-        return overlay, ["lighting"], "alpha", LayerIdentifier.lighting
-
-    def _stage_dark_forest(self, params: Dict, canvas: Image.Image):
-        if not (params.get("darkForest") or params.get("darkMode")):
-            return None, [], "alpha", LayerIdentifier.tint
-        overlay = fill_with_colour(canvas.size, (120, 30, 30, 200), canvas)
-        return overlay, ["darkForest"], "multiply", LayerIdentifier.tint
-
-    def _stage_lineart(self, params: Dict, canvas: Image.Image):
-        sprite_number = int(params.get("spriteNumber", 0))
+            return None
+        if not self.repo.has_sprite("lighting", ctx.sprite_number):
+            return None
+        return PlanStep(
+            stage="lighting",
+            op="sprite",
+            identifier=LayerIdentifier.lighting,
+            blend="alpha",
+            diagnostics=("lighting",),
+            sprites=("lighting",),
+        )
+
+    def _plan_dark_forest(self, ctx: _CompileContext) -> PlanStep | None:
+        if not (ctx.params.get("darkForest") or ctx.params.get("darkMode")):
+            return None
+        return PlanStep(
+            stage="dark_forest",
+            op="dark_forest",
+            identifier=LayerIdentifier.tint,
+            blend="multiply",
+            diagnostics=("darkForest",),
+        )
+
+    def _plan_lineart(self, ctx: _CompileContext) -> PlanStep | None:
+        params = ctx.params
         if params.get("dead"):
             sprite_name = "lineartdead"
         elif params.get("darkForest") or params.get("darkMode"):
             sprite_name = "lineartdf"
         else:
             sprite_name = "lines"
-        if not self.repo.has_sprite(sprite_name, sprite_number):
-            return None, [f"missing:{sprite_name}"], "alpha", LayerIdentifier.lineart
-        overlay = self.repo.get_sprite(sprite_name, sprite_number)
-        return overlay, [sprite_name.lower()], "alpha", LayerIdentifier.lineart
-
-    def _stage_skin(self, params: Dict, canvas: Image.Image):
-        skin = params.get("skinColour") or params.get("skinColor")
+        if not self.repo.has_sprite(sprite_name, ctx.sprite_number):
+            return None
+        return PlanStep(
+            stage="lineart",
+            op="sprite",
+            identifier=LayerIdentifier.lineart,
+            blend="alpha",
+            diagnostics=(sprite_name.lower(),),
+            sprites=(sprite_name,),
+        )
+
+    def _plan_skin(self, ctx: _CompileContext) -> PlanStep | None:
+        skin = ctx.params.get("skinColour") or ctx.params.get("skinColor")
         if not skin or skin == "none":
-            return None, [], "alpha", LayerIdentifier.skin
-        sprite_number = int(params.get("spriteNumber", 0))
+            return None
         sprite_name = self.mapper.build_sprite_name("skin", None, skin)
         if not sprite_name or not self.repo.has_sprite(sprite_name):
-            return None, [f"missing:{skin}"], "alpha", LayerIdentifier.skin
-        overlay = self.repo.get_sprite(sprite_name, sprite_number)
-        return overlay, [f"skin:{skin}"], "alpha", LayerIdentifier.skin
-
-    def _stage_scar_primary(self, params: Dict, canvas: Image.Image):
-        scars_raw: List[str] = []
-        if isinstance(params.get("scars"), list):
-            scars_raw.extend(str(s) for s in params["scars"] if s and s != "none")
-        if isinstance(params.get("scarSlots"), list):
-            scars_raw.extend(str(s) for s in params["scarSlots"] if s and s != "none")
-        if params.get("scar") and params.get("scar") != "none":
-            scars_raw.append(str(params.get("scar")))
-        scars = _deduplicate(scars_raw)
-        if not scars:
-            return None, [], "alpha", LayerIdentifier.scars_primary
-        sprite_number = int(params.get("spriteNumber", 0))
-        overlay = self.repo.blank_canvas()
-        diagnostics = []
-        for scar in scars:
+            return None
+        return PlanStep(
+            stage="skin",
+            op="sprite",
+            identifier=LayerIdentifier.skin,
+            blend="alpha",
+            diagnostics=(f"skin:{skin}",),
+            sprites=(sprite_name,),
+        )
+
+    def _plan_scar_primary(self, ctx: _CompileContext) -> PlanStep | None:
+        sprites: list[str] = []
+        diagnostics: list[str] = []
+        for scar in ctx.scars:
             normalized = _normalize_scar(scar)
             if normalized not in SCARS_PRIMARY:
                 continue
-            candidates = [
-                self.mapper.build_sprite_name("scars", normalized, None),
-                self.mapper.build_sprite_name("scar", normalized, None),
-                f"scars{normalized}",
-                f"scar{normalized}",
-            ]
-            sprite = None
-            for candidate in candidates:
-                if candidate and self.repo.has_sprite(candidate):
-                    sprite = self.repo.get_sprite(candidate, sprite_number)
-                    diagnostics.append(candidate)
-                    break
-            if sprite is None:
+            sprite_name = self.mapper.resolve_scar(normalized)
+            if sprite_name:
+                sprites.append(sprite_name)
+                diagnostics.append(sprite_name)
+            else:
                 diagnostics.append(f"missing:{scar}")
-                continue
-            overlay = alpha_over(overlay, sprite)
-        if not diagnostics:
-            return None, [], "alpha", LayerIdentifier.scars_primary
-        return overlay, diagnostics, "alpha", LayerIdentifier.scars_primary
-
-    def _stage_scar_secondary(self, params: Dict, canvas: Image.Image):
-        scars_raw: List[str] = []
-        if isinstance(params.get("scars"), list):
-            scars_raw.extend(str(s) for s in params["scars"] if s and s != "none")
-        if isinstance(params.get("scarSlots"), list):
-            scars_raw.extend(str(s) for s in params["scarSlots"] if s and s != "none")
-        if params.get("scar") and params.get("scar") != "none":
-            scars_raw.append(str(params.get("scar")))
-        scars = _deduplicate(scars_raw)
-        if not scars:
-            return None, [], "alpha", LayerIdentifier.scars_secondary
-
-        sprite_number = int(params.get("spriteNumber", 0))
-        diagnostics: List[str] = []
-        current = canvas.copy()
-
-        for scar in scars:
-            normalized = _normalize_scar(scar)
-            if normalized not in SCARS_SECONDARY:
-                continue
-            mask = self.repo.get_missing_scar_mask(normalized, sprite_number)
-            mask_alpha = np.array(mask.split()[3], dtype=np.uint16)
-            if mask_alpha.max() == 0:
-                continue
-            diagnostics.append(f"missingscars{normalized}")
-            current = apply_missing_scar(current, mask)
-
         if not diagnostics:
-            return None, [], "alpha", LayerIdentifier.scars_secondary
-
-        return current, diagnostics, "replace", LayerIdentifier.scars_secondary
-
-    def _stage_accessories(self, params: Dict, canvas: Image.Image):
+            return None
+        return PlanStep(
+            stage="scar_primary",
+            op="stack",
+            identifier=LayerIdentifier.scars_primary,
+            blend="alpha",
+            diagnostics=tuple(diagnostics),
+            sprites=tuple(sprites),
+        )
+
+    def _plan_scar_secondary(self, ctx: _CompileContext) -> PlanStep | None:
+        names = tuple(
+            normalized
+            for normalized in (_normalize_scar(scar) for scar in ctx.scars)
+            if normalized in SCARS_SECONDARY
+        )
+        if not names:
+            return None
+        # Diagnostics depend on mask pixels and are produced at execution.
+        return PlanStep(
+            stage="scar_secondary",
+            op="missing_scars",
+            identifier=LayerIdentifier.scars_secondary,
+            blend="replace",
+            diagnostics=(),
+            sprites=names,
+        )
+
+    def _plan_accessories(self, ctx: _CompileContext) -> PlanStep | None:
+        params = ctx.params
         accessories_raw: List[str] = []
         if isinstance(params.get("accessories"), list):
             accessories_raw.extend(
@@ -550,44 +1004,21 @@ class CatRendererV3:
             )
         if params.get("accessory") and params.get("accessory") != "none":
             accessories_raw.append(str(params.get("accessory")))
-        valid_accessories = [acc for acc in accessories_raw if acc]
-        if not valid_accessories:
-            return None, [], "alpha", LayerIdentifier.accessories
-        sprite_number = int(params.get("spriteNumber", 0))
-        overlay = self.repo.blank_canvas()
-        diagnostics = []
-        for accessory in valid_accessories:
-            sprite_name = self._resolve_accessory(str(accessory))
-            if not sprite_name or not self.repo.has_sprite(sprite_name):
-                continue
-            overlay = alpha_over(
-                overlay, self.repo.get_sprite(sprite_name, sprite_number)
-            )
-            diagnostics.append(sprite_name)
-        if not diagnostics:
-            return None, [], "alpha", LayerIdentifier.accessories
-        return overlay, diagnostics, "alpha", LayerIdentifier.accessories
-
-    def _resolve_accessory(self, name: str) -> Optional[str]:
-        sprite_name = self.mapper.accessory_sprite_name(name)
-        if sprite_name and self.repo.has_sprite(sprite_name):
-            return sprite_name
-
-        raw = name.strip()
-        upper = raw.upper()
-        options = [
-            raw,
-            upper,
-            raw.replace(" ", ""),
-            upper.replace(" ", ""),
-            f"collars{upper}",
-            f"collars{raw}",
-            f"acc_herbs{raw}",
-            f"acc_herbs{upper}",
-            f"acc_wild{raw}",
-            f"acc_wild{upper}",
-        ]
-        for option in options:
-            if self.repo.has_sprite(option):
-                return option
-        return None
+        sprites: list[str] = []
+        for accessory in accessories_raw:
+            sprite_name = self._resolve_accessory(accessory)
+            if sprite_name:
+                sprites.append(sprite_name)
+        if not sprites:
+            return None
+        return PlanStep(
+            stage="accessories",
+            op="stack",
+            identifier=LayerIdentifier.accessories,
+            blend="alpha",
+            diagnostics=tuple(sprites),
+            sprites=tuple(sprites),
+        )
+
+    def _resolve_accessory(self, name: str) -> str | None:
+        return self.mapper.resolve_accessory(name)
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+
+from ..config import settings
+from .pattern_atlas import AtlasBuilder, finish_and_install, load_atlas, needs_rebuild
+from .pattern_pool import PatternPool
+from .pipeline import RenderPipeline
+from .sprite_mapper import ExperimentalColourDefinition
+
+logger = logging.getLogger("renderer.warmup")
+
+WARMUP_PHASES = ("atlases", "tiles", "patterns", "tints", "corpus")
+
+# Pelt names understood by SpriteMapper.build_sprite_name; peltInfo.json does
+# not ship a pattern list.
+WARMUP_PELTS = (
+    "SingleColour",
+    "Tabby",
+    "Marbled",
+    "Rosette",
+    "Smoke",
+    "Ticked",
+    "Speckled",
+    "Bengal",
+    "Mackerel",
+    "Classic",
+    "Sokoke",
+    "Agouti",
+    "Singlestripe",
+    "Masked",
+)
+PATTERN_CHUNK = 16
+
+
+@dataclass(frozen=True)
+class WarmupTask:
+    """One short unit of warm-up work; sized so a live request never waits long behind it."""
+
+    phase: str
+    label: str
+    run: Callable[[], object]
+
+
+@dataclass
+class WarmupProgress:
+    total: dict[str, int] = field(default_factory=dict)
+    done: dict[str, int] = field(default_factory=dict)
+    failed: int = 0
+    finished: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def begin(self, tasks: list[WarmupTask]) -> None:
+        with self._lock:
+            self.total = {phase: 0 for phase in WARMUP_PHASES}
+            self.done = {phase: 0 for phase in WARMUP_PHASES}
+            for task in tasks:
+                self.total[task.phase] = self.total.get(task.phase, 0) + 1
+            self.finished = not tasks
+
+    def complete(self, task: WarmupTask, *, ok: bool = True) -> None:
+        with self._lock:
+            self.done[task.phase] = self.done.get(task.phase, 0) + 1
+            if not ok:
+                self.failed += 1
+            self.finished = sum(self.done.values()) >= sum(self.total.values())
+
+    @property
+    def fraction(self) -> float:
+        total = sum(self.total.values())
+        if not total:
+            return 1.0 if self.finished else 0.0
+        return sum(self.done.values()) / total
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "fraction": round(self.fraction, 4),
+                "finished": self.finished,
+                "failed": self.failed,
+                "phases": {
+                    phase: {"done": self.done.get(phase, 0), "total": count}
+                    for phase, count in self.total.items()
+                },
+            }
+
+
+def build_warmup_plan(
+    pipeline: RenderPipeline,
+    *,
+    include_tiles: bool = True,
+    tint_colours: Sequence[str] = (),
+    pattern_atlas: bool = False,
+    pattern_pool: PatternPool | None = None,
+) -> list[WarmupTask]:
+    """Ordered warm-up tasks: decode atlases, slice tiles, (re)compile the pattern atlas,
+    pre-generate pattern tiles, tint pelts for ``tint_colours``, render a corpus.
+
+    With a ``pattern_pool`` pattern tiles are generated in its worker
+    processes. Each task submits one batch of ``PATTERN_CHUNK`` tiles per
+    worker, so the warm-up loop still checks for queued requests between
+    batches. The caller owns the pool and closes it.
+    """
+    repository = pipeline.repository
+    mapper = pipeline.mapper
+    tasks: list[WarmupTask] = []
+
+    sheets = sorted({info["spritesheet"] for info in repository.sprite_index.values()})
+    for sheet in sheets:
+        tasks.append(
+            WarmupTask(
+                "atlases", sheet, lambda sheet=sheet: repository.preload_sheet(sheet)
+            )
+        )
+
+    if include_tiles:
+        poses = range(len(repository.sprite_offsets))
+        for sprite_name in repository.sprite_index:
+            tasks.append(
+                WarmupTask(
+                    "tiles",
+                    sprite_name,
+                    lambda name=sprite_name: [
+                        repository.get_sprite(name, pose) for pose in poses
+                    ],
+                )
+            )
+
+    pool = pattern_pool
+    batch = PATTERN_CHUNK * pool.workers if pool is not None else PATTERN_CHUNK
+    if pattern_atlas:
+        tasks.extend(_pattern_atlas_tasks(pipeline, pool, batch))
+
+    patterns = [
+        definition
+        for definition in mapper.experimental_defs.values()
+        if definition.pattern_definition is not None
+    ]
+    size = pipeline.canvas_size
+    for start in range(0, len(patterns), batch):
+        chunk = patterns[start : start + batch]
+        tasks.append(
+            WarmupTask(
+                "patterns",
+                f"patterns[{start}:{start + len(chunk)}]",
+                lambda chunk=chunk: _generate_patterns(chunk, size, pool),
+            )
+        )
+    # The sheet reads the pattern tiles generated above.
+    tasks.append(
+        WarmupTask("patterns", "palettes:swatches", pipeline.palettes.swatch_sheet)
+    )
+
+    renderer = pipeline.renderer
+    all_poses = range(len(repository.sprite_offsets))
+    for colour in tint_colours:
+        tasks.append(
+            WarmupTask(
+                "tints",
+                colour,
+                lambda colour=colour: renderer.prewarm_tints(
+                    colour, WARMUP_PELTS, all_poses
+                ),
+            )
+        )
+
+    for label, params in _representative_corpus(pipeline):
+        tasks.append(
+            WarmupTask("corpus", label, lambda params=params: pipeline.render(params))
+        )
+    return tasks
+
+
+def _pattern_atlas_tasks(
+    pipeline: RenderPipeline,
+    pool: PatternPool | None = None,
+    batch: int = PATTERN_CHUNK,
+) -> list[WarmupTask]:
+    directory = settings.cache_dir
+    palettes_dir = pipeline.mapper.data_dir / "palettes"
+    size = pipeline.canvas_size
+    previous = load_atlas(directory, size)
+    if not needs_rebuild(previous, palettes_dir, size):
+        return []
+    builder = AtlasBuilder(
+        pipeline.mapper.pattern_definitions(), palettes_dir, size, previous
+    )
+    tasks = [
+        WarmupTask(
+            "patterns",
+            f"atlas[{index}]",
+            lambda chunk=chunk: (
+                builder.generate(chunk)
+                if pool is None
+                else builder.generate_parallel(chunk, pool=pool)
+            ),
+        )
+        for index, chunk in enumerate(builder.chunks(batch))
+    ]
+    tasks.append(
+        WarmupTask(
+            "patterns",
+            "atlas:save",
+            lambda: finish_and_install(builder, directory, previous),
+        )
+    )
+    return tasks
+
+
+def _generate_patterns(
+    definitions: list[ExperimentalColourDefinition],
+    size: int,
+    pool: PatternPool | None = None,
+) -> None:
+    if pool is not None:
+        # Fills the primed tile cache, then attaching to the definitions is a lookup.
+        pool.generate(
+            (definition.pattern_definition for definition in definitions), size
+        )
+    # Attaches the tile to each definition; failures are logged once there.
+    for definition in definitions:
+        definition.pattern_tile(size, size)
+
+
+def _representative_corpus(pipeline: RenderPipeline) -> list[tuple[str, dict]]:
+    mapper = pipeline.mapper
+    corpus: list[tuple[str, dict]] = []
+    poses = len(pipeline.repository.sprite_offsets)
+    for pose in range(poses):
+        corpus.append(
+            (
+                f"pose:{pose}",
+                {"spriteNumber": pose, "peltName": "Tabby", "colour": "GINGER"},
+            )
+        )
+    for pelt in WARMUP_PELTS:
+        corpus.append(
+            (f"pelt:{pelt}", {"spriteNumber": 8, "peltName": pelt, "colour": "GREY"})
+        )
+    for palette_id, colours in mapper.experimental_categories.items():
+        if colours:
+            corpus.append(
+                (
+                    f"palette:{palette_id}",
+                    {
+                        "spriteNumber": 8,
+                        "peltName": "SingleColour",
+                        "colour": colours[0],
+                    },
+                )
+            )
+    corpus.append(
+        (
+            "layered",
+            {
+                "spriteNumber": 10,
+                "peltName": "Tabby",
+                "colour": "GREY",
+                "isTortie": True,
+                "tortie": [{"colour": "CREAM", "mask": "REDTAIL", "pattern": "Ticked"}],
+                "eyeColour": "PALEGREEN",
+                "skinColour": "PEACH",
+                "whitePatches": mapper.white_patches[0]
+                if mapper.white_patches
+                else None,
+                "scars": mapper.scars[:2],
+                "accessories": mapper.accessories[:1],
+                "shading": True,
+            },
+        )
+    )
+    return corpus
+
+
+__all__ = [
+    "WARMUP_PHASES",
+    "WarmupProgress",
+    "WarmupTask",
+    "build_warmup_plan",
+]
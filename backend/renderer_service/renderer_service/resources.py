@@ -1,9 +1,16 @@
 from __future__ import annotations
 
 import json
+from functools import cache
 from pathlib import Path
 
 
 def load_json(path: Path):
     with path.open("r", encoding="utf-8") as fh:
         return json.load(fh)
+
+
+@cache
+def load_json_cached(path: Path):
+    """Parse a bundled data file once per process; the result is shared, do not mutate it."""
+    return load_json(path)
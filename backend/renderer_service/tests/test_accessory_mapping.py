@@ -1,7 +1,7 @@
 from pathlib import Path
 
-from renderer_service.renderer.sprite_mapper import SpriteMapper
 from renderer_service.renderer.repository import SpriteRepository
+from renderer_service.renderer.sprite_mapper import SpriteMapper
 
 
 def test_all_accessories_have_sprites():
@@ -14,4 +14,61 @@ def test_all_accessories_have_sprites():
         if not sprite_name or not repo.has_sprite(sprite_name, 8):
             missing.append((name, sprite_name))
 
-    assert not missing, f"Accessories without sprites: {missing[:10]} (total {len(missing)})"
+    assert not missing, (
+        f"Accessories without sprites: {missing[:10]} (total {len(missing)})"
+    )
+
+
+def _baseline_accessory(mapper, repo, name):
+    # Renderer resolution before the alias tables: the mapper's candidate
+    # walk, then a fixed list of spellings.
+    sprite_name = mapper._probe_accessory_sprite(name)
+    if sprite_name and repo.has_sprite(sprite_name):
+        return sprite_name
+    raw = name.strip()
+    upper = raw.upper()
+    for option in (
+        raw,
+        upper,
+        raw.replace(" ", ""),
+        upper.replace(" ", ""),
+        f"collars{upper}",
+        f"collars{raw}",
+        f"acc_herbs{raw}",
+        f"acc_herbs{upper}",
+        f"acc_wild{raw}",
+        f"acc_wild{upper}",
+    ):
+        if repo.has_sprite(option):
+            return option
+    return None
+
+
+def _baseline_scar(mapper, repo, name):
+    normalized = name.strip().replace(" ", "").replace("-", "").upper()
+    for candidate in (
+        mapper.build_sprite_name("scars", normalized, None),
+        mapper.build_sprite_name("scar", normalized, None),
+    ):
+        if candidate and repo.has_sprite(candidate):
+            return candidate
+    return None
+
+
+def test_alias_resolution_matches_baseline_for_catalog_names():
+    mapper = SpriteMapper(Path("renderer_service/data"))
+    repo = SpriteRepository()
+    mapper.resolve_aliases(repo)
+
+    names = list(mapper.accessories)
+    names += [name.lower() for name in mapper.accessories]
+    names += [f" {name} " for name in mapper.accessories]
+    for name in names:
+        expected = _baseline_accessory(mapper, repo, name)
+        if expected is not None:
+            assert mapper.resolve_accessory(name) == expected, name
+
+    for name in mapper.scars:
+        normalized = name.strip().replace(" ", "").replace("-", "").upper()
+        expected = _baseline_scar(mapper, repo, name)
+        assert mapper.resolve_scar(normalized) == expected, name
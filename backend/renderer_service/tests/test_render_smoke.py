@@ -1,17 +1,78 @@
+import asyncio
+import hashlib
 import json
+import shutil
+import time
+from io import BytesIO
 from pathlib import Path
 
+import numpy as np
+import pytest
 from fastapi.testclient import TestClient
-from PIL import ImageOps
+from PIL import Image, ImageOps
+from PIL.PngImagePlugin import PngInfo
 
-from renderer_service.app import create_app
+from renderer_service import app as app_module
+from renderer_service.app import (
+    ScaledRenderCache,
+    StartupState,
+    create_app,
+    run_warmup,
+)
+from renderer_service.config import settings
+from renderer_service.models import BatchVariant, LayerIdentifier
+from renderer_service.renderer import (
+    PlanCompileError,
+    pattern_atlas,
+    pattern_pool,
+    patterns,
+)
+from renderer_service.renderer import pipeline as pipeline_module
+from renderer_service.renderer.custom_colours import (
+    CUSTOM_PREFIX,
+    CustomColourRegistry,
+    CustomPatternLimits,
+    estimated_pixel_work,
+)
+from renderer_service.renderer.fingerprints import AssetFingerprints
+from renderer_service.renderer.hot_reload import rebuild_pipeline
+from renderer_service.renderer.image_ops import (
+    fill_with_colour,
+    multiply,
+    multiply_colour,
+    tint_image,
+    upscale_nearest,
+)
+from renderer_service.renderer.pattern_atlas import (
+    build_pattern_atlas,
+    load_atlas,
+    needs_rebuild,
+)
+from renderer_service.renderer.pattern_pool import (
+    PatternPool,
+    generate_pattern_tiles,
+    resolve_workers,
+)
+from renderer_service.renderer.patterns import PatternDefinition
 from renderer_service.renderer.pipeline import RenderPipeline
 from renderer_service.renderer.repository import SpriteRepository
-from renderer_service.models import LayerIdentifier
+from renderer_service.renderer.sprite_mapper import SpriteMapper
+from renderer_service.renderer.tile_store import TileStore
+from renderer_service.renderer.tint_cache import TintCache
+from renderer_service.renderer.v3_renderer import _experimental_blends
+from renderer_service.renderer.warmup import WarmupProgress, build_warmup_plan
 
 FIXTURES_DIR = Path(__file__).parent / "fixtures"
 
 
+@pytest.fixture(autouse=True)
+def no_background_warmup(monkeypatch):
+    # Warm-up slices every sprite and generates every pattern; app tests only
+    # need the deferred startup. test_background_warmup_runs_every_phase
+    # turns it back on.
+    monkeypatch.setattr(settings, "warmup_enabled", False)
+
+
 def load_fixture(name: str) -> dict:
     with (FIXTURES_DIR / name).open("r", encoding="utf-8") as fh:
         return json.load(fh)
@@ -255,3 +316,1028 @@ def test_render_batch_layer_mode():
     assert data["frames"][0]["id"] == "scarred"
     sheet = data["sheet"]
     assert sheet.startswith("data:image/png;base64,")
+
+
+def test_render_batch_integer_scale():
+    pipeline = RenderPipeline(repository=SpriteRepository())
+    params = {"spriteNumber": 5, "peltName": "SingleColour", "colour": "GINGER"}
+
+    result = pipeline.render_batch(params, [], scale=4)
+    assert result.scale == 4
+    assert result.tile_size == 200
+    assert result.sheet.size == (50, 50)
+    assert (result.width, result.height) == (200, 200)
+
+    native = np.asarray(pipeline.render(params).composed)
+    scaled = np.asarray(upscale_nearest(result.sheet, result.scale))
+    assert scaled.shape == (200, 200, 4)
+    # every native pixel becomes a uniform 4x4 block
+    assert np.array_equal(scaled[::4, ::4], native)
+    assert np.array_equal(scaled[3::4, 3::4], native)
+
+    # tileSize that is an exact multiple of the canvas takes the same path
+    assert pipeline.render_batch(params, [], tile_size=150).scale == 3
+
+
+def test_scaled_render_cache_is_bounded_by_bytes():
+    cache = ScaledRenderCache(max_bytes=10)
+    cache.put("a", "xxxx")
+    cache.put("b", "yyyy")
+    assert cache.get("a") == "xxxx"
+    # "b" is least recently used and goes first once the budget is exceeded.
+    cache.put("c", "zzzz")
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxxx" and cache.get("c") == "zzzz"
+    # Values larger than the whole budget are never stored.
+    cache.put("d", "w" * 11)
+    assert cache.get("d") is None
+    stats = cache.stats()
+    assert stats["bytes"] == 8 and stats["size"] == 2
+    assert stats["evictions"] == 1
+
+
+def test_scaled_batch_responses_are_cached():
+    payload = {
+        "payload": {
+            "spriteNumber": 5,
+            "params": {"peltName": "SingleColour", "colour": "GINGER"},
+        },
+        "variants": [{"id": "scar", "overrides": {"scars": ["ONE"]}}],
+        "options": {"scale": 2, "columns": 2},
+    }
+    with TestClient(create_app()) as client:
+        # Cache keys carry the asset digest, which startup fills in shortly.
+        deadline = time.monotonic() + 10
+        while (
+            client.get("/health").json()["assets"] is None
+            and time.monotonic() < deadline
+        ):
+            time.sleep(0.01)
+        first = client.post("/render/batch", json=payload)
+        second = client.post("/render/batch", json=payload)
+        native = client.post(
+            "/render/batch", json={**payload, "options": {"columns": 2}}
+        )
+        stats = client.get("/health").json()["caches"]["scaled_renders"]
+    assert first.status_code == second.status_code == native.status_code == 200
+    assert second.json() == first.json()
+    assert first.json()["tileSize"] == 100
+    # Only the scaled sheet goes through the cache.
+    assert stats["misses"] == 1 and stats["hits"] == 1 and stats["size"] == 1
+
+
+def test_render_batch_executes_precompiled_plans(monkeypatch):
+    pipeline = RenderPipeline(validate=False)
+    params = {"spriteNumber": 5, "peltName": "SingleColour", "colour": "GINGER"}
+    variants = [
+        BatchVariant(id="tabby", overrides={"peltName": "Tabby"}),
+        BatchVariant(id="scar", overrides={"scars": ["ONE"]}),
+    ]
+    expected = pipeline.render_batch(params, variants)
+    plans = pipeline.compile_batch(params, variants, include_base=True)
+    assert len(plans) == 3
+
+    def compile_in_worker(params):
+        raise AssertionError("render_batch recompiled a frame")
+
+    monkeypatch.setattr(pipeline.renderer, "compile", compile_in_worker)
+    result = pipeline.render_batch(params, variants, plans=plans)
+    assert result.sheet.tobytes() == expected.sheet.tobytes()
+    with pytest.raises(ValueError):
+        pipeline.render_batch(params, variants, plans=plans[1:])
+
+
+def test_render_batch_sources_are_sheet_crops():
+    pipeline = RenderPipeline(repository=SpriteRepository())
+    params = {"spriteNumber": 5, "peltName": "SingleColour", "colour": "GINGER"}
+    variants = [
+        BatchVariant(id="tabby", overrides={"peltName": "Tabby"}),
+        BatchVariant(id="scar", overrides={"scars": ["ONE"]}),
+    ]
+
+    result = pipeline.render_batch(params, variants, columns=2, include_sources=True)
+    assert result.sheet.size == (100, 100)
+    assert [frame_id for frame_id, _ in result.sources] == ["base", "tabby", "scar"]
+
+    sources = dict(result.iter_source_images())
+    expected = pipeline.render({**params, "scars": ["ONE"]}).composed
+    assert sources["scar"].tobytes() == expected.tobytes()
+    # unused cell in the 2x2 grid stays fully transparent
+    assert result.sheet.crop((50, 50, 100, 100)).getbbox() is None
+
+
+def test_render_layer_matches_full_render():
+    repo = SpriteRepository()
+    pipeline = RenderPipeline(repository=repo)
+    renderer = pipeline.renderer
+
+    fixture = load_fixture("reference_cat.json")
+    cases = [
+        {**fixture["params"]},
+        {
+            **fixture["params"],
+            "reverse": True,
+            "scars": ["ONE", "NOPAW"],
+            "darkForest": True,
+        },
+        {"spriteNumber": 3, "peltName": "Tabby", "colour": "GREY", "shading": True},
+    ]
+    for params in cases:
+        _, stages = renderer.render(params)
+        for identifier in LayerIdentifier:
+            expected = next(
+                (info.image for info in stages if info.identifier == identifier), None
+            )
+            actual = renderer.render_layer(params, identifier)
+            if expected is None:
+                assert actual is None, identifier
+            else:
+                assert actual is not None, identifier
+                assert actual.tobytes() == expected.tobytes(), identifier
+
+
+def test_compiled_plan_is_hashable_and_rejects_bad_params():
+    pipeline = RenderPipeline()
+    params = load_fixture("reference_cat.json")["params"]
+
+    plan = pipeline.compile(params)
+    assert plan == pipeline.compile({**params, "unusedKey": 1})
+    assert len({plan, pipeline.compile(params)}) == 1
+    assert plan.steps[0].stage == "base"
+    composed, _ = pipeline.renderer.render(params)
+    assert pipeline.render_plan(plan).composed.tobytes() == composed.tobytes()
+
+    with pytest.raises(PlanCompileError):
+        pipeline.compile({**params, "spriteNumber": "eight"})
+
+    with TestClient(create_app()) as client:
+        response = client.post(
+            "/render",
+            json={
+                "payload": {
+                    "spriteNumber": 8,
+                    "params": {**params, "isTortie": True, "tortie": ["CALICO"]},
+                }
+            },
+        )
+    assert response.status_code == 422
+
+
+def test_alias_tables_resolve_spellings():
+    mapper = RenderPipeline().mapper
+    expected = mapper.accessory_sprite_name("BLACK MOUSE")
+    assert expected == "acc_smallAnimalBLACK MOUSE"
+    assert mapper.accessory_sprite_name(" black  mouse") == expected
+    assert mapper.accessory_sprite_name("BLACKMOUSE") == expected
+    assert mapper.accessory_sprite_name("not an accessory") is None
+    assert mapper.scar_sprite_name("one") == "scarsONE"
+
+    with TestClient(create_app()) as client:
+        report = client.get("/aliases/unresolved").json()
+    assert report["accessories"] == [] and report["scars"] == []
+    assert report["counts"]["accessory_aliases"] >= len(mapper.accessories)
+
+
+def test_tint_cache_reuses_tinted_pelts():
+    pipeline = RenderPipeline()
+    renderer = pipeline.renderer
+    colour = next(
+        name
+        for name, definition in pipeline.mapper.experimental_defs.items()
+        if not definition.pattern
+    )
+    params = {"spriteNumber": 8, "peltName": "Tabby", "colour": colour}
+
+    first, _ = renderer.render(params)
+    assert renderer.tint_cache.stats()["misses"] == 1
+    second, _ = renderer.render(params)
+    stats = renderer.tint_cache.stats()
+    assert stats["hits"] == 1 and stats["size"] == 1
+    assert first.tobytes() == second.tobytes()
+
+    expected = renderer._apply_experimental_tint(
+        pipeline.repository.get_sprite("tabbyWHITE", 8),
+        pipeline.mapper.get_experimental_definition(colour),
+    )
+    assert (
+        renderer._tinted_sprite("tabbyWHITE", 8, colour).tobytes() == expected.tobytes()
+    )
+
+    assert renderer.prewarm_tints(colour, ["Tabby", "Smoke"], range(2)) == 4
+    assert renderer.tint_cache.contains("smokeWHITE", 1, colour)
+
+
+def test_tint_cache_colour_counts_stay_bounded():
+    cache = TintCache(maxsize=0, max_tracked=8)
+    blank = Image.new("RGBA", (1, 1))
+    for _ in range(3):
+        cache.get_or_create("tabbyWHITE", 0, "GINGER", lambda: blank)
+    for index in range(100):
+        cache.get_or_create("tabbyWHITE", 0, f"{CUSTOM_PREFIX}{index}", lambda: blank)
+    for index in range(20):
+        cache.get_or_create("tabbyWHITE", 0, f"COLOUR{index}", lambda: blank)
+
+    assert len(cache.colour_counts) <= 8
+    top = dict(cache.stats()["top_colours"])
+    assert top[f"{CUSTOM_PREFIX}*"] == 100
+    assert top["GINGER"] == 3
+
+
+def test_tint_luts_match_float_blends():
+    rng = np.random.default_rng(7)
+    tile = rng.integers(0, 256, size=(50, 50, 4), dtype=np.uint8)
+    tile[:5, :, 3] = 0
+    tile[5:10, :, 3] = 255
+    image = Image.fromarray(tile, mode="RGBA")
+    floats = tile.astype(np.float32) / 255.0
+
+    colour = (200, 120, 40)
+    expected = np.clip(
+        np.rint(floats[..., :3] * (np.array(colour, np.float32) / 255.0) * 255.0),
+        0,
+        255,
+    )
+    tinted = np.asarray(tint_image(image, colour))
+    visible = tile[..., 3] > 0
+    assert np.array_equal(tinted[visible, :3], expected[visible].astype(np.uint8))
+    assert not tinted[~visible].any()
+
+    canvas_reference = multiply(
+        image, fill_with_colour(image.size, colour + (255,), image)
+    )
+    assert multiply_colour(image, colour).tobytes() == canvas_reference.tobytes()
+
+    pipeline = RenderPipeline()
+    for definition in pipeline.mapper.experimental_defs.values():
+        if definition.pattern:
+            continue
+        rgb = np.clip(
+            _experimental_blends(floats[..., :3], definition, include_multiply=True),
+            0.0,
+            1.0,
+        )
+        expected = np.clip(np.rint(rgb * 255.0), 0, 255).astype(np.uint8)
+        actual = np.asarray(
+            pipeline.renderer._apply_experimental_tint(image, definition)
+        )
+        assert np.array_equal(actual[..., :3], expected)
+        assert np.array_equal(actual[..., 3], tile[..., 3])
+
+
+def test_palette_patterns_compiled_at_load(tmp_path):
+    data_dir = tmp_path / "data"
+    shutil.copytree(RenderPipeline(validate=False).mapper.data_dir, data_dir)
+    (data_dir / "palettes" / "zz-broken.json").write_text(
+        json.dumps(
+            {
+                "id": "zz-broken",
+                "colors": {
+                    "ZZ_BAD": {"pattern": {"type": "not-a-pattern"}},
+                    "ZZ_STRIPES": {
+                        "pattern": {
+                            "type": "tartan",
+                            "tileSize": 4,
+                            "stripes": [{"color": [255, 0, 0], "width": 2}],
+                        }
+                    },
+                },
+            }
+        ),
+        encoding="utf-8",
+    )
+    mapper = SpriteMapper(data_dir, validate=False)
+
+    assert [error["colour"] for error in mapper.palette_errors] == ["ZZ_BAD"]
+    assert mapper.experimental_defs["ZZ_BAD"].pattern_definition is None
+    assert mapper.experimental_defs["ZZ_BAD"].pattern_tile(50, 50) is None
+    assert "zz-broken" in mapper.palette_load_ms
+
+    definition = mapper.experimental_defs["ZZ_STRIPES"]
+    assert isinstance(definition.pattern_definition, PatternDefinition)
+    tile = definition.pattern_tile(50, 50)
+    assert tile.shape == (50, 50, 3)
+    assert definition.pattern_tile(50, 50) is tile
+
+
+def test_svg_tiles_served_from_disk_store(tmp_path, monkeypatch):
+    store = TileStore(tmp_path)
+    monkeypatch.setattr(patterns, "get_tile_store", lambda: store)
+    svg = '<svg xmlns="http://www.w3.org/2000/svg" width="4" height="4"/>'
+    tile = np.arange(4 * 4 * 3, dtype=np.uint8).reshape(4, 4, 3)
+    store.save(store.key(svg, 4, 4), tile)
+
+    result = patterns._svg_to_array(svg, 4, 4)
+    assert result.dtype == np.float32
+    assert np.array_equal(result, tile.astype(np.float32) / 255.0)
+    assert store.stats()["hits"] == 1
+
+    assert store.key(svg, 4, 4) != store.key(svg, 8, 8)
+    broken = store.key(svg, 8, 8)
+    store.path(broken).parent.mkdir(parents=True, exist_ok=True)
+    store.path(broken).write_bytes(b"not an array")
+    assert store.load(broken) is None
+    assert not store.path(broken).exists()
+    assert store.stats()["misses"] == 1 and store.stats()["errors"] == 1
+
+
+def test_hi_res_mode_rasterises_vector_patterns_at_scale(monkeypatch):
+    requested = []
+
+    class FakeStore:
+        # Stands in for cairo: serves a gradient of whatever size is asked for.
+        def key(self, source, width, height):
+            return (width, height)
+
+        def load(self, key):
+            requested.append(key)
+            width, height = key
+            ramp = np.linspace(0, 255, width * height * 3, dtype=np.float32)
+            return ramp.astype(np.uint8).reshape(height, width, 3)
+
+    monkeypatch.setattr(patterns, "get_tile_store", lambda: FakeStore())
+    flag = PatternDefinition("flag_switzerland", 10, (200, 0, 0))
+    tile = patterns.generate_scaled_pattern_tile(flag, 210, 210, 7)
+    assert requested == [(70, 70)] and tile.shape == (210, 210, 3)
+
+    # Pixel-grid patterns are defined in canvas pixels: hi-res is the 1x tile upscaled.
+    stripes = (patterns.PatternStripe((200, 10, 10), 2, 1),)
+    tartan = PatternDefinition("tartan", 8, (10, 20, 30), stripes=stripes)
+    native = patterns.generate_pattern_tile(tartan, 30, 30)
+    scaled = patterns.generate_scaled_pattern_tile(tartan, 90, 90, 3)
+    assert np.array_equal(scaled, native.repeat(3, axis=0).repeat(3, axis=1))
+
+
+def test_hi_res_render_matches_upscaled_render_without_vector_patterns():
+    pipeline = RenderPipeline(validate=False)
+    colour = next(
+        key
+        for key, definition in pipeline.mapper.experimental_defs.items()
+        if definition.pattern_definition is not None
+        and definition.pattern_definition.type == "tartan"
+    )
+    for name in (colour, "GINGER"):
+        plan = pipeline.compile(
+            {"spriteNumber": 8, "peltName": "Tabby", "colour": name}
+        )
+        hi_res = pipeline.render_plan(plan, scale=3).composed
+        upscaled = upscale_nearest(pipeline.render_plan(plan).composed, 3)
+        assert hi_res.size == (150, 150)
+        assert np.array_equal(np.asarray(hi_res), np.asarray(upscaled))
+
+
+def test_inline_custom_colours_are_limited_and_reused():
+    pipeline = RenderPipeline(validate=False)
+    registry = pipeline.renderer.custom_colours = CustomColourRegistry(
+        CustomPatternLimits(
+            max_tile_size=32, max_stripes=4, svg_per_request=1, generation_ms=250.0
+        )
+    )
+    custom = {
+        "pattern": {
+            "type": "tartan",
+            "tileSize": 12,
+            "background": [20, 30, 40],
+            "stripes": [{"color": [200, 10, 10], "width": 2, "offset": 1}],
+        },
+        "overlay": [200, 40, 40, 0.3],
+    }
+    params = {"spriteNumber": 8, "peltName": "Tabby", "colour": custom}
+    plan = pipeline.compile(params)
+    (key,) = plan.steps[0].colours
+    assert key.startswith(CUSTOM_PREFIX)
+    assert pipeline.render_plan(plan).composed.getbbox() is not None
+    # An identical definition (e.g. the next keystroke) maps to the same entry.
+    assert pipeline.compile({**params, "colour": {**custom}}) == plan
+    assert registry.stats()["hits"] == 1 and registry.stats()["misses"] == 1
+
+    too_big = {"pattern": {**custom["pattern"], "tileSize": 33}}
+    too_many = {
+        "pattern": {**custom["pattern"], "stripes": custom["pattern"]["stripes"] * 5}
+    }
+    too_wide = {
+        "pattern": {
+            **custom["pattern"],
+            "stripes": [{"color": [1, 2, 3], "width": 200, "offset": 0}] * 3,
+        }
+    }
+    for bad in (
+        too_big,
+        too_many,
+        too_wide,
+        {"pattern": {"type": "tartan", "spacing": 0}},
+        {"pattern": {"type": "tartan", "spacing": 65}},
+        {
+            "pattern": {
+                **custom["pattern"],
+                "stripes": [{"color": [1, 2, 3], "width": 257}],
+            }
+        },
+        {"overlay": [1, 2, 3]},
+    ):
+        with pytest.raises(PlanCompileError):
+            pipeline.compile({**params, "colour": bad})
+
+    # Refused from the estimated pixel work, before any tile is generated.
+    strict = CustomColourRegistry(
+        CustomPatternLimits(max_tile_size=32, max_stripes=4, generation_ms=0.1)
+    )
+    wide = {
+        "pattern": {
+            **custom["pattern"],
+            "tileSize": 32,
+            "stripes": [{"color": [1, 2, 3], "width": 128, "offset": 0}] * 4,
+        }
+    }
+    assert estimated_pixel_work(PatternDefinition.from_dict(wide["pattern"])) == (
+        32 * 32 * (1 + 4 * 2 * 4)
+    )
+    with pytest.raises(PlanCompileError, match="would take about"):
+        strict.register(wide)
+    assert strict.stats()["rejected"] == 1 and strict.stats()["size"] == 0
+    strict.register(custom)
+
+    # Only one uncached SVG pattern per request.
+    flag = {
+        "pattern": {
+            "type": "flag_switzerland",
+            "tileSize": 10,
+            "background": [200, 0, 0],
+        }
+    }
+    cross = {"pattern": {**flag["pattern"], "background": [0, 0, 200]}}
+    with pytest.raises(PlanCompileError, match="SVG"):
+        pipeline.compile(
+            {
+                **params,
+                "colour": flag,
+                "isTortie": True,
+                "tortiePattern": "Tabby",
+                "tortieColour": cross,
+            }
+        )
+
+    # A definition that generated too slowly is refused from then on.
+    registry._record_generation(registry.get(key), 1000.0)
+    with pytest.raises(PlanCompileError, match="ms"):
+        pipeline.compile(params)
+    assert registry.get(key) is None and registry.stats()["rejected"] == 1
+
+
+def test_plans_keep_custom_colours_the_registry_dropped():
+    custom = {
+        "pattern": {
+            "type": "tartan",
+            "tileSize": 12,
+            "background": [20, 30, 40],
+            "stripes": [{"color": [200, 10, 10], "width": 2, "offset": 1}],
+        },
+        "overlay": [200, 40, 40, 0.3],
+    }
+    params = {"spriteNumber": 8, "peltName": "Tabby", "colour": custom}
+    expected = np.asarray(RenderPipeline(validate=False).render(params).composed)
+    untinted = RenderPipeline(validate=False).render({**params, "colour": "WHITE"})
+    assert not np.array_equal(expected, np.asarray(untinted.composed))
+
+    # Evicted between compile and execute.
+    pipeline = RenderPipeline(validate=False)
+    plan = pipeline.compile(params)
+    pipeline.renderer.custom_colours._entries.clear()
+    assert np.array_equal(np.asarray(pipeline.render_plan(plan).composed), expected)
+
+    # A registry of size 0 shares nothing between requests but still renders.
+    uncached = RenderPipeline(
+        validate=False, custom_colours=CustomColourRegistry(maxsize=0)
+    )
+    rendered = uncached.render(params)
+    assert np.array_equal(np.asarray(rendered.composed), expected)
+    assert uncached.renderer.custom_colours.stats()["size"] == 0
+
+
+def test_pattern_atlas_builds_incrementally(tmp_path):
+    data_dir = tmp_path / "data"
+    shutil.copytree(RenderPipeline(validate=False).mapper.data_dir, data_dir)
+    cache_dir = tmp_path / "cache"
+    palettes_dir = data_dir / "palettes"
+    for path in palettes_dir.glob("*.json"):
+        if path.name not in {"tartan-patterns.json", "argyle-patterns.json"}:
+            path.unlink()
+
+    definitions = SpriteMapper(data_dir, validate=False).pattern_definitions()
+    atlas, report = build_pattern_atlas(definitions, palettes_dir, cache_dir, 50)
+    assert report["generated"] == len(definitions) - report["failed"] > 0
+    assert not needs_rebuild(load_atlas(cache_dir, 50), palettes_dir, 50)
+
+    definition = next(
+        d for d in definitions if pattern_atlas.pattern_digest(d) in atlas.slots
+    )
+    expected = patterns.generate_pattern_tile.__wrapped__(definition, 50, 50)
+    try:
+        pattern_atlas.install_pattern_atlas(load_atlas(cache_dir, 50))
+        assert np.array_equal(
+            patterns.generate_pattern_tile(definition, 50, 50), expected
+        )
+        assert patterns.generate_pattern_tile(definition, 64, 64).shape == (64, 64, 3)
+    finally:
+        pattern_atlas.install_pattern_atlas(None)
+
+    argyle = palettes_dir / "argyle-patterns.json"
+    palette = json.loads(argyle.read_text(encoding="utf-8"))
+    first = next(iter(palette["colors"].values()))
+    first["pattern"]["background"] = [1, 2, 3]
+    argyle.write_text(json.dumps(palette), encoding="utf-8")
+    assert needs_rebuild(load_atlas(cache_dir, 50), palettes_dir, 50)
+
+    _, report = build_pattern_atlas(
+        SpriteMapper(data_dir, validate=False).pattern_definitions(),
+        palettes_dir,
+        cache_dir,
+        50,
+    )
+    assert report["generated"] == 1
+    assert report["changed_palettes"] == ["argyle-patterns.json"]
+    assert not list(data_dir.glob("pattern_atlas_*"))
+
+    # Failures are recorded, not retried while the inputs stay the same.
+    definitions = SpriteMapper(data_dir, validate=False).pattern_definitions()
+    builder = pattern_atlas.AtlasBuilder(definitions, palettes_dir, 50)
+    failing = builder.pending[0]
+    builder.failed.append(failing)
+    builder.generate(builder.pending[1:])
+    pattern_atlas.save_atlas(builder.finish(), cache_dir)
+    previous = load_atlas(cache_dir, 50)
+    assert previous.failed == [failing]
+    assert not needs_rebuild(previous, palettes_dir, 50)
+    rebuilt = pattern_atlas.AtlasBuilder(definitions, palettes_dir, 50, previous)
+    assert rebuilt.up_to_date and rebuilt.failed == [failing]
+
+
+def test_pattern_pool_generates_in_worker_processes(monkeypatch):
+    # 0 leaves half the cores to the render workers.
+    monkeypatch.setattr(
+        pattern_pool.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False
+    )
+    assert resolve_workers(0) == 4
+    assert resolve_workers(3) == 3
+
+    mapper = RenderPipeline(validate=False).mapper
+    definitions = [
+        definition
+        for definition in mapper.pattern_definitions()
+        if definition.type in {"tartan", "argyle", "polkadot"}
+    ][:6]
+    expected = [
+        patterns.generate_pattern_tile.__wrapped__(d, 50, 50) for d in definitions
+    ]
+    # An atlas installed by an app test would serve these without the pool.
+    pattern_atlas.install_pattern_atlas(None)
+    try:
+        tiles = generate_pattern_tiles(definitions + definitions[:2], 50, workers=2)
+        assert list(tiles) == definitions
+        for definition, tile in zip(definitions, expected):
+            assert np.array_equal(tiles[definition], tile)
+            # Primed: the render path gets the pooled tile without regenerating.
+            assert patterns._PRIMED[(definition, 50, 50)] is tiles[definition]
+
+        # A long-lived pool serves several small batches with the same processes.
+        patterns._PRIMED.clear()
+        pool = PatternPool(2)
+        try:
+            first = pool.generate(definitions[:4], 50)
+            second = pool.generate(definitions[4:], 50)
+        finally:
+            pool.close()
+        for definition, tile in zip(definitions, expected):
+            assert np.array_equal({**first, **second}[definition], tile)
+    finally:
+        patterns._PRIMED.clear()
+        patterns.generate_pattern_tile.cache_clear()
+
+
+def _reference_tartan(defn):
+    # Pre-vectorisation generator: one blend per stripe pixel, in order.
+    ts = defn.tile_size
+    tile = np.full((ts, ts, 3), patterns._c(defn.background), dtype=np.float32)
+    for stripe in defn.stripes:
+        sc = patterns._c(stripe.color)
+        for i in range(stripe.width):
+            idx = (stripe.offset + i) % ts
+            tile[idx, :] = 0.5 * tile[idx, :] + 0.5 * sc
+            tile[:, idx] = 0.5 * tile[:, idx] + 0.5 * sc
+    return np.clip(tile, 0.0, 1.0)
+
+
+def _reference_flag(defn):
+    ts = defn.tile_size
+    tile = np.full((ts, ts, 3), patterns._c(defn.background), dtype=np.float32)
+    total_weight = sum(s.width for s in defn.stripes)
+    y = 0
+    for i, stripe in enumerate(defn.stripes):
+        h = (
+            ts - y
+            if i == len(defn.stripes) - 1
+            else max(round(ts * stripe.width / total_weight), 1)
+        )
+        end = min(y + h, ts)
+        tile[y:end, :] = patterns._c(stripe.color)
+        y = end
+        if y >= ts:
+            break
+    return tile
+
+
+def test_vectorised_stripe_generators_match_loops():
+    rng = np.random.default_rng(7)
+    for _ in range(150):
+        stripes = tuple(
+            patterns.PatternStripe(
+                color=tuple(int(v) for v in rng.integers(0, 256, 3)),
+                width=int(rng.choice([1, 2, 3, 7, 40, 300])),
+                offset=int(rng.integers(-4, 70)),
+            )
+            for _ in range(int(rng.integers(1, 6)))
+        )
+        ts = int(rng.choice([1, 3, 8, 16, 64]))
+        tartan = PatternDefinition("tartan", ts, (30, 60, 90), stripes=stripes)
+        flag = PatternDefinition("flag", ts, (30, 60, 90), stripes=stripes)
+        assert np.array_equal(
+            patterns._generate_tartan(tartan), _reference_tartan(tartan)
+        )
+        assert np.array_equal(patterns._generate_flag(flag), _reference_flag(flag))
+
+
+def test_render_batch_expand_variants():
+    app = create_app()
+    with TestClient(app) as client:
+        payload = {
+            "payload": {
+                "spriteNumber": 8,
+                "params": {"peltName": "SingleColour", "colour": "GINGER"},
+            },
+            "options": {
+                "frameMode": "layer",
+                "layerId": "scarsPrimary",
+                "expandVariants": True,
+                "includeBase": False,
+                "variantOffset": 2,
+                "variantLimit": 4,
+            },
+        }
+        response = client.post("/render/batch", json=payload)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["totalVariants"] > 4
+        assert len(data["frames"]) == 4
+        assert data["frames"][0]["id"] == "scarsPrimary:scarsTHREE"
+        assert all(frame["group"] == "scarsPrimary" for frame in data["frames"])
+
+        payload["options"]["layerId"] = "lineart"
+        response = client.post("/render/batch", json=payload)
+        assert response.status_code == 422
+
+
+def test_diff_endpoint_layers():
+    app = create_app()
+    base = {
+        "spriteNumber": 5,
+        "params": {"peltName": "SingleColour", "colour": "GINGER"},
+    }
+    scarred = {
+        "spriteNumber": 5,
+        "params": {"peltName": "SingleColour", "colour": "GINGER", "scars": ["ONE"]},
+    }
+    with TestClient(app) as client:
+        response = client.post(
+            "/diff", json={"v2": base, "v3": scarred, "collect_layers": True}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["composed"]["mismatch_pixels"] > 0
+        assert data["composed"]["total_pixels"] == 2500
+        by_id = {layer["id"]: layer for layer in data["layers"]}
+        assert by_id["base"]["mismatch_pixels"] == 0
+        assert by_id["scarsPrimary"]["mismatch_pixels"] > 0
+
+        response = client.post(
+            "/diff/batch",
+            json={
+                "pairs": [
+                    {"v2": base, "v3": base},
+                    {"v2": base, "v3": scarred, "epsilon": 255},
+                ]
+            },
+        )
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0]["composed"]["mismatch_pixels"] == 0
+        assert results[1]["composed"]["mismatch_pixels"] == 0
+        assert results[1]["layers"] == []
+
+        # Bad params are rejected before they reach a worker or the breaker.
+        bad = {"spriteNumber": 5, "params": {"spriteNumber": "five"}}
+        response = client.post("/diff", json={"v2": base, "v3": bad})
+        assert response.status_code == 422
+        assert response.json()["detail"].startswith("v3: spriteNumber")
+        response = client.post(
+            "/diff/batch",
+            json={"pairs": [{"v2": base, "v3": base}, {"v2": bad, "v3": base}]},
+        )
+        assert response.status_code == 422
+        assert response.json()["detail"].startswith("pairs[1].v2:")
+        response = client.post(
+            "/render/batch",
+            json={
+                "payload": base,
+                "variants": [{"id": "bad", "params": bad["params"]}],
+            },
+        )
+        assert response.status_code == 422
+        assert "variant 'bad'" in response.json()["detail"]
+        assert client.get("/health").json()["metrics"]["total_failed"] == 0
+
+
+def test_palettes_served_with_etag_and_swatch_sheet():
+    app = create_app()
+    client = TestClient(app)
+    response = client.get("/palettes")
+    assert (
+        response.status_code == 200
+        and response.headers["content-type"] == "application/json"
+    )
+    etag = response.headers["etag"]
+    assert client.get("/palettes", headers={"If-None-Match": etag}).status_code == 304
+    assert (
+        client.get("/palettes", headers={"If-None-Match": '"stale"'}).status_code == 200
+    )
+
+    palette = response.json()[0]
+    entry = next(iter(palette["colors"].values()))
+    x, y, width, height = entry["swatch"]
+    sheet = client.get("/palettes/swatches.png")
+    assert sheet.headers["content-type"] == "image/png"
+    revalidated = client.get(
+        "/palettes/swatches.png", headers={"If-None-Match": sheet.headers["etag"]}
+    )
+    assert revalidated.status_code == 304
+    image = Image.open(BytesIO(sheet.content)).convert("RGBA")
+    swatch = np.asarray(image.crop((x, y, x + width, y + height)))
+    assert swatch.shape == (height, width, 4) and (swatch[..., 3] == 255).all()
+
+
+def test_palette_preview_matches_per_colour_renders():
+    pipeline = RenderPipeline(validate=False)
+    categories = pipeline.mapper.experimental_categories
+    # One palette of flat colours and one of patterns.
+    palettes = [
+        next(
+            p
+            for p, colours in categories.items()
+            if not pipeline.mapper.experimental_defs[colours[0]].pattern
+        ),
+        next(
+            p
+            for p, colours in categories.items()
+            if pipeline.mapper.experimental_defs[colours[0]].pattern
+        ),
+    ]
+    params = {
+        **load_fixture("reference_cat.json")["params"],
+        "isTortie": True,
+        "tortiePattern": "Tabby",
+        "tortieColour": "GINGER",
+        "tortieMask": "ONE",
+        "scars": ["NOPAW"],
+        "darkForest": True,
+    }
+    for palette in palettes:
+        result = pipeline.render_palette_preview(params, palette, columns=4)
+        sheet = np.asarray(result.sheet)
+        assert [frame.id for frame in result.frames] == categories[palette]
+        for frame in result.frames:
+            expected = pipeline.render({**params, "colour": frame.id}).composed
+            tile = sheet[
+                frame.y : frame.y + frame.height, frame.x : frame.x + frame.width
+            ]
+            assert np.array_equal(tile, np.asarray(expected)), frame.id
+
+    body = {
+        "palette": palettes[0],
+        "payload": {"spriteNumber": 8, "params": {"peltName": "Tabby"}},
+    }
+    with TestClient(create_app()) as client:
+        response = client.post("/palettes/preview", json=body)
+        assert response.status_code == 200
+        assert len(response.json()["frames"]) == len(categories[palettes[0]])
+        assert (
+            client.post(
+                "/palettes/preview", json={**body, "palette": "nope"}
+            ).status_code
+            == 404
+        )
+
+
+def test_hot_reload_drops_only_changed_cache_entries(tmp_path, monkeypatch):
+    data_dir = tmp_path / "data"
+    shutil.copytree(
+        pipeline_module.DATA_DIR,
+        data_dir,
+        ignore=shutil.ignore_patterns("pattern_atlas_*"),
+    )
+    sprite_root = tmp_path / "sprites"
+    sprite_root.mkdir()
+    for sheet in settings.sprite_root.glob("*.png"):
+        (sprite_root / sheet.name).symlink_to(sheet)
+    (sprite_root / "eyes.png").unlink()
+    shutil.copy(settings.sprite_root / "eyes.png", sprite_root / "eyes.png")
+    monkeypatch.setattr(pipeline_module, "DATA_DIR", data_dir)
+
+    pipeline = RenderPipeline(repository=SpriteRepository(sprite_root), validate=False)
+    manifest = tmp_path / "cache" / "asset-manifest.json"
+    scanned = pipeline.fingerprint_assets(manifest)
+    assert scanned.hashed == scanned.snapshot()["count"] > 100
+    assert rebuild_pipeline(pipeline).pipeline is None
+    # A restart hashes nothing: every file matches the manifest.
+    restarted = AssetFingerprints.scan(data_dir, sprite_root, manifest_path=manifest)
+    assert restarted.hashed == 0
+    assert restarted.global_digest == scanned.global_digest
+
+    # Two flat colours declared in different palette files.
+    flat = [
+        (path, name)
+        for path in sorted((data_dir / "palettes").glob("*.json"))
+        for name, entry in json.loads(path.read_text())["colors"].items()
+        if "pattern" not in entry and "multiply" in entry
+    ]
+    edited_file, edited = flat[0]
+    other = next(name for path, name in flat if path != edited_file)
+    params = {"spriteNumber": 8, "peltName": "Tabby", "eyeColour": "YELLOW"}
+    before = pipeline.render({**params, "colour": edited}).composed
+    pipeline.render({**params, "colour": other})
+
+    palette = json.loads(edited_file.read_text())
+    palette["colors"][edited]["multiply"] = [20, 200, 40]
+    edited_file.write_text(json.dumps(palette))
+    info = PngInfo()
+    info.add_text("revision", "2")
+    Image.open(sprite_root / "eyes.png").save(sprite_root / "eyes.png", pnginfo=info)
+
+    result = rebuild_pipeline(pipeline)
+    reloaded = result.pipeline
+    assert result.report["changed"] == [
+        f"data/palettes/{edited_file.name}",
+        "sprites/eyes.png",
+    ]
+    assert reloaded.fingerprints.hashed == 2
+    assert reloaded.fingerprints.global_digest != scanned.global_digest
+    assert (
+        reloaded.fingerprints.digest("sprites/eyes.png")
+        == hashlib.sha256((sprite_root / "eyes.png").read_bytes()).hexdigest()
+    )
+    assert result.report["colours_invalidated"] == [edited.upper()]
+    tints = reloaded.renderer.tint_cache
+    assert tints.contains("tabbyWHITE", 8, other.upper())
+    assert not tints.contains("tabbyWHITE", 8, edited.upper())
+    assert (
+        reloaded.mapper.experimental_defs[other.upper()]
+        is pipeline.mapper.experimental_defs[other.upper()]
+    )
+    assert ("tabbyWHITE", 8) in reloaded.repository._sprite_cache
+    assert not any(
+        name.startswith("eyes") for name, _ in reloaded.repository._sprite_cache
+    )
+
+    after = reloaded.render({**params, "colour": edited}).composed
+    fresh = RenderPipeline(repository=SpriteRepository(sprite_root), validate=False)
+    expected = fresh.render({**params, "colour": edited}).composed
+    assert after.tobytes() == expected.tobytes() != before.tobytes()
+    assert rebuild_pipeline(reloaded).pipeline is None
+
+    monkeypatch.setattr(settings, "cache_dir", tmp_path / "cache")
+    app = create_app()
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 10
+        while not app.state.startup.ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        response = client.post("/admin/reload")
+        assert response.status_code == 200
+        assert response.json()["changed"] == []
+        health = client.get("/health").json()
+        assert health["reload"]["reloads"] == 0
+        assets = health["assets"]
+        assert (
+            assets["assets"][f"data/palettes/{edited_file.name}"]
+            == (reloaded.fingerprints.digest(f"data/palettes/{edited_file.name}")[:16])
+        )
+        render = client.post(
+            "/render", json={"payload": {"spriteNumber": 8, "params": params}}
+        )
+        assert render.json()["meta"]["assets"] == assets["global"]
+
+
+def test_health_reports_deferred_startup():
+    app = create_app()
+    assert not app.state.startup.ready  # nothing heavy runs in the factory
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 10
+        while not app.state.startup.ready and time.monotonic() < deadline:
+            time.sleep(0.01)
+        startup = client.get("/health").json()["startup"]
+        assert startup["ready"] is True
+        assert startup["error"] is None
+        assert set(startup["steps_ms"]) == {
+            "validate",
+            "catalog",
+            "fingerprints",
+            "pattern_atlas",
+            "first_render",
+        }
+        assert client.get("/ready").status_code == 200
+
+
+def test_background_warmup_runs_every_phase(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "warmup_enabled", True)
+    monkeypatch.setattr(settings, "warmup_tiles", False)
+    monkeypatch.setattr(settings, "pattern_atlas", False)
+    monkeypatch.setattr(settings, "pattern_workers", 1)
+    monkeypatch.setattr(settings, "tint_cache_warm_colours", ["GINGER"])
+    monkeypatch.setattr(settings, "cache_dir", tmp_path / "cache")
+    app = create_app()
+    with TestClient(app) as client:
+        deadline = time.monotonic() + 300
+        while time.monotonic() < deadline:
+            warmup = client.get("/health").json()["startup"]["warmup"]
+            if warmup and warmup["finished"]:
+                break
+            time.sleep(0.1)
+        assert warmup["finished"] and warmup["failed"] == 0
+        for phase in ("atlases", "patterns", "tints", "corpus"):
+            progress = warmup["phases"][phase]
+            assert progress["total"] > 0 and progress["done"] == progress["total"]
+        assert client.get("/ready").status_code == 200
+
+
+def test_cancelled_warmup_closes_its_pattern_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "pattern_atlas", False)
+    monkeypatch.setattr(settings, "cache_dir", tmp_path / "cache")
+    closed = []
+
+    class RecordingPool(PatternPool):
+        def close(self, *, wait=True):
+            closed.append(wait)
+            super().close(wait=wait)
+
+    class BusySupervisor:
+        # A live request is always in flight, so no warm-up task ever starts.
+        def busy(self):
+            return True
+
+    monkeypatch.setattr(app_module, "PatternPool", RecordingPool)
+    startup = StartupState(warmup=WarmupProgress())
+
+    async def cancel_once_planned():
+        task = asyncio.create_task(
+            run_warmup(
+                startup,
+                RenderPipeline(validate=False),
+                BusySupervisor(),
+                include_tiles=False,
+                pattern_workers=2,
+                yield_seconds=0.01,
+            )
+        )
+        while not sum(startup.warmup.total.values()):
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_once_planned())
+    assert closed == [False]
+
+
+def test_ready_gated_on_warmup_progress():
+    pipeline = RenderPipeline()
+    plan = build_warmup_plan(pipeline, include_tiles=False)
+    phases = {task.phase for task in plan}
+    assert phases == {"atlases", "patterns", "corpus"}
+
+    # With a pool, pattern work is still split into batches; the caller closes it.
+    pooled = [
+        task.label
+        for task in build_warmup_plan(
+            pipeline, include_tiles=False, pattern_pool=PatternPool(2)
+        )
+        if task.phase == "patterns"
+    ]
+    assert len(pooled) > 3
+    assert pooled[-1] == "palettes:swatches"
+
+    state = StartupState(ready_fraction=0.5, warmup=WarmupProgress())
+    state.initialise(pipeline)
+    assert not state.ready
+    state.warmup.begin(plan)
+    for task in plan[: (len(plan) + 1) // 2]:
+        state.warmup.complete(task)
+    assert state.check_ready()
+    assert state.snapshot()["warmup"]["phases"]["atlases"]["total"] == len(
+        [task for task in plan if task.phase == "atlases"]
+    )
@@ -0,0 +1,475 @@
+#!/usr/bin/env python
+"""Micro-benchmarks for the render hot paths.
+
+Results are written as JSON and can be compared against a committed baseline;
+any benchmark whose median slows down by more than ``--threshold`` (relative)
+is reported as a regression and the process exits non-zero.
+
+    python tools/bench.py --output bench.json --baseline tools/bench_baseline.json
+    python tools/bench.py --filter patterns. --update-baseline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import cached_property
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from PIL import Image
+
+from renderer_service.app import _encode_png
+from renderer_service.models import BatchVariant, LayerIdentifier
+from renderer_service.renderer import image_ops
+from renderer_service.renderer.image_ops import upscale_nearest
+from renderer_service.renderer.patterns import (
+    _GENERATORS,
+    PatternDefinition,
+    generate_pattern_tile,
+)
+from renderer_service.renderer.pipeline import RenderPipeline
+from renderer_service.renderer.v3_renderer import STAGE_SEQUENCE, _CompileContext
+
+TOOLS_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = TOOLS_DIR / "bench_baseline.json"
+FIXTURE = TOOLS_DIR.parent / "tests" / "fixtures" / "reference_cat.json"
+
+Benchmark = Callable[["BenchContext"], Callable[[], Any]]
+_REGISTRY: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str) -> Callable[[Benchmark], Benchmark]:
+    """Register ``setup(ctx) -> fn``; only ``fn`` is timed."""
+
+    def decorator(setup: Benchmark) -> Benchmark:
+        _REGISTRY[name] = setup
+        return setup
+
+    return decorator
+
+
+class BenchContext:
+    """Shared, lazily built fixtures so filtered runs only pay for what they use."""
+
+    @cached_property
+    def pipeline(self) -> RenderPipeline:
+        return RenderPipeline()
+
+    @cached_property
+    def params(self) -> dict:
+        with FIXTURE.open("r", encoding="utf-8") as fh:
+            params = json.load(fh)["params"]
+        params["shading"] = True
+        return params
+
+    @cached_property
+    def canvas(self) -> Image.Image:
+        composed, _stages = self.pipeline.renderer.render(self.params)
+        return composed
+
+    @cached_property
+    def tiles(self) -> tuple[Image.Image, Image.Image]:
+        repo = self.pipeline.repository
+        return repo.get_sprite("tabbyWHITE", 8), repo.get_sprite("lines", 8)
+
+    @cached_property
+    def pattern_defs(self) -> dict[str, PatternDefinition]:
+        """One real palette definition per pattern type, with a fallback for unused types."""
+        defs: dict[str, PatternDefinition] = {}
+        for definition in self.pipeline.mapper.experimental_defs.values():
+            if definition.pattern and definition.pattern.get("type") not in defs:
+                defs[definition.pattern["type"]] = PatternDefinition.from_dict(
+                    definition.pattern
+                )
+        for ptype in _GENERATORS:
+            defs.setdefault(
+                ptype,
+                PatternDefinition.from_dict(
+                    {
+                        "type": ptype,
+                        "tileSize": 16,
+                        "background": [40, 60, 120],
+                        "foreground": [230, 200, 80],
+                    }
+                ),
+            )
+        return defs
+
+
+# ---------------------------------------------------------------------------
+# image_ops blends
+# ---------------------------------------------------------------------------
+
+for _op in ("multiply", "screen", "overlay", "alpha_over", "add"):
+
+    @benchmark(f"image_ops.{_op}")
+    def _blend(ctx: BenchContext, _op: str = _op) -> Callable[[], Any]:
+        fn = getattr(image_ops, _op)
+        base, overlay = ctx.tiles
+        return lambda: fn(base, overlay)
+
+
+@benchmark("image_ops.tint_image")
+def _tint(ctx: BenchContext) -> Callable[[], Any]:
+    base, _overlay = ctx.tiles
+    return lambda: image_ops.tint_image(base, (200, 120, 80))
+
+
+@benchmark("image_ops.upscale_nearest_x7")
+def _upscale(ctx: BenchContext) -> Callable[[], Any]:
+    return lambda: upscale_nearest(ctx.canvas, 7)
+
+
+# ---------------------------------------------------------------------------
+# Sprite repository
+# ---------------------------------------------------------------------------
+
+
+@benchmark("repository.get_sprite.cold")
+def _sprite_cold(ctx: BenchContext) -> Callable[[], Any]:
+    repo = ctx.pipeline.repository
+
+    def run() -> Any:
+        repo._sprite_cache.clear()
+        repo._sheet_cache.clear()
+        return repo.get_sprite("tabbyWHITE", 8)
+
+    return run
+
+
+@benchmark("repository.get_sprite.warm")
+def _sprite_warm(ctx: BenchContext) -> Callable[[], Any]:
+    repo = ctx.pipeline.repository
+    repo.get_sprite("tabbyWHITE", 8)
+    return lambda: repo.get_sprite("tabbyWHITE", 8)
+
+
+# ---------------------------------------------------------------------------
+# Renderer stages + full renders
+# ---------------------------------------------------------------------------
+
+for _spec in STAGE_SEQUENCE:
+
+    @benchmark(f"stage.{_spec.name}")
+    def _stage(ctx: BenchContext, _spec=_spec) -> Callable[[], Any]:
+        # Compile the stage's step and execute it, i.e. the work one stage
+        # contributes to a render.
+        renderer = ctx.pipeline.renderer
+        plan_stage = getattr(renderer, _spec.method)
+        compile_ctx = _CompileContext(ctx.params)
+        canvas = ctx.canvas
+
+        def run() -> Any:
+            step = plan_stage(compile_ctx)
+            if step is None:
+                return None
+            return renderer._execute_step(step, canvas, compile_ctx.sprite_number)
+
+        return run
+
+
+@benchmark("compile.reference_cat")
+def _compile(ctx: BenchContext) -> Callable[[], Any]:
+    return lambda: ctx.pipeline.renderer.compile(ctx.params)
+
+
+@benchmark("render.reference_cat")
+def _render(ctx: BenchContext) -> Callable[[], Any]:
+    return lambda: ctx.pipeline.renderer.render(ctx.params)
+
+
+@benchmark("render.palette_tortie")
+def _render_palette(ctx: BenchContext) -> Callable[[], Any]:
+    # Three experimental palette colours across tortie layers; steady state
+    # is served from the tint cache.
+    mapper = ctx.pipeline.mapper
+    colours = [
+        name
+        for name, definition in mapper.experimental_defs.items()
+        if not definition.pattern
+    ][:3]
+    params = {
+        "spriteNumber": 8,
+        "peltName": "Tabby",
+        "colour": colours[0],
+        "isTortie": True,
+        "tortie": [
+            {"pattern": "Ticked", "colour": colours[1], "mask": "REDTAIL"},
+            {"pattern": "Smoke", "colour": colours[2], "mask": "ONE"},
+        ],
+    }
+    return lambda: ctx.pipeline.renderer.render(params)
+
+
+for _frames in (1, 10, 100, 500):
+
+    @benchmark(f"render_batch.{_frames}")
+    def _batch(ctx: BenchContext, _frames: int = _frames) -> Callable[[], Any]:
+        # Base frame plus (frames - 1) accessory variants, cycled if the catalog is smaller.
+        variants, _total = ctx.pipeline.catalog.expand(
+            LayerIdentifier.accessories, ctx.params, limit=_frames - 1
+        )
+        if variants:
+            variants = [variants[i % len(variants)] for i in range(_frames - 1)]
+        return lambda: ctx.pipeline.render_batch(ctx.params, variants)
+
+
+def _largest_palette(ctx: BenchContext) -> tuple[str, list[str]]:
+    categories = ctx.pipeline.mapper.experimental_categories
+    palette = max(categories, key=lambda name: len(categories[name]))
+    return palette, categories[palette]
+
+
+@benchmark("palette_preview.largest")
+def _palette_preview(ctx: BenchContext) -> Callable[[], Any]:
+    palette, _colours = _largest_palette(ctx)
+    return lambda: ctx.pipeline.render_palette_preview(ctx.params, palette)
+
+
+@benchmark("palette_preview.as_batch")
+def _palette_preview_batch(ctx: BenchContext) -> Callable[[], Any]:
+    # The same sheet through /render/batch: one variant per colour.
+    _palette, colours = _largest_palette(ctx)
+    variants = [
+        BatchVariant(id=colour, overrides={"colour": colour}) for colour in colours
+    ]
+    return lambda: ctx.pipeline.render_batch(ctx.params, variants, include_base=False)
+
+
+# ---------------------------------------------------------------------------
+# Pattern generation (uncached generator call per type)
+# ---------------------------------------------------------------------------
+
+for _ptype in _GENERATORS:
+
+    @benchmark(f"patterns.{_ptype}")
+    def _pattern(ctx: BenchContext, _ptype: str = _ptype) -> Callable[[], Any]:
+        definition = ctx.pattern_defs[_ptype]
+        return lambda: generate_pattern_tile.__wrapped__(definition)
+
+
+# Custom stripe sets with wide stripes: the cost that used to scale with total
+# stripe width.
+_WIDE_STRIPES = [
+    {"color": [200, 40, 40], "width": 48, "offset": 0},
+    {"color": [30, 90, 40], "width": 96, "offset": 20},
+    {"color": [240, 220, 120], "width": 24, "offset": 40},
+    {"color": [20, 30, 90], "width": 200, "offset": 7},
+]
+
+for _ptype in ("tartan", "flag"):
+
+    @benchmark(f"patterns.{_ptype}_wide")
+    def _pattern_wide(ctx: BenchContext, _ptype: str = _ptype) -> Callable[[], Any]:
+        definition = PatternDefinition.from_dict(
+            {
+                "type": _ptype,
+                "tileSize": 64,
+                "background": [90, 90, 90],
+                "stripes": _WIDE_STRIPES,
+            }
+        )
+        return lambda: generate_pattern_tile.__wrapped__(definition)
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+
+@benchmark("encode.png_50")
+def _png_small(ctx: BenchContext) -> Callable[[], Any]:
+    return lambda: _encode_png(ctx.canvas)
+
+
+@benchmark("encode.png_350")
+def _png_large(ctx: BenchContext) -> Callable[[], Any]:
+    large = upscale_nearest(ctx.canvas, 7)
+    return lambda: _encode_png(large)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class Measurement:
+    median_us: float
+    mean_us: float
+    min_us: float
+    number: int
+    repeats: int
+
+    def as_dict(self) -> dict[str, float | int]:
+        return {
+            "median_us": round(self.median_us, 3),
+            "mean_us": round(self.mean_us, 3),
+            "min_us": round(self.min_us, 3),
+            "number": self.number,
+            "repeats": self.repeats,
+        }
+
+
+def measure(
+    fn: Callable[[], Any], *, min_time: float = 0.2, repeats: int = 5
+) -> Measurement:
+    """Calibrate the loop count to ~min_time/repeats, then time ``repeats`` rounds."""
+    fn()  # warm caches / lazy imports outside the timed region
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / repeats or number >= 1 << 16:
+            break
+        number *= (
+            2
+            if elapsed == 0
+            else max(2, min(10, int(min_time / repeats / elapsed) + 1))
+        )
+
+    samples: list[float] = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    return Measurement(
+        median_us=statistics.median(samples),
+        mean_us=statistics.fmean(samples),
+        min_us=min(samples),
+        number=number,
+        repeats=repeats,
+    )
+
+
+def run(names: list[str], *, min_time: float, repeats: int) -> dict[str, Any]:
+    ctx = BenchContext()
+    results: dict[str, Any] = {}
+    skipped: dict[str, str] = {}
+    for name in names:
+        try:
+            fn = _REGISTRY[name](ctx)
+            result = measure(fn, min_time=min_time, repeats=repeats)
+        except (ImportError, OSError) as exc:
+            # Optional native deps (e.g. libcairo for SVG patterns) may be absent.
+            skipped[name] = f"{type(exc).__name__}: {str(exc).splitlines()[0]}"
+            print(f"{name:<40} {'skipped':>15}", file=sys.stderr)
+            continue
+        results[name] = result.as_dict()
+        print(f"{name:<40} {result.median_us:>12.1f} us", file=sys.stderr)
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float
+) -> list[dict[str, Any]]:
+    """Return benchmarks whose median regressed by more than ``threshold`` (0.2 = +20%)."""
+    regressions: list[dict[str, Any]] = []
+    for name, result in current["results"].items():
+        reference = baseline.get("results", {}).get(name)
+        if not reference:
+            continue
+        ratio = (
+            result["median_us"] / reference["median_us"]
+            if reference["median_us"]
+            else 1.0
+        )
+        if ratio > 1.0 + threshold:
+            regressions.append(
+                {
+                    "name": name,
+                    "baseline_us": reference["median_us"],
+                    "current_us": result["median_us"],
+                    "ratio": round(ratio, 3),
+                }
+            )
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Renderer micro-benchmarks")
+    parser.add_argument(
+        "--filter", action="append", default=[], help="substring filter (repeatable)"
+    )
+    parser.add_argument(
+        "--list", action="store_true", help="list benchmark names and exit"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=None, help="write results JSON here"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=None, help="compare against this results JSON"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed relative slowdown (default 0.25)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help=f"merge results into {DEFAULT_BASELINE.name}",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=0.2, help="target seconds per benchmark"
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    names = [
+        name
+        for name in _REGISTRY
+        if not args.filter or any(f in name for f in args.filter)
+    ]
+    if args.list:
+        print("\n".join(names))
+        return 0
+
+    current = run(names, min_time=args.min_time, repeats=args.repeats)
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2) + "\n", encoding="utf-8")
+
+    if args.update_baseline:
+        merged = {"meta": current["meta"], "results": {}}
+        if DEFAULT_BASELINE.exists():
+            merged["results"] = json.loads(
+                DEFAULT_BASELINE.read_text(encoding="utf-8")
+            )["results"]
+        merged["results"].update(current["results"])
+        merged["results"] = dict(sorted(merged["results"].items()))
+        DEFAULT_BASELINE.write_text(
+            json.dumps(merged, indent=2) + "\n", encoding="utf-8"
+        )
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(current, baseline, args.threshold)
+        print(json.dumps({"regressions": regressions}, indent=2))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+"""Compile every palette pattern into the ahead-of-time pattern atlas.
+
+Writes ``pattern_atlas_<size>.npy`` and its JSON index to ``CG3_CACHE_DIR``
+(or ``--cache-dir``), where the service loads it from. Only patterns missing
+from an existing atlas are generated unless ``--force`` is given, which also
+retries patterns that failed before; ``--check`` exits 1 when the atlas is
+stale (for CI or image builds). Generation fans out over half the
+cores unless ``--workers`` says otherwise.
+
+    python tools/build_pattern_atlas.py
+    python tools/build_pattern_atlas.py --check
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+
+from renderer_service.config import settings
+from renderer_service.renderer.pattern_atlas import (
+    build_pattern_atlas,
+    load_atlas,
+    needs_rebuild,
+)
+from renderer_service.renderer.sprite_mapper import SpriteMapper
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "renderer_service" / "data"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Build the pattern atlas")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR)
+    parser.add_argument("--cache-dir", type=Path, default=settings.cache_dir)
+    parser.add_argument("--size", type=int, default=settings.default_canvas_size)
+    parser.add_argument("--force", action="store_true", help="regenerate every entry")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="generator processes (0: half the cores, 1: in-process)",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="exit 1 if the atlas is stale, build nothing",
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+
+    palettes_dir = args.data_dir / "palettes"
+    if args.check:
+        atlas = load_atlas(args.cache_dir, args.size)
+        stale = needs_rebuild(atlas, palettes_dir, args.size)
+        status = "stale" if stale else "up to date"
+        if atlas is not None and atlas.failed:
+            status += f" ({len(atlas.failed)} patterns failed to generate)"
+        print(status)
+        return 1 if stale else 0
+
+    mapper = SpriteMapper(args.data_dir, validate=False)
+    atlas, report = build_pattern_atlas(
+        mapper.pattern_definitions(),
+        palettes_dir,
+        args.cache_dir,
+        args.size,
+        force=args.force,
+        workers=args.workers,
+    )
+    print(json.dumps({**report, "atlas": atlas.snapshot()}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
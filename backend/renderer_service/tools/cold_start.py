@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""Cold-start benchmark for the renderer service.
+
+Each sample runs in a fresh interpreter and records:
+
+* ``import_ms``        – ``import renderer_service.app``
+* ``create_app_ms``    – ``create_app()``
+* ``time_to_ready_ms`` – from ``create_app()`` until ``/ready`` would report
+  ready (startup work done and warm-up past ``CG3_WARMUP_READY_FRACTION``)
+* ``first_request_ms`` / ``second_request_ms`` – ``POST /render`` latency,
+  either straight after lifespan startup (``immediate``) or once ready (``ready``)
+
+    python tools/cold_start.py --runs 5 --output cold-start.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+SERVICE_ROOT = Path(__file__).resolve().parents[1]
+FIXTURE = SERVICE_ROOT / "tests" / "fixtures" / "reference_cat.json"
+
+_CHILD = r"""
+import asyncio, json, sys, time
+
+t0 = time.perf_counter()
+import renderer_service.app as app_module
+t1 = time.perf_counter()
+app = app_module.create_app()
+t2 = time.perf_counter()
+
+import httpx
+
+MODE = sys.argv[1]
+PARAMS = json.load(open(sys.argv[2], encoding="utf-8"))["params"]
+BODY = {"payload": {"spriteNumber": PARAMS.get("spriteNumber", 0), "params": PARAMS}}
+
+
+async def main():
+    result = {"import_ms": (t1 - t0) * 1000, "create_app_ms": (t2 - t1) * 1000}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://renderer") as client:
+            startup = app.state.startup
+            if MODE == "ready":
+                while not startup.ready and startup.error is None:
+                    await asyncio.sleep(0.002)
+                result["time_to_ready_ms"] = (time.perf_counter() - t2) * 1000 + result["create_app_ms"]
+            for key in ("first_request_ms", "second_request_ms"):
+                started = time.perf_counter()
+                response = await client.post("/render", json=BODY)
+                response.raise_for_status()
+                result[key] = (time.perf_counter() - started) * 1000
+            result["startup"] = startup.snapshot()
+    print(json.dumps(result))
+
+
+asyncio.run(main())
+"""
+
+
+def run_sample(mode: str) -> dict[str, Any]:
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(
+            filter(None, [str(SERVICE_ROOT), os.environ.get("PYTHONPATH")])
+        ),
+    }
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD, mode, str(FIXTURE)],
+        cwd=SERVICE_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples: list[dict[str, Any]]) -> dict[str, dict[str, float]]:
+    keys = [key for key, value in samples[0].items() if isinstance(value, (int, float))]
+    return {
+        key: {
+            "median": round(statistics.median(sample[key] for sample in samples), 2),
+            "min": round(min(sample[key] for sample in samples), 2),
+            "max": round(max(sample[key] for sample in samples), 2),
+        }
+        for key in keys
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Renderer cold-start benchmark")
+    parser.add_argument(
+        "--runs", type=int, default=5, help="fresh interpreters per mode"
+    )
+    parser.add_argument(
+        "--mode", choices=("ready", "immediate", "both"), default="both"
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args(argv)
+
+    modes = ("ready", "immediate") if args.mode == "both" else (args.mode,)
+    report: dict[str, Any] = {}
+    for mode in modes:
+        samples = [run_sample(mode) for _ in range(args.runs)]
+        report[mode] = {
+            "summary": summarize(samples),
+            "last_startup": samples[-1]["startup"],
+        }
+        for key, stats in report[mode]["summary"].items():
+            print(
+                f"{mode:<10} {key:<20} {stats['median']:>9.1f} ms  (min {stats['min']:.1f}, max {stats['max']:.1f})",
+                file=sys.stderr,
+            )
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n", encoding="utf-8")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
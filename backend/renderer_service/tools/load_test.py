@@ -0,0 +1,481 @@
+#!/usr/bin/env python
+"""HTTP load generator for the renderer service.
+
+Scriptable counterpart of ``frontend/app/tests/renderer-stress``: replays a
+weighted mix of single renders, batch renders and repeated params either
+closed-loop (fixed concurrency) or open-loop (Poisson arrivals at ``--rate``),
+and reports throughput, latency percentiles, 503 rate, queue depth over time
+and circuit-breaker trips. Queue depth and breaker state are sampled from
+``/health`` so in-process and remote runs report the same numbers.
+
+    # in-process app, sizing the supervisor for a release
+    python tools/load_test.py --workers 4 --max-queue 120 --concurrency 16 --duration 30
+    # open-loop against a running instance
+    python tools/load_test.py --url http://localhost:8001 --rate 40 --duration 60 \\
+        --mix single=6,repeat=2,batch:10=1,batch:50=1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+# Mirrors the option lists used by the frontend stress page.
+BASE_COLOURS = (
+    "WHITE",
+    "PALEGREY",
+    "SILVER",
+    "GREY",
+    "DARKGREY",
+    "BLACK",
+    "CREAM",
+    "PALEGINGER",
+    "GOLDEN",
+    "GINGER",
+    "DARKGINGER",
+    "SIENNA",
+    "LIGHTBROWN",
+    "BROWN",
+    "CHOCOLATE",
+    "LILAC",
+)
+PELTS = ("SingleColour", "Tabby", "Marbled", "Rosette", "Smoke", "Ticked", "Speckled")
+SPRITES = tuple(range(21))
+REPEAT_PARAMS = {"spriteNumber": 8, "params": {"peltName": "Tabby", "colour": "GINGER"}}
+
+DEFAULT_MIX = "single=6,repeat=2,batch:4=1,batch:16=1"
+
+
+def _random_payload(rng: random.Random) -> dict:
+    sprite = rng.choice(SPRITES)
+    return {
+        "spriteNumber": sprite,
+        "params": {
+            "peltName": rng.choice(PELTS),
+            "colour": rng.choice(BASE_COLOURS),
+            "spriteNumber": sprite,
+        },
+    }
+
+
+def parse_mix(spec: str) -> list[tuple[str, int, float]]:
+    """Parse ``single=6,repeat=2,batch:16=1`` into ``(kind, batch_size, weight)``."""
+    mix: list[tuple[str, int, float]] = []
+    for part in filter(None, (chunk.strip() for chunk in spec.split(","))):
+        name, _, weight = part.partition("=")
+        kind, _, size = name.partition(":")
+        if kind not in {"single", "repeat", "batch"}:
+            raise argparse.ArgumentTypeError(f"unknown traffic kind '{kind}'")
+        if kind == "batch" and not size:
+            raise argparse.ArgumentTypeError(
+                "batch entries need a size, e.g. batch:16=1"
+            )
+        mix.append((kind, int(size or 0), float(weight or 1)))
+    if not mix:
+        raise argparse.ArgumentTypeError("traffic mix is empty")
+    return mix
+
+
+def build_request(kind: str, size: int, rng: random.Random) -> tuple[str, str, dict]:
+    """Return ``(label, path, json_body)`` for one request of the given kind."""
+    if kind == "repeat":
+        return "repeat", "/render", {"payload": REPEAT_PARAMS}
+    if kind == "single":
+        return "single", "/render", {"payload": _random_payload(rng)}
+    variants = [
+        {
+            "id": f"v{index}",
+            "overrides": {
+                "colour": rng.choice(BASE_COLOURS),
+                "peltName": rng.choice(PELTS),
+            },
+        }
+        for index in range(size - 1)
+    ]
+    body = {
+        "payload": _random_payload(rng),
+        "variants": variants,
+        "options": {"tileSize": 50},
+    }
+    return f"batch:{size}", "/render/batch", body
+
+
+@dataclass
+class Sample:
+    label: str
+    started: float
+    latency_ms: float
+    status: int
+    error: str | None = None
+
+
+@dataclass
+class HealthSample:
+    t: float
+    queue_size: int
+    circuit_open: bool
+    total_completed: int
+    total_failed: int
+
+
+@dataclass
+class Recorder:
+    started: float = field(default_factory=time.perf_counter)
+    samples: list[Sample] = field(default_factory=list)
+    health: list[HealthSample] = field(default_factory=list)
+
+
+# ---------------------------------------------------------------------------
+# Traffic drivers
+# ---------------------------------------------------------------------------
+
+
+async def _issue(
+    client: httpx.AsyncClient, recorder: Recorder, label: str, path: str, body: dict
+) -> None:
+    started = time.perf_counter()
+    try:
+        response = await client.post(path, json=body)
+        status, error = response.status_code, None
+        if status >= 400:
+            error = response.text[:200]
+    except httpx.HTTPError as exc:
+        status, error = 0, f"{type(exc).__name__}: {exc}"
+    recorder.samples.append(
+        Sample(
+            label=label,
+            started=started - recorder.started,
+            latency_ms=(time.perf_counter() - started) * 1000,
+            status=status,
+            error=error,
+        )
+    )
+
+
+async def run_closed_loop(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    mix: list[tuple[str, int, float]],
+    *,
+    concurrency: int,
+    deadline: float,
+    max_requests: int | None,
+    rng: random.Random,
+) -> None:
+    weights = [weight for _kind, _size, weight in mix]
+    issued = 0
+
+    async def worker() -> None:
+        nonlocal issued
+        while time.perf_counter() < deadline and (
+            max_requests is None or issued < max_requests
+        ):
+            issued += 1
+            kind, size, _weight = rng.choices(mix, weights)[0]
+            await _issue(client, recorder, *build_request(kind, size, rng))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run_open_loop(
+    client: httpx.AsyncClient,
+    recorder: Recorder,
+    mix: list[tuple[str, int, float]],
+    *,
+    rate: float,
+    deadline: float,
+    max_requests: int | None,
+    rng: random.Random,
+) -> None:
+    """Poisson arrivals: requests are fired on schedule regardless of backlog."""
+    weights = [weight for _kind, _size, weight in mix]
+    in_flight: set[asyncio.Task] = set()
+    issued = 0
+    next_at = time.perf_counter()
+    while next_at < deadline and (max_requests is None or issued < max_requests):
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        kind, size, _weight = rng.choices(mix, weights)[0]
+        task = asyncio.create_task(
+            _issue(client, recorder, *build_request(kind, size, rng))
+        )
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        issued += 1
+        next_at += rng.expovariate(rate)
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+async def poll_health(
+    client: httpx.AsyncClient, recorder: Recorder, interval: float, stop: asyncio.Event
+) -> None:
+    while not stop.is_set():
+        try:
+            response = await client.get("/health")
+            metrics = response.json().get("metrics", {})
+            recorder.health.append(
+                HealthSample(
+                    t=round(time.perf_counter() - recorder.started, 3),
+                    queue_size=int(metrics.get("queue_size", 0)),
+                    circuit_open=bool(metrics.get("circuit_open", False)),
+                    total_completed=int(metrics.get("total_completed", 0)),
+                    total_failed=int(metrics.get("total_failed", 0)),
+                )
+            )
+        except (httpx.HTTPError, ValueError):
+            pass
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except TimeoutError:
+            pass
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _latency_summary(samples: list[Sample]) -> dict[str, Any]:
+    ok = [sample.latency_ms for sample in samples if sample.status == 200]
+    return {
+        "requests": len(samples),
+        "ok": len(ok),
+        "rejected_503": sum(1 for sample in samples if sample.status == 503),
+        "errors": sum(1 for sample in samples if sample.status not in (200, 503)),
+        "p50_ms": round(_percentile(ok, 50), 2),
+        "p95_ms": round(_percentile(ok, 95), 2),
+        "p99_ms": round(_percentile(ok, 99), 2),
+        "mean_ms": round(statistics.fmean(ok), 2) if ok else 0.0,
+        "max_ms": round(max(ok), 2) if ok else 0.0,
+    }
+
+
+def summarize(
+    recorder: Recorder, elapsed: float, config: dict[str, Any]
+) -> dict[str, Any]:
+    samples = recorder.samples
+    overall = _latency_summary(samples)
+    by_kind = {
+        label: _latency_summary([sample for sample in samples if sample.label == label])
+        for label in sorted({sample.label for sample in samples})
+    }
+    depths = [sample.queue_size for sample in recorder.health]
+    trips = sum(
+        1
+        for previous, current in zip(recorder.health, recorder.health[1:])
+        if current.circuit_open and not previous.circuit_open
+    )
+    if recorder.health and recorder.health[0].circuit_open:
+        trips += 1
+    errors: dict[str, int] = {}
+    for sample in samples:
+        if sample.error and sample.status != 503:
+            key = f"{sample.status}: {sample.error[:80]}"
+            errors[key] = errors.get(key, 0) + 1
+    return {
+        "config": config,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(overall["ok"] / elapsed, 2) if elapsed else 0.0,
+        "offered_rps": round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        "rate_503": round(overall["rejected_503"] / len(samples), 4)
+        if samples
+        else 0.0,
+        "overall": overall,
+        "by_kind": by_kind,
+        "queue_depth": {
+            "max": max(depths, default=0),
+            "mean": round(statistics.fmean(depths), 2) if depths else 0.0,
+            "timeline": [[sample.t, sample.queue_size] for sample in recorder.health],
+        },
+        "circuit_trips": trips,
+        "errors": errors,
+    }
+
+
+def print_report(report: dict[str, Any]) -> None:
+    out = sys.stderr
+    print(
+        f"elapsed {report['elapsed_s']:.1f}s  throughput {report['throughput_rps']:.1f} req/s "
+        f"(offered {report['offered_rps']:.1f})  503 rate {report['rate_503']:.2%}  "
+        f"circuit trips {report['circuit_trips']}  max queue {report['queue_depth']['max']}",
+        file=out,
+    )
+    print(
+        f"{'kind':<12}{'n':>7}{'ok':>7}{'503':>6}{'err':>6}{'p50':>9}{'p95':>9}{'p99':>9}",
+        file=out,
+    )
+    rows = [*report["by_kind"].items(), ("all", report["overall"])]
+    for label, row in rows:
+        print(
+            f"{label:<12}{row['requests']:>7}{row['ok']:>7}{row['rejected_503']:>6}{row['errors']:>6}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}",
+            file=out,
+        )
+    for error, count in report["errors"].items():
+        print(f"  {count} x {error}", file=out)
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+
+def _build_in_process_app(workers: int | None, max_queue: int | None):
+    from renderer_service.app import create_app
+    from renderer_service.config import settings
+
+    if workers is not None:
+        settings.worker_count = workers
+    if max_queue is not None:
+        settings.max_queue_size = max_queue
+    return create_app()
+
+
+async def run(args: argparse.Namespace) -> dict[str, Any]:
+    mix = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    timeout = httpx.Timeout(args.timeout)
+
+    lifespan = contextlib.AsyncExitStack()
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=timeout)
+    else:
+        app = _build_in_process_app(args.workers, args.max_queue)
+        # ASGITransport does not send lifespan events; run startup/shutdown ourselves.
+        await lifespan.enter_async_context(app.router.lifespan_context(app))
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://renderer",
+            timeout=timeout,
+        )
+
+    recorder = Recorder()
+    stop = asyncio.Event()
+    async with lifespan, client:
+        poller = asyncio.create_task(
+            poll_health(client, recorder, args.sample_interval, stop)
+        )
+        recorder.started = time.perf_counter()
+        deadline = recorder.started + args.duration
+        if args.rate:
+            await run_open_loop(
+                client,
+                recorder,
+                mix,
+                rate=args.rate,
+                deadline=deadline,
+                max_requests=args.requests,
+                rng=rng,
+            )
+        else:
+            await run_closed_loop(
+                client,
+                recorder,
+                mix,
+                concurrency=args.concurrency,
+                deadline=deadline,
+                max_requests=args.requests,
+                rng=rng,
+            )
+        elapsed = time.perf_counter() - recorder.started
+        stop.set()
+        await poller
+
+    config = {
+        "target": args.url or "in-process",
+        "mode": "open" if args.rate else "closed",
+        "rate": args.rate,
+        "concurrency": None if args.rate else args.concurrency,
+        "duration": args.duration,
+        "mix": args.mix,
+        "workers": args.workers,
+        "max_queue": args.max_queue,
+        "seed": args.seed,
+    }
+    return summarize(recorder, elapsed, config)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Renderer HTTP load test")
+    parser.add_argument(
+        "--url",
+        default=None,
+        help="target a running service instead of an in-process app",
+    )
+    parser.add_argument(
+        "--mix",
+        default=DEFAULT_MIX,
+        help=f"weighted traffic mix (default {DEFAULT_MIX})",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="closed-loop in-flight requests"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=None, help="open-loop arrival rate (req/s)"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=10.0, help="seconds to generate traffic"
+    )
+    parser.add_argument(
+        "--requests", type=int, default=None, help="stop after this many requests"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="in-process worker_count override"
+    )
+    parser.add_argument(
+        "--max-queue", type=int, default=None, help="in-process max_queue_size override"
+    )
+    parser.add_argument(
+        "--sample-interval", type=float, default=0.25, help="/health polling period (s)"
+    )
+    parser.add_argument(
+        "--timeout", type=float, default=60.0, help="per-request timeout (s)"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--output", type=Path, default=None, help="write the JSON report here"
+    )
+    args = parser.parse_args(argv)
+    if args.url and (args.workers is not None or args.max_queue is not None):
+        parser.error("--workers/--max-queue only apply to in-process runs")
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    else:
+        condensed = dict(report)
+        condensed["queue_depth"] = {
+            key: value
+            for key, value in report["queue_depth"].items()
+            if key != "timeline"
+        }
+        print(json.dumps(condensed, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,23 @@
 #!/usr/bin/env python
+"""V2 vs V3 parity stress test.
+
+Samples come either from live ``v2_worker.ts`` processes (one per shard) or
+from a recorded corpus (``--corpus``), so CI can replay V2 outputs offline.
+Samples are sharded across a process pool and progress is checkpointed, so an
+interrupted run picks up where it stopped with ``--resume``.
+"""
+
 from __future__ import annotations
 
 import argparse
+import atexit
 import base64
 import json
+import os
 import subprocess
 import sys
+from collections.abc import Iterator
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from io import BytesIO
 from pathlib import Path
 from typing import Any, Dict
@@ -20,6 +32,7 @@ from renderer_service.renderer.repository import SpriteRepository
 ROOT = Path(__file__).resolve().parents[3]
 FRONTEND_DIR = ROOT / "frontend"
 WORKER_PATH = FRONTEND_DIR / "scripts" / "v2_worker.ts"
+DEFAULT_OUTPUT_DIR = ROOT / "parity_failures"
 
 
 def launch_worker() -> subprocess.Popen:
@@ -71,112 +84,370 @@ def apply_blend(base: Image.Image, overlay: Image.Image, mode: str) -> Image.Ima
     if mode == "add":
         return add(base, overlay)
     if mode == "replace":
-        return overlay.copy()
+        return overlay
     return Image.alpha_composite(base, overlay)
 
 
-def diff_images(img_a: Image.Image, img_b: Image.Image) -> np.ndarray:
-    arr_a = image_to_array(img_a)
-    arr_b = image_to_array(img_b)
+def diff_arrays(arr_a: np.ndarray, arr_b: np.ndarray) -> np.ndarray:
     return arr_a.astype(np.int16) - arr_b.astype(np.int16)
 
 
+def diff_images(img_a: Image.Image, img_b: Image.Image) -> np.ndarray:
+    return diff_arrays(image_to_array(img_a), image_to_array(img_b))
+
+
 def mismatch_count(diff: np.ndarray) -> int:
     return int(np.count_nonzero(diff))
 
 
-def accumulate_snapshots(layers, initial: Image.Image) -> list[Image.Image]:
-    composed = initial.copy()
-    snapshots: list[Image.Image] = []
+def iter_snapshots(layers, initial: Image.Image) -> Iterator[Image.Image]:
+    """Yield the composite after each layer; blends return new images, so no copies."""
+    composed = initial
     for layer in layers:
         composed = apply_blend(composed, layer.image, layer.blend_mode or "alpha")
-        snapshots.append(composed.copy())
-    return snapshots
+        yield composed
 
 
-def run_parity(max_samples: int = 10000, tolerance: int = 0) -> int:
-    worker = launch_worker()
-    assert worker.stdout is not None and worker.stdin is not None
+# ---------------------------------------------------------------------------
+# Sample sources
+# ---------------------------------------------------------------------------
 
-    handshake = read_json_line(worker.stdout)
-    if not handshake.get("ok"):
-        raise RuntimeError(f"Worker failed to start: {handshake}")
-
-    repo = SpriteRepository()
-    pipeline = RenderPipeline(repository=repo)
 
-    failure_dir = ROOT / "parity_failures"
-    failure_dir.mkdir(exist_ok=True)
+class LiveSource:
+    """Pulls random samples from a dedicated V2 worker process."""
 
-    for idx in range(1, max_samples + 1):
-        worker.stdin.write("random\n")
-        worker.stdin.flush()
+    def __init__(self) -> None:
+        self.worker = launch_worker()
+        assert self.worker.stdout is not None and self.worker.stdin is not None
+        handshake = read_json_line(self.worker.stdout)
+        if not handshake.get("ok"):
+            raise RuntimeError(f"Worker failed to start: {handshake}")
+        atexit.register(self.close)
 
-        message = read_json_line(worker.stdout)
+    def sample(self, index: int) -> dict[str, Any]:
+        self.worker.stdin.write("random\n")
+        self.worker.stdin.flush()
+        message = read_json_line(self.worker.stdout)
         if not message.get("ok"):
             raise RuntimeError(f"Worker error: {message}")
+        return {"params": message["params"], "imageBase64": message["imageBase64"]}
 
-        params = sanitize_params(message["params"])
-        if "spriteNumber" not in params:
-            raise RuntimeError("V2 result missing spriteNumber")
+    def close(self) -> None:
+        if self.worker.poll() is None:
+            self.worker.terminate()
 
-        result_v3 = pipeline.render(params, collect_layers=True)
-        img_v3 = result_v3.composed.convert("RGBA")
-        img_v2 = load_v2_image(message["imageBase64"])  # already 50x50
 
-        diff = diff_images(img_v3, img_v2)
-        total_mismatch = mismatch_count(diff)
-        if total_mismatch <= tolerance:
-            if idx % 100 == 0:
-                print(f"{idx} samples OK", file=sys.stderr)
-            continue
+class CorpusSource:
+    """Replays recorded V2 outputs: one ``{"params", "imageBase64"}`` JSON object per line."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.offsets = index_corpus(path)
+        self._fh = path.open("rb")
+        atexit.register(self._fh.close)
+
+    def sample(self, index: int) -> dict[str, Any]:
+        self._fh.seek(self.offsets[index - 1])
+        return json.loads(self._fh.readline())
+
+
+def index_corpus(path: Path) -> list[int]:
+    offsets: list[int] = []
+    with path.open("rb") as fh:
+        position = 0
+        for line in fh:
+            if line.strip():
+                offsets.append(position)
+            position += len(line)
+    return offsets
+
+
+# ---------------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------------
 
-        snapshots = accumulate_snapshots(result_v3.layers, repo.blank_canvas())
-        failing_layer = None
-        stage_mismatch = None
-        for snapshot, layer in zip(snapshots, result_v3.layers):
-            stage_diff = diff_images(snapshot, img_v2)
-            count = mismatch_count(stage_diff)
-            if count > tolerance:
-                failing_layer = layer
-                stage_mismatch = count
-                break
-
-
-        diff_image = Image.fromarray(np.clip(np.abs(diff), 0, 255).astype(np.uint8))
-        img_v3.save(failure_dir / f"v3_{idx}.png")
-        img_v2.save(failure_dir / f"v2_{idx}.png")
-        diff_image.save(failure_dir / f"diff_{idx}.png")
-        if failing_layer:
-            failing_layer.image.save(failure_dir / f"layer_{failing_layer.id.value}_{idx}.png")
-
-        print(json.dumps({
-            "sample": idx,
-            "mismatch_pixels": int(total_mismatch),
-            "params": params,
-            "failing_layer": {
-                "id": failing_layer.id.value if failing_layer else None,
-                "blend_mode": failing_layer.blend_mode if failing_layer else None,
-                "diagnostics": failing_layer.diagnostics if failing_layer else None,
-                "stage_mismatch": int(stage_mismatch) if stage_mismatch is not None else None,
-            },
-        }, indent=2))
-
-        worker.terminate()
-        return 1
-
-    worker.terminate()
-    print(json.dumps({"samples": max_samples, "mismatch_pixels": 0, "status": "ok"}))
-    return 0
+_STATE: dict[str, Any] = {}
+
+
+def _init_worker(
+    corpus: str | None, tolerance: int, failure_dir: str, record: bool
+) -> None:
+    repo = SpriteRepository()
+    _STATE["repo"] = repo
+    _STATE["pipeline"] = RenderPipeline(repository=repo)
+    _STATE["source"] = CorpusSource(Path(corpus)) if corpus else LiveSource()
+    _STATE["tolerance"] = tolerance
+    _STATE["failure_dir"] = Path(failure_dir)
+    _STATE["record"] = record
+
+
+def _check_chunk(indices: list[int]) -> list[dict[str, Any]]:
+    return [_check_sample(index) for index in indices]
+
+
+def _check_sample(idx: int) -> dict[str, Any]:
+    pipeline: RenderPipeline = _STATE["pipeline"]
+    tolerance: int = _STATE["tolerance"]
+    sample = _STATE["source"].sample(idx)
+    outcome: dict[str, Any] = {"sample": idx, "ok": True}
+    if _STATE["record"]:
+        outcome["record"] = sample
+
+    params = sanitize_params(sample["params"])
+    if "spriteNumber" not in params:
+        raise RuntimeError(f"V2 sample {idx} missing spriteNumber")
+
+    result_v3 = pipeline.render(params, collect_layers=True)
+    img_v3 = result_v3.composed.convert("RGBA")
+    img_v2 = load_v2_image(sample["imageBase64"])  # already 50x50
+    arr_v2 = image_to_array(img_v2)
+
+    diff = diff_arrays(image_to_array(img_v3), arr_v2)
+    total_mismatch = mismatch_count(diff)
+    if total_mismatch <= tolerance:
+        return outcome
+
+    failing_layer = None
+    stage_mismatch = None
+    for snapshot, layer in zip(
+        iter_snapshots(result_v3.layers, _STATE["repo"].blank_canvas()),
+        result_v3.layers,
+    ):
+        count = mismatch_count(diff_arrays(image_to_array(snapshot), arr_v2))
+        if count > tolerance:
+            failing_layer = layer
+            stage_mismatch = count
+            break
+
+    failure_dir: Path = _STATE["failure_dir"]
+    diff_image = Image.fromarray(np.clip(np.abs(diff), 0, 255).astype(np.uint8))
+    img_v3.save(failure_dir / f"v3_{idx}.png")
+    img_v2.save(failure_dir / f"v2_{idx}.png")
+    diff_image.save(failure_dir / f"diff_{idx}.png")
+    if failing_layer:
+        failing_layer.image.save(
+            failure_dir / f"layer_{failing_layer.id.value}_{idx}.png"
+        )
+
+    outcome.update(
+        ok=False,
+        mismatch_pixels=int(total_mismatch),
+        params=params,
+        failing_layer={
+            "id": failing_layer.id.value if failing_layer else None,
+            "blend_mode": failing_layer.blend_mode if failing_layer else None,
+            "diagnostics": failing_layer.diagnostics if failing_layer else None,
+            "stage_mismatch": int(stage_mismatch)
+            if stage_mismatch is not None
+            else None,
+        },
+    )
+    return outcome
+
+
+# ---------------------------------------------------------------------------
+# Checkpointing
+# ---------------------------------------------------------------------------
+
+
+def load_checkpoint(path: Path) -> dict[str, Any]:
+    if not path.exists():
+        return {"completed": [], "failures": []}
+    with path.open("r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def save_checkpoint(
+    path: Path, completed: set[int], failures: list[dict[str, Any]]
+) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as fh:
+        json.dump({"completed": sorted(completed), "failures": failures}, fh)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+
+
+def run_parity(
+    max_samples: int = 10000,
+    tolerance: int = 0,
+    *,
+    workers: int | None = None,
+    corpus: Path | None = None,
+    record: Path | None = None,
+    output_dir: Path = DEFAULT_OUTPUT_DIR,
+    resume: bool = False,
+    keep_going: bool = False,
+    chunk_size: int = 25,
+) -> int:
+    if corpus is not None and record is not None:
+        raise ValueError("--record only applies to live runs")
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = output_dir / "checkpoint.json"
+    state = (
+        load_checkpoint(checkpoint_path)
+        if resume
+        else {"completed": [], "failures": []}
+    )
+    completed: set[int] = set(state["completed"])
+    failures: list[dict[str, Any]] = list(state["failures"])
+
+    total = max_samples
+    if corpus is not None:
+        total = min(max_samples, len(index_corpus(corpus)))
+    pending = [idx for idx in range(1, total + 1) if idx not in completed]
+    if resume and completed:
+        print(
+            f"resuming: {len(completed)} done, {len(pending)} pending", file=sys.stderr
+        )
+
+    worker_count = max(1, workers or os.cpu_count() or 1)
+    chunks = [pending[i : i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    record_fh = record.open("a", encoding="utf-8") if record is not None else None
+    # Recorded samples are written in sample order, whatever order chunks finish in.
+    recorded: dict[int, dict[str, Any]] = {}
+    next_record = 0
+
+    try:
+        with ProcessPoolExecutor(
+            max_workers=worker_count,
+            initializer=_init_worker,
+            initargs=(
+                str(corpus) if corpus else None,
+                tolerance,
+                str(output_dir),
+                record is not None,
+            ),
+        ) as executor:
+            # Keep a bounded number of chunks in flight so checkpoints stay fresh.
+            queue = iter(chunks)
+            in_flight = {
+                executor.submit(_check_chunk, chunk)
+                for chunk in _take(queue, worker_count * 2)
+            }
+            stop = False
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                before = len(completed)
+                outcomes = sorted(
+                    (outcome for future in done for outcome in future.result()),
+                    key=lambda outcome: outcome["sample"],
+                )
+                for outcome in outcomes:
+                    completed.add(outcome["sample"])
+                    if record_fh is not None:
+                        recorded[outcome["sample"]] = outcome.pop("record")
+                    if not outcome.pop("ok"):
+                        failures.append(outcome)
+                        print(json.dumps(outcome, indent=2))
+                        if not keep_going:
+                            stop = True
+                            break
+                if len(completed) // 100 != before // 100:
+                    print(f"{len(completed)} samples checked", file=sys.stderr)
+                if record_fh is not None:
+                    while (
+                        next_record < len(pending) and pending[next_record] in recorded
+                    ):
+                        record_fh.write(
+                            json.dumps(recorded.pop(pending[next_record])) + "\n"
+                        )
+                        next_record += 1
+                    record_fh.flush()
+                save_checkpoint(checkpoint_path, completed, failures)
+                if stop:
+                    for future in in_flight:
+                        future.cancel()
+                    break
+                in_flight |= {
+                    executor.submit(_check_chunk, chunk)
+                    for chunk in _take(queue, len(done))
+                }
+    finally:
+        if record_fh is not None:
+            # Samples past a gap left by an early stop.
+            for idx in sorted(recorded):
+                record_fh.write(json.dumps(recorded[idx]) + "\n")
+            record_fh.close()
+
+    summary = {
+        "samples": len(completed),
+        "failures": len(failures),
+        "status": "ok" if not failures else "mismatch",
+    }
+    print(json.dumps(summary))
+    return 0 if not failures else 1
+
+
+def _take(iterator: Iterator[list[int]], count: int) -> list[list[int]]:
+    taken: list[list[int]] = []
+    for _ in range(count):
+        try:
+            taken.append(next(iterator))
+        except StopIteration:
+            break
+    return taken
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run V2 vs V3 parity stress test")
-    parser.add_argument("--samples", type=int, default=10000, help="maximum random samples to test")
-    parser.add_argument("--tolerance", type=int, default=0, help="allowed per-channel mismatch count")
+    parser.add_argument(
+        "--samples", type=int, default=10000, help="maximum samples to test"
+    )
+    parser.add_argument(
+        "--tolerance", type=int, default=0, help="allowed per-channel mismatch count"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="process count (default: CPU count)"
+    )
+    parser.add_argument(
+        "--corpus",
+        type=Path,
+        default=None,
+        help="replay recorded V2 outputs (JSONL) instead of a live worker",
+    )
+    parser.add_argument(
+        "--record",
+        type=Path,
+        default=None,
+        help="append live V2 outputs to this JSONL corpus",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=DEFAULT_OUTPUT_DIR,
+        help="failure images + checkpoint",
+    )
+    parser.add_argument(
+        "--resume", action="store_true", help="skip samples recorded in the checkpoint"
+    )
+    parser.add_argument(
+        "--keep-going",
+        action="store_true",
+        help="check every sample instead of stopping at the first mismatch",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=25, help="samples per task sent to a worker"
+    )
     args = parser.parse_args()
 
-    sys.exit(run_parity(max_samples=args.samples, tolerance=args.tolerance))
+    sys.exit(
+        run_parity(
+            max_samples=args.samples,
+            tolerance=args.tolerance,
+            workers=args.workers,
+            corpus=args.corpus,
+            record=args.record,
+            output_dir=args.output_dir,
+            resume=args.resume,
+            keep_going=args.keep_going,
+            chunk_size=args.chunk_size,
+        )
+    )
 
 
 if __name__ == "__main__":
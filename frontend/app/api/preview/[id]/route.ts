@@ -6,7 +6,8 @@ import { getServerConvexUrl } from "@/lib/convexUrl";
 const RENDERER_BASE = (
   process.env.RENDERER_INTERNAL_URL ?? "http://127.0.0.1:8001"
 ).replace(/\/$/, "");
-const PREVIEW_SIZE = 360;
+// 50 px native sprite × 7 = 350 px, integer-scaled so every pixel stays square.
+const PREVIEW_SCALE = 7;
 
 function dataUrlToBuffer(dataUrl: string): Buffer {
   const matches = dataUrl.match(/^data:([^;]+);base64,(.+)$/);
@@ -48,7 +49,7 @@ async function renderCatData(
       includeBase: true,
       includeSources: false,
       columns: 1,
-      tileSize: PREVIEW_SIZE,
+      scale: PREVIEW_SCALE,
     },
   };
 
@@ -132,11 +132,15 @@ export interface BatchVariantPayload {
 
 export interface BatchRenderOptions {
   tileSize?: number;
+  scale?: number;
   columns?: number;
   includeSources?: boolean;
   includeBase?: boolean;
   frameMode?: "composed" | "layer";
   layerId?: string;
+  expandVariants?: boolean;
+  variantOffset?: number;
+  variantLimit?: number;
 }
 
 export interface BatchRenderRequest {